@@ -0,0 +1,41 @@
+"""
+Production server config for the image prediction API.
+
+    gunicorn -c gunicorn.conf.py img_processing_api:app
+
+TensorFlow, OpenCV and numpy are imported once in the master before the workers are forked, so
+those pages are shared copy-on-write. The Keras model is loaded in each worker after the fork and
+warmed up with a dummy prediction before the worker accepts requests. On SIGTERM workers stop
+accepting connections and get GRACEFUL_TIMEOUT seconds to finish the requests they are handling.
+Within a worker, concurrent /predict requests are batched into one forward pass.
+"""
+import os
+import multiprocessing
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5001')}"
+
+# every worker runs TensorFlow with TF_THREADS_PER_WORKER intra-op threads, size the pool to the cores
+TF_THREADS_PER_WORKER = int(os.getenv("TF_THREADS_PER_WORKER", "2"))
+workers = int(os.getenv("WEB_CONCURRENCY", max(1, multiprocessing.cpu_count() // TF_THREADS_PER_WORKER)))
+worker_class = "gthread"
+# request threads spend the prediction waiting on the worker's batcher (prediction_batcher.py), a
+# batch can only fill up if at least PREDICT_BATCH_MAX_SIZE requests are in flight at once. Keep
+# WORKER_THREADS >= PREDICT_BATCH_MAX_SIZE, fewer threads just cap the batches at the thread count
+threads = int(os.getenv("WORKER_THREADS", "16"))
+
+preload_app = True
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+
+def post_worker_init(worker):
+    # runs inside the worker before it starts serving, so it only reports ready once warm
+    import tensorflow as tf
+    from img_processing_api import warmup_model
+
+    tf.config.threading.set_intra_op_parallelism_threads(TF_THREADS_PER_WORKER)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    warmup_model()
+    worker.log.info("Worker %s warmed up", worker.pid)
@@ -1,17 +1,61 @@
 import os
+import threading
 import numpy as np
 import cv2
 import tensorflow as tf
 from flask import Flask, request, jsonify
+from prediction_batcher import PredictionBatcher, batch_shapes, PREDICT_BATCHING
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Load the trained model
+# Path of the trained model
 model_path = os.path.join(os.path.dirname(__file__), '../microservices/lesson-management-service/image-processing-service/img_processing_model.keras')
-print("Loading model from:", model_path)
-model = tf.keras.models.load_model(model_path)
-print("Model loaded successfully.")
+
+# The model is loaded once per process on first use (or by the gunicorn worker hook).
+# TensorFlow's runtime threads do not survive a fork, so it must not be loaded in the gunicorn master.
+model = None
+model_ready = False
+
+def load_model():
+    global model
+    if model is None:
+        print("Loading model from:", model_path)
+        model = tf.keras.models.load_model(model_path)
+        print("Model loaded successfully.")
+    return model
+
+# Concurrent requests are predicted together, see prediction_batcher.py.
+# Created per process like the model, PREDICT_BATCHING=0 predicts every request on its own.
+batcher = None
+batcher_lock = threading.Lock()
+
+def get_batcher():
+    global batcher
+    with batcher_lock:
+        if batcher is None:
+            batcher = PredictionBatcher(lambda images: load_model().predict_on_batch(images))
+    return batcher
+
+# Run a dummy prediction for every batch shape so the first real requests do not pay TensorFlow graph tracing
+def warmup_model():
+    global model_ready
+    for size in batch_shapes() if PREDICT_BATCHING else [1]:
+        load_model().predict_on_batch(np.zeros((size, 128, 128, 3), dtype=np.float32))
+    model_ready = True
+    print("Model warmed up.")
+
+# Liveness probe, never touches the model
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({'status': 'ok'})
+
+# Readiness probe, only reports ready once the model is loaded and warmed up
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    if not model_ready:
+        return jsonify({'status': 'warming_up'}), 503
+    return jsonify({'status': 'ready'})
 
 # Function to preprocess the uploaded image
 def preprocess_image(image_bytes):
@@ -54,9 +98,12 @@ def predict():
         print("Image file read successfully. Starting preprocessing...")
         preprocessed_image = preprocess_image(image_file)
         
-        # Make a prediction
+        # Make a prediction, batched with the other requests in flight
         print("Running model prediction...")
-        predictions = model.predict(preprocessed_image)
+        if PREDICT_BATCHING:
+            predictions = get_batcher().predict(preprocessed_image)
+        else:
+            predictions = load_model().predict_on_batch(preprocessed_image)
         predicted_class = int(np.argmax(predictions))
         confidence = float(np.max(predictions))
         print(f"Prediction complete. Gesture: {predicted_class}, Confidence: {confidence}")
@@ -68,8 +115,10 @@ def predict():
         print("An error occurred:", str(e))
         return jsonify({'error': str(e)}), 500
 
-# Run the Flask app
+# Run the Flask development server,
+# production runs under gunicorn: gunicorn -c gunicorn.conf.py img_processing_api:app
 if __name__ == '__main__':
     print("Starting Flask server...")
-    app.run(debug=True, host='0.0.0.0', port=5001)
-    print("Flask server is running.")
+    warmup_model()
+    app.run(debug=os.getenv('FLASK_DEBUG') == '1', host='0.0.0.0', port=int(os.getenv('PORT', '5001')))
+
@@ -0,0 +1,104 @@
+"""
+Dynamic batching of concurrent /predict requests into one model forward pass.
+
+Every gthread request thread preprocesses its own image and hands it to the batcher, which
+collects images until PREDICT_BATCH_MAX_SIZE are waiting or the first one has waited
+PREDICT_BATCH_MAX_WAIT_MS, runs a single batched prediction on its own thread and hands every
+request its row of the result. Under concurrent traffic the model runs once per batch instead
+of once per request, a request alone only pays the short wait.
+
+Batches are padded to the next power of two, so the model only ever sees a handful of batch
+shapes and does not retrace for every batch size (see padded_size).
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+PREDICT_BATCHING = os.getenv("PREDICT_BATCHING", "1") == "1"
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "16"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "5"))
+
+
+def padded_size(size, max_batch_size=PREDICT_BATCH_MAX_SIZE):
+    """Smallest power of two >= size, capped at max_batch_size"""
+    return min(1 << (size - 1).bit_length(), max_batch_size)
+
+
+def batch_shapes(max_batch_size=PREDICT_BATCH_MAX_SIZE):
+    """Every padded batch size the batcher can produce, for warming the model up"""
+    return sorted({padded_size(size, max_batch_size) for size in range(1, max_batch_size + 1)})
+
+
+class PredictionBatcher:
+    """
+    Collects single images from request threads and predicts them in batches.
+
+    predict_batch takes an (N, ...) float32 array and returns (N, classes) predictions. The
+    batching thread is started on the first submit, so a batcher created before gunicorn
+    forks its workers does not leave a dead thread behind in them.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=PREDICT_BATCH_MAX_SIZE, max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.images = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, image):
+        """Future for the prediction row of one (1, ...) or (...) preprocessed image"""
+        future = Future()
+        self._ensure_started()
+        image = np.asarray(image, dtype=np.float32)
+        self._queue.put((image.reshape((1,) + image.shape[-3:]), future))
+        return future
+
+    def predict(self, image, timeout=None):
+        """Blocking submit, returns the (classes,) prediction of the image"""
+        return self.submit(image).result(timeout)
+
+    def _collect(self):
+        # block for the first image, then gather more until the batch is full or the wait is over
+        pending = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(pending) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            try:
+                images = np.concatenate([image for image, _ in pending])
+                size = padded_size(len(images), self.max_batch_size)
+                if size > len(images):
+                    images = np.concatenate([images, np.zeros((size - len(images),) + images.shape[1:], images.dtype)])
+                predictions = np.asarray(self.predict_batch(images))
+            except Exception as e:
+                # every request of the batch gets the error, the next batch starts fresh
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.images += len(pending)
+            for i, (_, future) in enumerate(pending):
+                future.set_result(predictions[i])
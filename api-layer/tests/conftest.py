@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+API_ROOT = Path(__file__).resolve().parent.parent
+
+# the API modules are plain scripts next to gunicorn.conf.py, not a package
+if str(API_ROOT) not in sys.path:
+    sys.path.insert(0, str(API_ROOT))
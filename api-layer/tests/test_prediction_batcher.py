@@ -0,0 +1,116 @@
+import time
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from prediction_batcher import PredictionBatcher, batch_shapes, padded_size
+
+SHAPE = (4, 4, 3)
+
+
+class RecordingModel:
+    """predict_batch stand-in: row i of the prediction is the mean of image i, records batch sizes"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.batch_sizes = []
+
+    def __call__(self, images):
+        self.batch_sizes.append(len(images))
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return images.reshape(len(images), -1).mean(axis=1, keepdims=True)
+
+
+def image(value):
+    return np.full(SHAPE, value, dtype=np.float32)
+
+
+def submit_together(batcher, values):
+    """Queue every image before the batching thread starts, so it finds them all waiting"""
+    futures = []
+    for value in values:
+        future = Future()
+        batcher._queue.put((image(value)[None], future))
+        futures.append(future)
+    batcher._ensure_started()
+    return futures
+
+
+def test_padded_size():
+    assert [padded_size(n, 16) for n in (1, 2, 3, 5, 8, 9, 16)] == [1, 2, 4, 8, 8, 16, 16]
+    # never padded past the largest batch the model is warmed up for
+    assert padded_size(13, 12) == 12
+    assert batch_shapes(16) == [1, 2, 4, 8, 16]
+    assert batch_shapes(12) == [1, 2, 4, 8, 12]
+
+
+def test_single_request_is_answered_after_the_max_wait():
+    model = RecordingModel()
+    batcher = PredictionBatcher(model, max_batch_size=8, max_wait_ms=20)
+    start = time.monotonic()
+    np.testing.assert_allclose(batcher.predict(image(3.0), timeout=1), [3.0])
+    # a request alone waits for company at most max_wait_ms, it is not held until the batch fills
+    assert time.monotonic() - start < 0.5
+    assert model.batch_sizes == [1]
+
+
+def test_queued_requests_are_split_into_full_batches():
+    model = RecordingModel()
+    batcher = PredictionBatcher(model, max_batch_size=4, max_wait_ms=50)
+    futures = submit_together(batcher, range(10))
+    results = [future.result(timeout=2) for future in futures]
+
+    np.testing.assert_allclose(np.concatenate(results), np.arange(10, dtype=np.float32))
+    # 10 queued images: two full batches and the remaining 2
+    assert model.batch_sizes == [4, 4, 2]
+    assert batcher.batches == 3 and batcher.images == 10
+
+
+def test_batches_are_padded_but_only_real_rows_are_returned():
+    model = RecordingModel()
+    batcher = PredictionBatcher(model, max_batch_size=8, max_wait_ms=50)
+    futures = submit_together(batcher, [1.0, 2.0, 3.0])
+    results = [future.result(timeout=2) for future in futures]
+
+    # three images run as a batch of four, the zero row is dropped
+    assert model.batch_sizes == [4]
+    np.testing.assert_allclose(np.concatenate(results), [1.0, 2.0, 3.0])
+    assert batcher.images == 3
+
+
+def test_an_error_fails_every_request_of_the_batch():
+    model = RecordingModel(error=RuntimeError("model exploded"))
+    batcher = PredictionBatcher(model, max_batch_size=4, max_wait_ms=50)
+    futures = submit_together(batcher, range(3))
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model exploded"):
+            future.result(timeout=2)
+
+    # the batching thread survives and serves the next batch
+    model.error = None
+    np.testing.assert_allclose(batcher.predict(image(5.0), timeout=2), [5.0])
+    assert batcher.batches == 1
+
+
+def test_concurrent_requests_share_forward_passes():
+    model = RecordingModel(delay=0.02)
+    batcher = PredictionBatcher(model, max_batch_size=8, max_wait_ms=10)
+    results = {}
+
+    def request(value):
+        results[value] = batcher.predict(image(value), timeout=5)
+
+    threads = [threading.Thread(target=request, args=(float(v),)) for v in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {value: float(row[0]) for value, row in results.items()} == {float(v): float(v) for v in range(16)}
+    assert len(model.batch_sizes) < 16
+    assert all(size in batch_shapes(8) for size in model.batch_sizes)
@@ -0,0 +1,188 @@
+"""
+Compare the hand landmark engines on the benchmark clips.
+
+Every engine runs in tracking mode over the frames of a clip sampled every --interval frames,
+with the decoder timestamps (CAP_PROP_POS_MSEC) passed along. Reported per engine and clip:
+
+    latency      per-frame detect time (median, p95, mean), engine creation time, and for
+                 engines that detect batches the per-frame time of whole-clip detect_batch calls
+    recall       frames with a hand / frames where any of the compared engines found one
+    agreement    mean landmark distance to the reference engine on frames both detected a hand
+
+Engines that cannot be built (tasks without its hand_landmarker.task bundle) are skipped with a
+note. Synthetic clips rarely contain a detectable hand, put recorded clips in --recorded-dir for
+meaningful recall numbers.
+
+Usage (from gpt-gesture-detection-service/):
+    python benchmarks/bench_engines.py --engines solutions tasks --lengths 5 --fps 30
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(SERVICE_DIR.parent))
+
+from hand_detection_service.engines import ENGINES, create_engine
+from hand_detection_service.real_time_hand_detection import batches_frames
+from synthetic_videos import synthetic_video_specs, recorded_video_specs, materialize
+
+
+def decode_timed_frames(video_path, interval):
+    """(timestamp_ms, frame) for every interval-th frame of the clip"""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frames = []
+    index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % interval == 0:
+            # some containers report 0 for every frame, fall back to the nominal frame time
+            timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC) or index * 1000 / fps
+            frames.append((timestamp_ms, frame))
+        index += 1
+    cap.release()
+    return frames
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_engine(name, frames, repeats):
+    """Build the engine and run it over the frames, returns (report, landmarks of the last run)"""
+    start = time.perf_counter()
+    try:
+        engine = create_engine(name)
+    except Exception as e:
+        return {"skipped": str(e)}, None
+    create_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    batch_runs = []
+    landmarks = []
+    try:
+        for _ in range(repeats):
+            engine.reset()
+            landmarks = []
+            for timestamp_ms, frame in frames:
+                start = time.perf_counter()
+                landmarks.append(engine.detect(frame, timestamp_ms))
+                latencies.append((time.perf_counter() - start) * 1000)
+            if batches_frames(engine):
+                start = time.perf_counter()
+                engine.detect_batch([frame for _, frame in frames], [timestamp_ms for timestamp_ms, _ in frames])
+                batch_runs.append((time.perf_counter() - start) * 1000 / max(1, len(frames)))
+    finally:
+        engine.close()
+
+    report = {
+        "create_ms": round(create_ms, 3),
+        "frame_median_ms": round(statistics.median(latencies), 3) if latencies else 0.0,
+        "frame_p95_ms": round(percentile(latencies, 95), 3),
+        "frame_mean_ms": round(statistics.mean(latencies), 3) if latencies else 0.0,
+        "frames_with_hands": sum(record is not None for record in landmarks),
+    }
+    if batch_runs:
+        report["batch_size"] = engine.batch_size
+        report["batched_frame_median_ms"] = round(statistics.median(batch_runs), 3)
+    return report, landmarks
+
+
+def landmark_agreement(landmarks, reference):
+    """Mean point distance over the hands both sequences found in the same frame, None without overlap"""
+    distances = []
+    for record, reference_record in zip(landmarks, reference):
+        if record is None or reference_record is None:
+            continue
+        own, theirs = record.matching_points(reference_record)
+        if len(own):
+            distances.append(float(np.linalg.norm(own - theirs, axis=-1).mean()))
+    return round(statistics.mean(distances), 5) if distances else None
+
+
+def bench_video(spec, video_path, engines, interval, repeats):
+    frames = decode_timed_frames(video_path, interval)
+    reports, detections = {}, {}
+    for name in engines:
+        reports[name], detections[name] = run_engine(name, frames, repeats)
+
+    ran = {name: landmarks for name, landmarks in detections.items() if landmarks is not None}
+    # a frame counts as containing a hand if any engine found one there
+    any_hand = [any(landmarks[i] is not None for landmarks in ran.values()) for i in range(len(frames))]
+    positives = sum(any_hand)
+    reference = engines[0]
+    for name, landmarks in ran.items():
+        hits = sum(1 for i, record in enumerate(landmarks) if record is not None and any_hand[i])
+        reports[name]["recall"] = round(hits / positives, 4) if positives else None
+        if name != reference and reference in ran:
+            reports[name][f"agreement_vs_{reference}"] = landmark_agreement(landmarks, ran[reference])
+
+    return {"video": spec, "sampled_frames": len(frames), "frames_with_any_hand": positives, "engines": reports}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare hand landmark engines on latency and detection recall")
+    parser.add_argument("--engines", nargs="+", default=sorted(ENGINES), choices=sorted(ENGINES),
+                        help="engines to compare, the first one is the agreement reference")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[5], help="clip lengths in seconds")
+    parser.add_argument("--fps", type=int, nargs="+", default=[30], help="clip frame rates")
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 480], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--interval", type=int, default=6, help="sample every n-th frame, like FRAME_INTERVAL")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--recorded-dir", default=str(Path(__file__).resolve().parent / "sample_videos"),
+                        help="directory with recorded sample clips to include")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "signify_bench_videos"))
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    specs = synthetic_video_specs(args.lengths, args.fps, tuple(args.size), args.seed)
+    specs += recorded_video_specs(args.recorded_dir)
+
+    results = []
+    for spec in specs:
+        print(f"Benchmarking {spec['name']}...")
+        result = bench_video(spec, materialize(spec, args.cache_dir), args.engines, args.interval, args.repeats)
+        for name, report in result["engines"].items():
+            if "skipped" in report:
+                print(f"  {name:<10} skipped: {report['skipped']}")
+            else:
+                print(f"  {name:<10} median {report['frame_median_ms']:>8.2f} ms  p95 {report['frame_p95_ms']:>8.2f} ms"
+                      f"  recall {report['recall']}")
+        results.append(result)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    output = args.output or str(
+        Path(__file__).resolve().parent / "results" / f"engines_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Benchmark every stage of the gesture pipeline on deterministic videos.
+
+Times extract_frames, the S3 upload/download round trip, process_frames, select_optimal_frames,
+optimize_image_for_api and the full /process-video request for synthetic clips of several lengths
+and frame rates (plus any recorded clips in --recorded-dir). The frame selection is also rerun
+on the detected landmarks with and without landmark smoothing, to show how many selections
+landmark jitter accounts for. S3 and GPT are replaced by local
+stand-ins, so no credentials or network are needed. Results are written as JSON so runs can be
+compared across changes.
+
+Usage (from gpt-gesture-detection-service/):
+    python benchmarks/bench_pipeline.py --lengths 2 5 10 --fps 15 30 --repeats 3
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(SERVICE_DIR))
+
+# the stand-ins store objects under this bucket name
+os.environ.setdefault("S3_BUCKET_NAME", "benchmark-bucket")
+
+import cv2
+import video_hand_processing as service
+from tracing import parse_server_timing
+from fastapi.testclient import TestClient
+from frame_storage import create_frame_storage, LocalFrameStorage
+from hand_detection_service.landmark_store import LandmarkStore
+from stand_ins import InMemoryS3Client, StubOpenAIClient
+from synthetic_videos import synthetic_video_specs, recorded_video_specs, materialize
+
+
+def summarize(runs_ms):
+    return {
+        "runs_ms": [round(run, 3) for run in runs_ms],
+        "median_ms": round(statistics.median(runs_ms), 3),
+        "mean_ms": round(statistics.mean(runs_ms), 3),
+        "min_ms": round(min(runs_ms), 3),
+        "max_ms": round(max(runs_ms), 3),
+    }
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def decode_sampled_frames(video_path, interval):
+    """Decode the frames extract_frames would keep, with the service's sampler, without uploading them
+
+    Returns the frames and their positions in the video in ms.
+    """
+    cap = cv2.VideoCapture(video_path)
+    sampler = service.make_frame_sampler(interval)
+    frames = []
+    timestamps_ms = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if sampler.should_sample(frame):
+            frames.append(frame)
+            timestamps_ms.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+    cap.release()
+    return frames, timestamps_ms
+
+
+def bench_video(spec, video_path, s3_stand_in, http_client, repeats):
+    interval = service.VideoConstants.FRAME_INTERVAL
+    frames, timestamps_ms = decode_sampled_frames(video_path, interval)
+    storage = service.get_frame_storage()
+    stages = {}
+    counts = {"sampled_frames": len(frames)}
+
+    # extract_frames: decode + encode + upload to the frame storage
+    runs = []
+    for _ in range(repeats):
+        storage.delete_prefix("USER_DATA/")
+        s3_stand_in.reset_counts()
+        elapsed, (frame_keys, _) = timed(service.extract_frames, video_path)
+        runs.append(elapsed)
+    stages["extract_frames"] = summarize(runs)
+    counts["s3_requests_extract"] = dict(s3_stand_in.request_counts)
+
+    # storage round trip: encode and store every sampled frame, then load and decode them again
+    runs = []
+    for _ in range(repeats):
+        prefix = f"BENCH/{uuid.uuid4()}/"
+        start = time.perf_counter()
+        items = [(f"{prefix}frame_{i}.jpg", service.encode_frame(frame)) for i, frame in enumerate(frames)]
+        storage.put_many(items)
+        service.load_frames([key for key, _ in items])
+        runs.append((time.perf_counter() - start) * 1000)
+        storage.delete_prefix(prefix)
+    stages["storage_round_trip"] = summarize(runs)
+
+    # process_frames: MediaPipe detection and movement based selection on in-memory frames, with
+    # the service's ROI and static prefilter settings. Like the service the graphs are warm
+    # before the first timed run and the early frames of long sessions are skipped.
+    static_threshold = service.STATIC_FRAME_THRESHOLD if service.VideoConstants.STATIC_PREFILTER else None
+    service.warmup()
+    detection_frames = service.skip_early_frames(
+        [(f"frame_{i}", frame, timestamps_ms[i]) for i, frame in enumerate(frames)]
+    )
+    counts["detection_frames"] = len(detection_frames)
+    runs = []
+    for _ in range(repeats):
+        landmark_log = []
+        elapsed, selected = timed(
+            service.detect_frames, detection_frames,
+            threshold=service.VideoConstants.HAND_DETECTION_THRESHOLD, roi=service.VideoConstants.ROI_DETECTION,
+            static_threshold=static_threshold, landmark_log=landmark_log,
+        )
+        runs.append(elapsed)
+    stages["process_frames"] = summarize(runs)
+    counts["detection_selected_frames"] = len(selected)
+
+    # the same landmarks selected on the raw and on the One Euro smoothed trajectory
+    for smoothing in (False, True):
+        counts[f"selected_frames_{'smoothed' if smoothing else 'raw'}"] = len(service.select_from_landmarks(
+            landmark_log, threshold=service.VideoConstants.HAND_DETECTION_THRESHOLD, smoothing=smoothing,
+            timestamps_ms={f"frame_{i}": timestamp_ms for i, timestamp_ms in enumerate(timestamps_ms)},
+        ))
+    counts["smoothing_fewer_frames"] = counts["selected_frames_raw"] - counts["selected_frames_smoothed"]
+
+    # select_optimal_frames: run on every sampled frame so the cap is exercised on long clips
+    candidates = [service.SelectedFrame(f"frame_{i}", None, 0.0) for i in range(len(frames))]
+    runs = []
+    for _ in range(repeats):
+        elapsed, optimal = timed(service.select_optimal_frames, candidates)
+        runs.append(elapsed)
+    stages["select_optimal_frames"] = summarize(runs)
+    counts["optimal_frames"] = len(optimal)
+
+    # optimize_image_for_api: JPEG re-encode of the frames that would go to GPT
+    gpt_frames = frames[:service.VideoConstants.MAX_FRAMES]
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for frame in gpt_frames:
+            service.optimize_image_for_api(frame)
+        runs.append((time.perf_counter() - start) * 1000)
+    stages["optimize_image_for_api"] = summarize(runs)
+    stages["optimize_image_for_api"]["per_frame_ms"] = round(
+        stages["optimize_image_for_api"]["median_ms"] / max(1, len(gpt_frames)), 3
+    )
+
+    # end to end through the HTTP endpoint with the stubbed GPT
+    runs = []
+    server_timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = http_client.post("/process-video", json={"video_url": video_path, "target_word": "hello"})
+        runs.append((time.perf_counter() - start) * 1000)
+        if response.json().get("status") != "success":
+            print(f"  end to end run failed: {response.json()}")
+        server_timings.append(parse_server_timing(response.headers.get("server-timing")))
+    stages["end_to_end"] = summarize(runs)
+    stages["end_to_end"]["server_timing_ms"] = {
+        name: round(statistics.median(t.get(name, 0.0) for t in server_timings), 3)
+        for name in server_timings[-1]
+    }
+
+    return {"video": spec, "counts": counts, "stages": stages}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the gesture pipeline stages")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[2, 5, 10], help="clip lengths in seconds")
+    parser.add_argument("--fps", type=int, nargs="+", default=[15, 30], help="clip frame rates")
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 480], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--recorded-dir", default=str(Path(__file__).resolve().parent / "sample_videos"),
+                        help="directory with recorded sample clips to include")
+    parser.add_argument("--storage", choices=["s3", "local", "memory"], default="s3",
+                        help="frame storage backend, s3 runs against the in-memory S3 stand-in, "
+                             "local in a scratch directory")
+    parser.add_argument("--s3-latency-ms", type=float, default=0.0, help="simulated latency per S3 request")
+    parser.add_argument("--gpt-latency-ms", type=float, default=0.0, help="simulated GPT response time")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "signify_bench_videos"))
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--landmark-store", action="store_true",
+                        help="keep the landmark store on, repeated runs of a clip then skip MediaPipe")
+    args = parser.parse_args()
+
+    specs = synthetic_video_specs(args.lengths, args.fps, tuple(args.size), args.seed)
+    specs += recorded_video_specs(args.recorded_dir)
+
+    results = []
+    # local frames and stored landmarks live in a scratch directory, a run never touches the
+    # service's real storage directories and always starts from an empty landmark store
+    with tempfile.TemporaryDirectory(prefix="signify_bench_") as work_dir:
+        s3_stand_in = InMemoryS3Client(latency_ms=args.s3_latency_ms)
+        service.set_s3_client(s3_stand_in)
+        if args.storage == "local":
+            service.set_frame_storage(LocalFrameStorage(os.path.join(work_dir, "frames")))
+        else:
+            service.set_frame_storage(create_frame_storage(args.storage, s3_client_factory=service.get_s3_client,
+                                                           bucket=service.bucket_name))
+        service.set_openai_client(StubOpenAIClient(latency_ms=args.gpt_latency_ms))
+        service.VideoConstants.LANDMARK_STORE = args.landmark_store
+        service.set_landmark_store(LandmarkStore(os.path.join(work_dir, "landmarks")))
+        http_client = TestClient(service.app)
+
+        for spec in specs:
+            print(f"Benchmarking {spec['name']}...")
+            video_path = materialize(spec, args.cache_dir)
+            result = bench_video(spec, video_path, s3_stand_in, http_client, args.repeats)
+            for stage, summary in result["stages"].items():
+                print(f"  {stage:<24} median {summary['median_ms']:>10.2f} ms")
+            counts = result["counts"]
+            print(f"  selected frames          raw {counts['selected_frames_raw']}, smoothed "
+                  f"{counts['selected_frames_smoothed']} ({counts['smoothing_fewer_frames']} fewer)")
+            results.append(result)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    output = args.output or str(
+        Path(__file__).resolve().parent / "results" / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
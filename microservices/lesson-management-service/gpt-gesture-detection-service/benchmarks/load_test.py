@@ -0,0 +1,276 @@
+"""
+Load test for the gesture service.
+
+Replays the two-call flow of GestureQuestion.js (POST /upload-video with the recording, then
+POST /process-video with the returned server path) at a configurable concurrency and arrival
+rate, and reports throughput, p50/p95/p99 latency, error rate and a per-stage breakdown taken
+from the Server-Timing header.
+
+With --local the service is started in-process with the S3 and GPT stand-ins, otherwise the
+flow is run against --url.
+
+Usage (from gpt-gesture-detection-service/):
+    python benchmarks/load_test.py --local --concurrency 8 --rate 2 --duration 60
+    python benchmarks/load_test.py --url http://staging:8000 --concurrency 4 --sessions 100
+"""
+import os
+import sys
+import math
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+import httpx
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from tracing import parse_server_timing
+from synthetic_videos import write_synthetic_video
+
+# same limits as API.UPLOAD_TIMEOUT / API.PROCESS_TIMEOUT in the app
+UPLOAD_TIMEOUT = 30.0
+PROCESS_TIMEOUT = 60.0
+# the service's verdict when no frame of the upload had hands, e.g. because the upload was deleted
+NO_FRAMES_FEEDBACK = "No frames with hand gestures were detected in the video."
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile, None for an empty list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def latency_summary(values):
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": max(values) if values else None,
+    }
+
+
+def start_local_service(s3_latency_ms, gpt_latency_ms, landmark_store=False):
+    """Run the service in a background thread with local stand-ins, returns its base URL"""
+    os.environ.setdefault("S3_BUCKET_NAME", "load-test-bucket")
+    import uvicorn
+    import video_hand_processing as service
+    from stand_ins import InMemoryS3Client, StubOpenAIClient
+
+    service.set_s3_client(InMemoryS3Client(latency_ms=s3_latency_ms))
+    service.set_openai_client(StubOpenAIClient(latency_ms=gpt_latency_ms))
+    # every session uploads the same clip, with the landmark store on only the first one would run detection
+    service.VideoConstants.LANDMARK_STORE = landmark_store
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(service.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run_session(client, base_url, video_bytes, filename, target_word, arrived=None):
+    """One user attempt: upload then process, returns a result record
+
+    arrived is the perf_counter time the session arrived at, total_ms counts from there so the
+    time a session waited for a free slot is part of its latency (queued_ms).
+    """
+    record = {"ok": False, "queued_ms": 0.0, "upload_ms": None, "process_ms": None, "total_ms": None,
+              "stages": {}, "error": None}
+    start = time.perf_counter()
+    arrived = start if arrived is None else arrived
+    record["queued_ms"] = (start - arrived) * 1000
+    try:
+        upload = await client.post(
+            f"{base_url}/upload-video",
+            files={"file": (filename, video_bytes, "video/mp4")},
+            timeout=UPLOAD_TIMEOUT,
+        )
+        record["upload_ms"] = (time.perf_counter() - start) * 1000
+        if upload.status_code != 200:
+            record["error"] = f"upload HTTP {upload.status_code}"
+            return record
+
+        process_start = time.perf_counter()
+        process = await client.post(
+            f"{base_url}/process-video",
+            json={"video_url": upload.json()["video_server_path"], "target_word": target_word},
+            timeout=PROCESS_TIMEOUT,
+        )
+        record["process_ms"] = (time.perf_counter() - process_start) * 1000
+        record["stages"] = parse_server_timing(process.headers.get("server-timing"))
+        if process.status_code != 200:
+            record["error"] = f"process HTTP {process.status_code}"
+        elif process.json().get("status") != "success":
+            record["error"] = f"process status {process.json().get('status')}"
+        elif process.json()["analysis"].get("feedback") == NO_FRAMES_FEEDBACK:
+            # the service answered, but without frames the verdict says nothing about the attempt
+            record["error"] = "no frames"
+        else:
+            record["ok"] = True
+    except httpx.TimeoutException:
+        record["error"] = "timeout"
+    except httpx.HTTPError as e:
+        record["error"] = type(e).__name__
+    except (ValueError, KeyError, AttributeError) as e:
+        # a body that is not the expected JSON, e.g. a proxy's HTML error page
+        record["error"] = f"invalid response body ({type(e).__name__})"
+    finally:
+        record["total_ms"] = (time.perf_counter() - arrived) * 1000
+    return record
+
+
+async def generate_load(args, base_url, video_bytes):
+    """Start sessions at the requested arrival rate, never more than `concurrency` in flight"""
+    rng = random.Random(args.seed)
+    results = []
+    session_counter = 0
+    start = time.perf_counter()
+
+    def next_session():
+        nonlocal session_counter
+        if args.sessions and session_counter >= args.sessions:
+            return None
+        if not args.sessions and time.perf_counter() - start >= args.duration:
+            return None
+        session_counter += 1
+        return session_counter - 1
+
+    async def session(client, index, arrived=None):
+        # the service deletes every upload once a session is processed, with one shared filename
+        # a session can lose its video to the cleanup of another one
+        filename = "gesture.mp4" if args.shared_filename else f"gesture_{index}.mp4"
+        results.append(await run_session(client, base_url, video_bytes, filename, args.target_word, arrived))
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(limits=limits) as client:
+        if args.rate:
+            # open model, Poisson arrivals independent of how fast the service answers
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def guarded(index, arrived):
+                async with semaphore:
+                    await session(client, index, arrived)
+
+            tasks = []
+            while (index := next_session()) is not None:
+                tasks.append(asyncio.create_task(guarded(index, time.perf_counter())))
+                await asyncio.sleep(rng.expovariate(args.rate))
+            await asyncio.gather(*tasks)
+        else:
+            # closed model, every virtual user starts a new session as soon as the last one ends
+            async def virtual_user():
+                while (index := next_session()) is not None:
+                    await session(client, index)
+
+            await asyncio.gather(*(virtual_user() for _ in range(args.concurrency)))
+    return results, time.perf_counter() - start
+
+
+def build_report(results, wall_time, args):
+    ok = [r for r in results if r["ok"]]
+    errors = {}
+    for r in results:
+        if r["error"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+
+    stage_names = []
+    for r in ok:
+        for name in r["stages"]:
+            if name not in stage_names:
+                stage_names.append(name)
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "video"},
+        "sessions": len(results),
+        "succeeded": len(ok),
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else None,
+        "errors": errors,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_per_s": round(len(ok) / wall_time, 3) if wall_time else None,
+        "latency": {
+            "queued": latency_summary([r["queued_ms"] for r in ok]),
+            "upload": latency_summary([r["upload_ms"] for r in ok]),
+            "process": latency_summary([r["process_ms"] for r in ok]),
+            "total": latency_summary([r["total_ms"] for r in ok]),
+        },
+        "stages": {
+            name: latency_summary([r["stages"][name] for r in ok if name in r["stages"]])
+            for name in stage_names
+        },
+    }
+
+
+def print_report(report):
+    print(f"\nSessions: {report['sessions']}  succeeded: {report['succeeded']}  "
+          f"error rate: {report['error_rate']:.2%}  throughput: {report['throughput_per_s']}/s")
+    if report["errors"]:
+        print(f"Errors: {report['errors']}")
+    print(f"{'':<36}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    rows = [(name, summary) for name, summary in report["latency"].items()]
+    rows += [(f"  stage {name}", summary) for name, summary in report["stages"].items()]
+    for name, summary in rows:
+        values = [summary[k] for k in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{name:<36}" + "".join(f"{v:>10.1f}" if v is not None else f"{'-':>10}" for v in values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /upload-video + /process-video")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running gesture service")
+    target.add_argument("--local", action="store_true", help="start the service in-process with stand-ins")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximum sessions in flight")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="session arrivals per second (default: closed loop at full concurrency)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to generate load for")
+    parser.add_argument("--sessions", type=int, default=None, help="stop after this many sessions instead")
+    parser.add_argument("--video", default=None, help="clip to upload (default: a 3s synthetic clip)")
+    parser.add_argument("--target-word", default="hello")
+    parser.add_argument("--shared-filename", action="store_true",
+                        help="upload every session as gesture.mp4 like the app does, instead of one name per session")
+    parser.add_argument("--s3-latency-ms", type=float, default=20.0, help="stand-in S3 latency (--local)")
+    parser.add_argument("--gpt-latency-ms", type=float, default=2500.0, help="stand-in GPT latency (--local)")
+    parser.add_argument("--landmark-store", action="store_true",
+                        help="keep the landmark store on (--local), repeated uploads then skip MediaPipe")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    video = args.video or write_synthetic_video(
+        os.path.join(tempfile.gettempdir(), "signify_bench_videos", "load_test_3s_30fps.mp4"), 3, 30
+    )
+    with open(video, "rb") as f:
+        video_bytes = f.read()
+
+    base_url = (
+        start_local_service(args.s3_latency_ms, args.gpt_latency_ms, args.landmark_store)
+        if args.local else args.url.rstrip("/")
+    )
+    print(f"Generating load against {base_url} (concurrency {args.concurrency}, "
+          f"{f'{args.rate}/s arrivals' if args.rate else 'closed loop'})")
+
+    results, wall_time = asyncio.run(generate_load(args, base_url, video_bytes))
+    report = build_report(results, wall_time, args)
+    print_report(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Local stand-ins for the external services used by the gesture pipeline.
+
+InMemoryS3Client implements the subset of the boto3 S3 client API the service uses and keeps
+objects in a dict, StubOpenAIClient answers chat completions with a canned verdict. Both can add
+an artificial latency per call so benchmark and load test numbers include a realistic network cost.
+"""
+import io
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+
+class InMemoryS3Client:
+    """Thread-safe in-memory replacement for boto3.client('s3')"""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.objects = {}
+        self.modified = {}
+        self.request_counts = {}
+        self._lock = threading.Lock()
+
+    def _request(self, operation):
+        with self._lock:
+            self.request_counts[operation] = self.request_counts.get(operation, 0) + 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def upload_fileobj(self, fileobj, bucket, key, **kwargs):
+        self._request("PutObject")
+        data = fileobj.read()
+        with self._lock:
+            self.objects[(bucket, key)] = bytes(data)
+            self.modified[(bucket, key)] = datetime.now(timezone.utc)
+
+    def put_object(self, Bucket, Key, Body=b"", **kwargs):
+        self._request("PutObject")
+        data = Body.read() if hasattr(Body, "read") else Body
+        with self._lock:
+            self.objects[(Bucket, Key)] = bytes(data)
+            self.modified[(Bucket, Key)] = datetime.now(timezone.utc)
+        return {}
+
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        self._request("GetObject")
+        with self._lock:
+            data = self.objects.get((Bucket, Key))
+        if data is None:
+            raise KeyError(f"NoSuchKey: {Key}")
+        if Range:
+            # only the "bytes=start-end" form is supported, end is inclusive like in S3
+            start, end = Range.replace("bytes=", "").split("-")
+            data = data[int(start):int(end) + 1 if end else None]
+        return {"Body": io.BytesIO(data), "ContentLength": len(data)}
+
+    def list_objects_v2(self, Bucket, Prefix="", **kwargs):
+        self._request("ListObjectsV2")
+        with self._lock:
+            contents = [
+                {"Key": key, "Size": len(data), "LastModified": self.modified[(bucket, key)]}
+                for (bucket, key), data in sorted(self.objects.items())
+                if bucket == Bucket and key.startswith(Prefix)
+            ]
+        return {"Contents": contents, "KeyCount": len(contents), "IsTruncated": False}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        self._request("DeleteObjects")
+        deleted = []
+        with self._lock:
+            for item in Delete.get("Objects", []):
+                self.modified.pop((Bucket, item["Key"]), None)
+                if self.objects.pop((Bucket, item["Key"]), None) is not None:
+                    deleted.append({"Key": item["Key"]})
+        return {"Deleted": deleted}
+
+    def reset_counts(self):
+        with self._lock:
+            self.request_counts = {}
+
+
+class StubOpenAIClient:
+    """Replacement for openai.OpenAI that returns a fixed verdict without calling the API"""
+
+    def __init__(self, answer="YES", latency_ms=0.0):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self._answer = answer
+        self._latency_ms = latency_ms
+        self._lock = threading.Lock()
+
+    def _create(self, model=None, messages=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self._latency_ms:
+            time.sleep(self._latency_ms / 1000)
+        images = sum(
+            1 for part in messages[0]["content"] if part.get("type") == "image_url"
+        ) if messages else 0
+        content = json.dumps({
+            "explanation": f"Stubbed verdict for {images} images",
+            "answer": self._answer,
+            "feedback": "" if self._answer == "YES" else "Stubbed negative verdict.",
+        })
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=85 * images + 300, completion_tokens=40),
+        )
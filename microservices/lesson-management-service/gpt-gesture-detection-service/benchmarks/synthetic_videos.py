@@ -0,0 +1,88 @@
+"""
+Deterministic test videos for the benchmarks.
+
+Synthetic videos draw a skin coloured hand-like shape (palm and five fingers) moving over a
+noisy background. The same (seconds, fps, size, seed) always produces the same frames, so
+timings are comparable across changes. Note that MediaPipe will usually not detect a hand in
+the synthetic clips, recorded clips are needed to exercise the landmark path realistically.
+"""
+import os
+import math
+import glob
+import numpy as np
+import cv2
+
+SKIN_COLOR = (140, 170, 215)  # BGR
+RECORDED_EXTENSIONS = (".mp4", ".mov", ".avi", ".webm")
+
+
+def synthetic_frame(index, fps, size=(640, 480), seed=0):
+    """Render frame `index` of the synthetic clip"""
+    width, height = size
+    rng = np.random.RandomState(seed * 100003 + index)
+    frame = rng.randint(30, 60, size=(height, width, 3)).astype(np.uint8)
+
+    # the "hand" waves left and right once per second and slowly opens and closes its fingers
+    t = index / fps
+    center_x = int(width / 2 + width / 4 * math.sin(2 * math.pi * t))
+    center_y = int(height * 0.6 + height / 10 * math.sin(math.pi * t))
+    palm = int(min(width, height) * 0.12)
+    spread = 0.25 + 0.15 * math.sin(math.pi * t / 2)
+
+    cv2.ellipse(frame, (center_x, center_y), (palm, int(palm * 1.2)), 0, 0, 360, SKIN_COLOR, -1)
+    for finger in range(5):
+        angle = -math.pi / 2 + (finger - 2) * spread
+        length = palm * (1.6 if finger in (1, 2, 3) else 1.2)
+        tip = (int(center_x + length * math.cos(angle)), int(center_y + length * math.sin(angle)))
+        cv2.line(frame, (center_x, center_y), tip, SKIN_COLOR, max(4, palm // 4))
+    return frame
+
+
+def write_synthetic_video(path, seconds, fps, size=(640, 480), seed=0):
+    """Write a synthetic clip to `path` (reused if it already exists), returns the path"""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for index in range(int(seconds * fps)):
+        writer.write(synthetic_frame(index, fps, size, seed))
+    writer.release()
+    return path
+
+
+def synthetic_video_specs(lengths, frame_rates, size=(640, 480), seed=0):
+    """Spec dicts for every (length, fps) combination"""
+    return [
+        {"kind": "synthetic", "seconds": seconds, "fps": fps, "size": list(size), "seed": seed,
+         "name": f"synthetic_{seconds}s_{fps}fps_{size[0]}x{size[1]}"}
+        for seconds in lengths
+        for fps in frame_rates
+    ]
+
+
+def recorded_video_specs(recorded_dir):
+    """Spec dicts for the recorded sample clips found in `recorded_dir`"""
+    if not recorded_dir or not os.path.isdir(recorded_dir):
+        return []
+    specs = []
+    for path in sorted(glob.glob(os.path.join(recorded_dir, "*"))):
+        if not path.lower().endswith(RECORDED_EXTENSIONS):
+            continue
+        cap = cv2.VideoCapture(path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        size = [int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))]
+        cap.release()
+        specs.append({
+            "kind": "recorded", "path": path, "name": os.path.splitext(os.path.basename(path))[0],
+            "fps": round(fps, 2), "seconds": round(frames / fps, 2) if fps else None, "size": size,
+        })
+    return specs
+
+
+def materialize(spec, cache_dir):
+    """Return a local video path for a spec, rendering synthetic clips into `cache_dir`"""
+    if spec["kind"] == "recorded":
+        return spec["path"]
+    path = os.path.join(cache_dir, spec["name"] + f"_seed{spec['seed']}.mp4")
+    return write_synthetic_video(path, spec["seconds"], spec["fps"], tuple(spec["size"]), spec["seed"])
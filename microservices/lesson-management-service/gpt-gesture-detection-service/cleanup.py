@@ -0,0 +1,159 @@
+"""
+Garbage collection of session data.
+
+Every /process-video request leaves frames below USER_DATA/<uuid>/ in the frame storage and,
+depending on the pipeline, a /tmp/USER_DATA_<uuid>_ working directory. The SessionJanitor
+removes both:
+
+    - after the verdict, the session frames are deleted right away or, with
+      FRAME_RETENTION_SECONDS > 0, once the retention period has passed
+    - a background sweep deletes sessions nobody finished (crashed requests, restarts) once they
+      are older than FRAME_ORPHAN_MAX_AGE_SECONDS, and local temp dirs older than
+      TEMP_DIR_MAX_AGE_SECONDS
+
+Reclaimed objects and bytes are logged and kept as running totals in SessionJanitor.totals.
+"""
+import os
+import time
+import glob
+import shutil
+import tempfile
+import threading
+
+SESSION_ROOT = "USER_DATA/"
+
+
+class RetentionPolicy:
+    def __init__(self, frame_retention_seconds=0, orphan_max_age_seconds=3600,
+                 temp_dir_max_age_seconds=3600, sweep_interval_seconds=600):
+        self.frame_retention_seconds = frame_retention_seconds
+        # never sweep a session that could still be in flight
+        self.orphan_max_age_seconds = max(orphan_max_age_seconds, frame_retention_seconds)
+        self.temp_dir_max_age_seconds = temp_dir_max_age_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            frame_retention_seconds=float(os.getenv("FRAME_RETENTION_SECONDS", "0")),
+            orphan_max_age_seconds=float(os.getenv("FRAME_ORPHAN_MAX_AGE_SECONDS", "3600")),
+            temp_dir_max_age_seconds=float(os.getenv("TEMP_DIR_MAX_AGE_SECONDS", "3600")),
+            sweep_interval_seconds=float(os.getenv("CLEANUP_SWEEP_INTERVAL_SECONDS", "600")),
+        )
+
+
+def session_temp_dir(session_prefix, temp_root=None):
+    """Local working directory of a session, e.g. /tmp/USER_DATA_<uuid>_"""
+    return os.path.join(temp_root or tempfile.gettempdir(), session_prefix.replace("/", "_"))
+
+
+def directory_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+
+def remove_directory(path):
+    """Remove a directory tree, returns the bytes reclaimed"""
+    if not os.path.isdir(path):
+        return 0
+    size = directory_size(path)
+    shutil.rmtree(path, ignore_errors=True)
+    return size
+
+
+class SessionJanitor:
+    def __init__(self, storage_factory, policy=None, temp_root=None):
+        # the storage is resolved on every use so injected backends are picked up
+        self._storage_factory = storage_factory
+        self.policy = policy or RetentionPolicy.from_env()
+        self.temp_root = temp_root or tempfile.gettempdir()
+        self._pending = {}  # session prefix -> time after which it may be deleted
+        self._lock = threading.Lock()
+        self.totals = {"objects_deleted": 0, "storage_bytes_reclaimed": 0,
+                       "temp_dirs_removed": 0, "temp_bytes_reclaimed": 0}
+
+    def _record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self.totals[name] += value
+
+    def delete_session(self, session_prefix):
+        """Delete the stored frames and the local temp dir of one session"""
+        objects, storage_bytes = self._storage_factory().delete_prefix(session_prefix)
+        temp_bytes = remove_directory(session_temp_dir(session_prefix, self.temp_root))
+        self._record(objects_deleted=objects, storage_bytes_reclaimed=storage_bytes,
+                     temp_dirs_removed=1 if temp_bytes else 0, temp_bytes_reclaimed=temp_bytes)
+        return objects, storage_bytes + temp_bytes
+
+    def session_finished(self, session_prefix):
+        """Called once a verdict has been returned for the session"""
+        # the local working copy is never needed again
+        temp_bytes = remove_directory(session_temp_dir(session_prefix, self.temp_root))
+        if temp_bytes:
+            self._record(temp_dirs_removed=1, temp_bytes_reclaimed=temp_bytes)
+
+        if self.policy.frame_retention_seconds > 0:
+            with self._lock:
+                self._pending[session_prefix] = time.time() + self.policy.frame_retention_seconds
+            return
+        try:
+            objects, reclaimed = self.delete_session(session_prefix)
+            print(f"Cleaned up session {session_prefix}: {objects} objects, {reclaimed} bytes reclaimed")
+        except Exception as e:
+            # the orphan sweep will pick the session up later
+            print(f"Error cleaning up session {session_prefix}: {e}")
+
+    def sweep(self):
+        """Delete expired and orphaned sessions plus stale temp dirs, returns what was reclaimed"""
+        now = time.time()
+        report = {"sessions": 0, "objects": 0, "storage_bytes": 0, "temp_dirs": 0, "temp_bytes": 0}
+
+        # sessions whose retention period is over
+        with self._lock:
+            due = [prefix for prefix, deadline in self._pending.items() if deadline <= now]
+            for prefix in due:
+                del self._pending[prefix]
+
+        # sessions nobody finished, grouped by USER_DATA/<uuid>/ and judged by their newest object
+        storage = self._storage_factory()
+        newest = {}
+        for key, (_, modified) in storage.list_objects(SESSION_ROOT).items():
+            prefix = SESSION_ROOT + key[len(SESSION_ROOT):].split("/", 1)[0] + "/"
+            newest[prefix] = max(newest.get(prefix, 0), modified)
+        with self._lock:
+            pending = set(self._pending)
+        for prefix, modified in newest.items():
+            if prefix not in pending and prefix not in due and now - modified > self.policy.orphan_max_age_seconds:
+                due.append(prefix)
+
+        for prefix in due:
+            try:
+                objects, storage_bytes = storage.delete_prefix(prefix)
+            except Exception as e:
+                print(f"Error deleting session {prefix}: {e}")
+                continue
+            report["sessions"] += 1
+            report["objects"] += objects
+            report["storage_bytes"] += storage_bytes
+
+        # local working directories left behind by crashed or killed requests
+        for path in glob.glob(os.path.join(self.temp_root, SESSION_ROOT.replace("/", "_") + "*")):
+            try:
+                if now - os.path.getmtime(path) > self.policy.temp_dir_max_age_seconds:
+                    report["temp_bytes"] += remove_directory(path)
+                    report["temp_dirs"] += 1
+            except OSError as e:
+                print(f"Error removing temp dir {path}: {e}")
+
+        self._record(objects_deleted=report["objects"], storage_bytes_reclaimed=report["storage_bytes"],
+                     temp_dirs_removed=report["temp_dirs"], temp_bytes_reclaimed=report["temp_bytes"])
+        if report["sessions"] or report["temp_dirs"]:
+            print(f"Cleanup sweep: {report['sessions']} sessions ({report['objects']} objects, "
+                  f"{report['storage_bytes']} bytes), {report['temp_dirs']} temp dirs ({report['temp_bytes']} bytes)")
+        return report
@@ -0,0 +1,202 @@
+"""
+Session archive: all sampled frames of one video in a single storage object.
+
+Storing every frame as its own object costs one PUT and one GET per frame. The archive packs
+the JPEG frames into one indexed blob that is written with a single (multipart) upload, and
+individual frames can still be read with ranged GETs.
+
+Layout (little endian):
+
+    magic   4 bytes   b"SFA1"
+    count   uint32    number of frames
+    index   count x (uint64 offset, uint32 length), offsets are absolute
+    data    the JPEG payloads back to back
+
+Frames inside an archive are referenced as "<archive key>#frame_<index>.jpg", so the existing
+"frame_<n>" ordering of frame keys keeps working. The name can carry the position of the frame
+in its video, "frame_<index>.t<ms>.jpg" (see frame_name), which the archive itself does not store.
+
+ArchiveWriter builds an archive while the video is still being decoded: the payloads go to a
+temporary file (kept in memory up to ARCHIVE_SPOOL_BYTES) and only the index stays in memory,
+so a long video never holds all of its frames, or a second packed copy of them, in memory.
+"""
+import io
+import os
+import struct
+import tempfile
+
+ARCHIVE_MAGIC = b"SFA1"
+ARCHIVE_NAME = "frames.sfa"
+_HEADER = struct.Struct("<4sI")
+_INDEX_ENTRY = struct.Struct("<QI")
+# the first ranged GET reads the index of up to this many frames, longer sessions need a second one
+HEADER_PROBE_FRAMES = 512
+# requested frames closer together than this are fetched with one ranged GET
+RANGE_MERGE_GAP = 256 * 1024
+# payload bytes an ArchiveWriter keeps in memory before it spills them to a temporary file
+ARCHIVE_SPOOL_BYTES = int(os.getenv("FRAME_ARCHIVE_SPOOL_BYTES", str(4 * 1024 * 1024)))
+
+
+class ArchiveFormatError(ValueError):
+    pass
+
+
+def pack_frames(frames):
+    """Pack a list of encoded frames (bytes) into an archive blob"""
+    index_size = _HEADER.size + _INDEX_ENTRY.size * len(frames)
+    parts = [_HEADER.pack(ARCHIVE_MAGIC, len(frames))]
+    offset = index_size
+    for data in frames:
+        parts.append(_INDEX_ENTRY.pack(offset, len(data)))
+        offset += len(data)
+    parts.extend(frames)
+    return b"".join(parts)
+
+
+class _ChainedReader(io.RawIOBase):
+    """Read-only stream over several file objects one after the other"""
+
+    def __init__(self, parts):
+        self._parts = list(parts)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._parts:
+            data = self._parts[0].read(len(buffer))
+            if data:
+                buffer[:len(data)] = data
+                return len(data)
+            self._parts.pop(0)
+        return 0
+
+
+class ArchiveWriter:
+    """
+    Builds an archive frame by frame, the result is the same as pack_frames of all frames.
+
+    add() appends a frame and returns its index, open() returns a readable stream of the
+    finished archive (header, index, payloads) for FrameStorage.put_stream. The index depends
+    on the frame count, so it is only generated when the archive is read.
+    """
+
+    def __init__(self, spool_bytes=ARCHIVE_SPOOL_BYTES):
+        self._payloads = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        self._lengths = []
+        self.payload_bytes = 0
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, data):
+        self._payloads.write(data)
+        self._lengths.append(len(data))
+        self.payload_bytes += len(data)
+        return len(self._lengths) - 1
+
+    @property
+    def size(self):
+        """Size of the finished archive in bytes"""
+        return _HEADER.size + _INDEX_ENTRY.size * len(self._lengths) + self.payload_bytes
+
+    def header(self):
+        """Header and index of the archive as it stands"""
+        parts = [_HEADER.pack(ARCHIVE_MAGIC, len(self._lengths))]
+        offset = _HEADER.size + _INDEX_ENTRY.size * len(self._lengths)
+        for length in self._lengths:
+            parts.append(_INDEX_ENTRY.pack(offset, length))
+            offset += length
+        return b"".join(parts)
+
+    def open(self):
+        """Readable stream of the complete archive, read it once before adding more frames"""
+        self._payloads.flush()
+        self._payloads.seek(0)
+        return io.BufferedReader(_ChainedReader([io.BytesIO(self.header()), self._payloads]))
+
+    def close(self):
+        self._payloads.close()
+
+
+def frame_name(index, timestamp_ms=None):
+    """File name of a sampled frame: frame_<index>.jpg, or frame_<index>.t<ms>.jpg with its position in the video"""
+    if timestamp_ms is None:
+        return f"frame_{index}.jpg"
+    return f"frame_{index}.t{round(timestamp_ms)}.jpg"
+
+
+def frame_ref(archive_key, index, timestamp_ms=None):
+    return f"{archive_key}#{frame_name(index, timestamp_ms)}"
+
+
+def parse_frame_ref(ref):
+    """Return (archive key, frame index) for an archive frame reference, None for plain keys"""
+    archive_key, sep, name = ref.partition("#")
+    if not sep or not name.startswith("frame_"):
+        return None
+    return archive_key, int(name[len("frame_"):].split(".")[0])
+
+
+def _parse_header(blob):
+    if len(blob) < _HEADER.size:
+        raise ArchiveFormatError("Archive is truncated")
+    magic, count = _HEADER.unpack_from(blob, 0)
+    if magic != ARCHIVE_MAGIC:
+        raise ArchiveFormatError(f"Not a frame archive (magic {magic!r})")
+    return count, _HEADER.size + _INDEX_ENTRY.size * count
+
+
+def read_index(storage, archive_key):
+    """Read the offset table of an archive with ranged GETs, returns [(offset, length), ...]"""
+    probe = storage.get_range(archive_key, 0, _HEADER.size + _INDEX_ENTRY.size * HEADER_PROBE_FRAMES - 1)
+    count, index_end = _parse_header(probe)
+    if len(probe) < index_end:
+        probe += storage.get_range(archive_key, len(probe), index_end - 1)
+    return [_INDEX_ENTRY.unpack_from(probe, _HEADER.size + i * _INDEX_ENTRY.size) for i in range(count)]
+
+
+def unpack_frames(blob):
+    """Split a complete archive blob back into the list of encoded frames"""
+    count, _ = _parse_header(blob)
+    frames = []
+    for i in range(count):
+        offset, length = _INDEX_ENTRY.unpack_from(blob, _HEADER.size + i * _INDEX_ENTRY.size)
+        frames.append(blob[offset:offset + length])
+    return frames
+
+
+def read_frames(storage, archive_key, indices, index=None):
+    """Read the given frames of an archive, returns {index: bytes}
+
+    Neighbouring frames are merged into one ranged GET, so loading a whole session costs two
+    requests (index and data) and a single frame costs two small ones. Pass the result of
+    read_index as index to skip re-reading it when an archive is read in several windows.
+    """
+    if index is None:
+        index = read_index(storage, archive_key)
+    wanted = sorted({i for i in indices if 0 <= i < len(index)})
+    frames = {}
+
+    # group the requested frames into contiguous byte ranges
+    ranges = []
+    for i in wanted:
+        offset, length = index[i]
+        if ranges and offset - ranges[-1][1] <= RANGE_MERGE_GAP:
+            ranges[-1][1] = offset + length
+            ranges[-1][2].append(i)
+        else:
+            ranges.append([offset, offset + length, [i]])
+
+    for start, end, members in ranges:
+        blob = storage.get_range(archive_key, start, end - 1)
+        for i in members:
+            offset, length = index[i]
+            frames[i] = blob[offset - start:offset - start + length]
+    return frames
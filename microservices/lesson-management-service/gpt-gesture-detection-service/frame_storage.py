@@ -0,0 +1,288 @@
+"""
+Storage backends for the encoded (JPEG) frames of a video session.
+
+Frames are addressed by keys like "USER_DATA/<uuid>/frame_3.jpg". The pipeline only talks to the
+FrameStorage interface, the backend is picked with FRAME_STORAGE_BACKEND:
+
+    s3      - S3 bucket, batch operations run concurrently (default)
+    local   - files below FRAME_STORAGE_DIR, point it at tmpfs (/dev/shm) to skip S3 entirely
+    memory  - in-process dict, for tests and benchmarks
+"""
+import os
+import shutil
+import tempfile
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+S3_DELETE_BATCH_SIZE = 1000
+# objects above this size are uploaded as multipart uploads
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+
+
+class FrameStorage:
+    """Interface of a frame store, subclasses implement put/get/list_objects/delete"""
+
+    name = "base"
+
+    def put(self, key, data):
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return the stored bytes, raises KeyError if the key does not exist"""
+        raise NotImplementedError
+
+    def list_objects(self, prefix):
+        """Return {key: (size_in_bytes, last_modified_epoch)} for every object below prefix"""
+        raise NotImplementedError
+
+    def delete(self, keys):
+        """Delete the given keys, returns the number of objects deleted"""
+        raise NotImplementedError
+
+    def get_range(self, key, start, end):
+        """Return bytes start..end (inclusive, like an HTTP Range) of an object"""
+        return self.get(key)[start:end + 1]
+
+    def put_stream(self, key, fileobj):
+        """Store the contents of a readable file object, backends can upload it without reading it into memory"""
+        self.put(key, fileobj.read())
+
+    def list_keys(self, prefix):
+        """Return {key: size_in_bytes} for every object below prefix"""
+        return {key: size for key, (size, _) in self.list_objects(prefix).items()}
+
+    def put_many(self, items):
+        """Store an iterable of (key, data) pairs"""
+        for key, data in items:
+            self.put(key, data)
+
+    def get_many(self, keys):
+        """Return the bytes for every key in order, None for keys that could not be read"""
+        return [self._get_or_none(key) for key in keys]
+
+    def delete_prefix(self, prefix):
+        """Delete everything below prefix, returns (objects deleted, bytes reclaimed)"""
+        objects = self.list_keys(prefix)
+        if not objects:
+            return 0, 0
+        deleted = self.delete(list(objects))
+        return deleted, sum(objects.values())
+
+    def _get_or_none(self, key):
+        try:
+            return self.get(key)
+        except Exception as e:
+            print(f"Failed to read {key} from {self.name} storage: {e}")
+            return None
+
+
+class InMemoryFrameStorage(FrameStorage):
+    name = "memory"
+
+    def __init__(self):
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, data):
+        with self._lock:
+            self._objects[key] = (bytes(data), time.time())
+
+    def get(self, key):
+        with self._lock:
+            return self._objects[key][0]
+
+    def list_objects(self, prefix):
+        with self._lock:
+            return {
+                key: (len(data), modified)
+                for key, (data, modified) in self._objects.items() if key.startswith(prefix)
+            }
+
+    def delete(self, keys):
+        with self._lock:
+            return sum(1 for key in keys if self._objects.pop(key, None) is not None)
+
+
+class LocalFrameStorage(FrameStorage):
+    name = "local"
+
+    def __init__(self, root_dir):
+        self.root_dir = os.path.abspath(root_dir)
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root_dir, key))
+        if not path.startswith(self.root_dir + os.sep):
+            raise ValueError(f"Key escapes the storage directory: {key}")
+        return path
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temp file first so readers never see a partially written frame
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put_stream(self, key, fileobj):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def get_range(self, key, start, end):
+        try:
+            with open(self._path(key), "rb") as f:
+                f.seek(start)
+                return f.read(end - start + 1)
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def list_objects(self, prefix):
+        objects = {}
+        # walk the directory of the prefix and filter, prefixes usually end with "/"
+        base_dir = os.path.dirname(self._path(prefix + "x"))
+        if not os.path.isdir(base_dir):
+            return objects
+        for dirpath, _, filenames in os.walk(base_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.root_dir).replace(os.sep, "/")
+                if key.startswith(prefix) and not filename.endswith(".tmp"):
+                    stat = os.stat(path)
+                    objects[key] = (stat.st_size, stat.st_mtime)
+        return objects
+
+    def delete(self, keys):
+        deleted = 0
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def delete_prefix(self, prefix):
+        deleted, reclaimed = super().delete_prefix(prefix)
+        # drop the now empty session directory as well
+        session_dir = os.path.dirname(self._path(prefix + "x"))
+        if session_dir != self.root_dir and os.path.isdir(session_dir) and not os.listdir(session_dir):
+            shutil.rmtree(session_dir, ignore_errors=True)
+        return deleted, reclaimed
+
+
+class S3FrameStorage(FrameStorage):
+    """S3 backend, put_many/get_many run the requests on a thread pool"""
+
+    name = "s3"
+
+    def __init__(self, client_factory, bucket, max_workers=16):
+        # the client is resolved through the factory on every call so injected clients are picked up
+        self._client_factory = client_factory
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client_factory()
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="s3-frames")
+            return self._executor
+
+    def put(self, key, data):
+        content_type = "image/jpeg" if key.endswith(".jpg") else "application/octet-stream"
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+
+    def get(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def get_range(self, key, start, end):
+        return self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}")["Body"].read()
+
+    def put_stream(self, key, fileobj):
+        # upload_fileobj reads the stream part by part, objects above the threshold become
+        # multipart uploads and at most max_concurrency parts are buffered at a time
+        from boto3.s3.transfer import TransferConfig
+        config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=S3_MULTIPART_THRESHOLD,
+            max_concurrency=self.max_workers,
+        )
+        self.client.upload_fileobj(fileobj, self.bucket, key, Config=config)
+
+    def put_many(self, items):
+        items = list(items)
+        if len(items) <= 1:
+            return super().put_many(items)
+        # list() re-raises the first failed upload
+        list(self._pool().map(lambda item: self.put(*item), items))
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if len(keys) <= 1:
+            return super().get_many(keys)
+        return list(self._pool().map(self._get_or_none, keys))
+
+    def list_objects(self, prefix):
+        objects = {}
+        kwargs = {"Bucket": self.bucket, "Prefix": prefix}
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            for item in response.get("Contents", []):
+                modified = item.get("LastModified")
+                objects[item["Key"]] = (item.get("Size", 0), modified.timestamp() if modified else time.time())
+            if not response.get("IsTruncated"):
+                return objects
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    def delete(self, keys):
+        deleted = 0
+        keys = list(keys)
+        for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            batch = keys[start:start + S3_DELETE_BATCH_SIZE]
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": False},
+            )
+            deleted += len(response.get("Deleted", []))
+            for error in response.get("Errors", []):
+                print(f"Failed to delete {error.get('Key')}: {error.get('Message')}")
+        return deleted
+
+
+def default_local_storage_dir():
+    # tmpfs keeps frames in memory when it is available
+    base_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base_dir, "signify_frames")
+
+
+def create_frame_storage(backend, s3_client_factory=None, bucket=None):
+    """Build the backend named by FRAME_STORAGE_BACKEND"""
+    backend = (backend or "s3").lower()
+    if backend == "s3":
+        return S3FrameStorage(
+            s3_client_factory, bucket, max_workers=int(os.getenv("S3_MAX_CONCURRENCY", "16"))
+        )
+    if backend == "local":
+        return LocalFrameStorage(os.getenv("FRAME_STORAGE_DIR") or default_local_storage_dir())
+    if backend == "memory":
+        return InMemoryFrameStorage()
+    raise ValueError(f"Unknown frame storage backend: {backend}")
@@ -0,0 +1,50 @@
+"""
+Production server config for the gesture service.
+
+    gunicorn -c gunicorn.conf.py video_hand_processing:app
+
+The app module and the libraries it imports lazily (cv2, MediaPipe, PIL) are loaded once in the
+master before the workers are forked, so those pages are shared copy-on-write. Everything with
+threads or sockets is built after the fork in every worker: the S3 and OpenAI clients (their
+connection pools are not fork-safe) and the MediaPipe graphs (a pool of HAND_DETECTION_POOL_SIZE
+per worker for uploads plus LIVE_DETECTION_POOL_SIZE for live streams), and every worker runs a warmup inference on each graph before it accepts requests.
+On SIGTERM workers stop accepting connections and get GRACEFUL_TIMEOUT seconds to finish the
+requests they are handling.
+"""
+import os
+import multiprocessing
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+
+# detection is CPU bound and single threaded per graph, so one worker per core
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# every worker keeps a pool of MediaPipe graphs for concurrent sessions, split the cores between them
+os.environ.setdefault("HAND_DETECTION_POOL_SIZE", str(max(1, multiprocessing.cpu_count() // workers)))
+
+preload_app = True
+
+# a /process-video request can take well over the 30s default while GPT answers
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "60"))
+keepalive = 5
+
+
+def when_ready(server):
+    # with preload_app the app is already imported in the master, pull in the lazily imported
+    # libraries too so the forked workers share them. No clients here, they must not cross the fork
+    from video_hand_processing import preload_libraries
+
+    preload_libraries()
+    server.log.info("Libraries preloaded")
+
+
+def post_worker_init(worker):
+    # runs inside the worker before it starts serving, so it only reports ready once warm
+    from hand_detection_service import warmup
+    from video_hand_processing import build_clients
+
+    build_clients()
+    warmup()
+    worker.log.info("Worker %s warmed up", worker.pid)
@@ -0,0 +1,165 @@
+"""
+Tracing helpers for the gesture pipeline.
+
+Each pipeline stage is wrapped in a span(). When the OpenTelemetry SDK is installed the spans
+are exported to an OTLP collector (OTEL_EXPORTER_OTLP_ENDPOINT) or appended as JSON lines to a
+file (TRACE_FILE). Independently of OpenTelemetry, the duration of every stage is recorded for
+the current request so it can be sent back to the client in a Server-Timing header.
+"""
+import os
+import re
+import time
+import atexit
+import asyncio
+import functools
+import contextvars
+from contextlib import contextmanager, nullcontext
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+except ImportError:  # tracing is optional, Server-Timing still works without it
+    trace = None
+
+SERVICE_NAME = "gpt-gesture-detection-service"
+
+# stage timings of the request that is currently being handled, None outside of a request
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+# innermost span of the current task, lets traced functions attach attributes to their own span
+_current_span = contextvars.ContextVar("current_span", default=None)
+_tracer = None
+_tracer_provider = None
+# file the TRACE_FILE exporter appends to, closed by shutdown_tracing
+_trace_file = None
+
+
+def setup_tracing():
+    """Configure the OpenTelemetry exporter, returns the tracer or None if tracing is disabled"""
+    global _tracer, _tracer_provider, _trace_file
+    if _tracer is not None:
+        return _tracer
+    if trace is None:
+        print("OpenTelemetry SDK not installed, only Server-Timing headers will be reported")
+        return None
+
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    trace_file = os.getenv("TRACE_FILE")
+    if not endpoint and not trace_file:
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    if endpoint:
+        # the exporter reads the endpoint (and headers) from the standard OTEL_* variables
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+        print(f"Exporting traces to OTLP collector at {endpoint}")
+    else:
+        _trace_file = open(trace_file, "a")
+        exporter = ConsoleSpanExporter(
+            out=_trace_file,
+            formatter=lambda s: s.to_json(indent=None) + os.linesep,
+        )
+        print(f"Exporting traces to {trace_file}")
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _tracer_provider = provider
+    _tracer = provider.get_tracer(SERVICE_NAME)
+    # runs before the provider's own exit handler, which shutdown() unregisters
+    atexit.register(shutdown_tracing)
+    return _tracer
+
+
+def shutdown_tracing():
+    """Export the pending spans and close the trace file, spans are not exported afterwards"""
+    global _tracer, _tracer_provider, _trace_file
+    if _tracer_provider is not None:
+        _tracer_provider.shutdown()
+    if _trace_file is not None:
+        _trace_file.close()
+    _tracer = _tracer_provider = _trace_file = None
+    atexit.unregister(shutdown_tracing)
+
+
+class SpanHandle:
+    """Handle yielded by span() so stages can attach attributes once they know them"""
+
+    def __init__(self, otel_span=None):
+        self._otel_span = otel_span
+        self.attributes = {}
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+        if self._otel_span is not None:
+            self._otel_span.set_attribute(key, value)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a pipeline stage, nested calls produce nested spans"""
+    start = time.perf_counter()
+    otel_cm = _tracer.start_as_current_span(name) if _tracer is not None else nullcontext()
+    with otel_cm as otel_span:
+        handle = SpanHandle(otel_span)
+        for key, value in attributes.items():
+            handle.set_attribute(key, value)
+        token = _current_span.set(handle)
+        try:
+            yield handle
+        finally:
+            _current_span.reset(token)
+            duration_ms = (time.perf_counter() - start) * 1000
+            timings = _request_timings.get()
+            if timings is not None:
+                # stages that run more than once per request are summed up
+                timings[name] = timings.get(name, 0.0) + duration_ms
+
+
+def current_span():
+    """Return the innermost active span, or a detached handle when called outside of one"""
+    return _current_span.get() or SpanHandle()
+
+
+def traced(name):
+    """Decorator that runs the whole function (sync or async) inside span(name)"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request_timings():
+    """Start collecting stage timings for the current request"""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def format_server_timing(timings):
+    """Format collected timings as a Server-Timing header value, e.g. "extract_frames;dur=412.3" """
+    entries = []
+    for name, duration_ms in timings.items():
+        token = re.sub(r"[^A-Za-z0-9_\-]", "_", name)
+        entries.append(f"{token};dur={duration_ms:.1f}")
+    return ", ".join(entries)
+
+
+def parse_server_timing(header):
+    """Inverse of format_server_timing, returns {stage: duration_ms}"""
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            timings[name] = float(params[4:])
+    return timings
@@ -4,67 +4,306 @@ This script demonstrates the workflow for processing a video file with hand dete
 The video file is processed frame by frame, extracting the frames and running hand detection on each frame. The frames with detected hand movements are then sent to the GPT API for analysis.
 """
 import uuid
-import cv2
 import sys
 import os
 import base64
 import time
 import asyncio
-import boto3
+import contextvars
+import traceback
 import numpy as np
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from openai import OpenAI
-from fastapi import FastAPI, HTTPException
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, HTTPException, File, UploadFile, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import Request
+from fastapi import Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
 import shutil
 from dotenv import load_dotenv
-from PIL import Image
 import io
 import re
 
 # Constants
 class VideoConstants:
-    FRAME_INTERVAL = 6 
+    FRAME_INTERVAL = 6  # base sampling stride, see FRAME_SAMPLING
+    # "adaptive" samples every FRAME_INTERVAL-th frame in calm stretches and down to every
+    # MIN_FRAME_INTERVAL-th frame during fast motion, "fixed" keeps the plain stride
+    FRAME_SAMPLING = os.getenv("FRAME_SAMPLING", "adaptive")
+    MIN_FRAME_INTERVAL = int(os.getenv("MIN_FRAME_INTERVAL", "2"))
     TARGET_SIZE = (320, 240) 
     MAX_FRAMES = 15 
     HAND_DETECTION_THRESHOLD = 0.08 
+    GPT_MODEL = "gpt-4o-mini"
     GPT_MAX_TOKENS = 250
     GPT_TEMPERATURE = 0.1 
     IMAGE_QUALITY = 85
     TARGET_WIDTH = 256
+    STORAGE_BATCH_SIZE = 8  # frames handed to the frame storage per put_many call
+    # frames decoded per window while streaming a session through detection, at most two windows
+    # (the one being detected and the one being prefetched) are held in memory
+    FRAME_WINDOW = int(os.getenv("FRAME_WINDOW", "8"))
+    # sessions with at least SHARD_MIN_FRAMES frames run landmark extraction on SHARD_WORKERS
+    # worker processes, 0 keeps every session on the request thread
+    SHARD_WORKERS = int(os.getenv("HAND_DETECTION_SHARD_WORKERS", "0"))
+    SHARD_MIN_FRAMES = int(os.getenv("HAND_DETECTION_SHARD_MIN_FRAMES", "240"))
+    # selected frames stay in memory, set SAVE_SELECTED_FRAMES=1 to also write them to selected_frames/
+    SAVE_SELECTED_FRAMES = os.getenv("SAVE_SELECTED_FRAMES", "0") == "1"
+    # detect landmarks on a crop around the previous frame's hands instead of the whole frame
+    ROI_DETECTION = os.getenv("HAND_DETECTION_ROI", "0") == "1"
+    # frames that did not change since the last detection reuse its landmarks instead of running MediaPipe
+    STATIC_PREFILTER = os.getenv("HAND_DETECTION_PREFILTER", "1") == "1"
+    # keep the landmarks of every processed video so a re-upload of the same file skips MediaPipe
+    LANDMARK_STORE = os.getenv("LANDMARK_STORE", "1") == "1"
+    # live detection over /ws/live-detection: frames accepted per stream and seconds without a message before it is dropped
+    LIVE_MAX_FRAMES = int(os.getenv("LIVE_MAX_FRAMES", "1800"))
+    LIVE_IDLE_TIMEOUT = float(os.getenv("LIVE_IDLE_TIMEOUT", "30"))
+    # the local sign classifier answers without GPT when the target word reaches SIGN_VERIFIER_ACCEPT
+    # probability, or another word of its vocabulary SIGN_VERIFIER_REJECT
+    SIGN_VERIFIER = os.getenv("SIGN_VERIFIER", "1") == "1"
+    SIGN_VERIFIER_ACCEPT = float(os.getenv("SIGN_VERIFIER_ACCEPT", "0.9"))
+    SIGN_VERIFIER_REJECT = float(os.getenv("SIGN_VERIFIER_REJECT", "0.95"))
+    # "archive" packs a session's frames into one object, "objects" stores one object per frame
+    STORAGE_LAYOUT = os.getenv("FRAME_STORAGE_LAYOUT", "archive")
 
 # Add the parent directory of the current script to sys.path
 parent_directory = Path(__file__).resolve().parent.parent #__file__ is the path of the current file, parent is the parent directory, parent.parent is the grandparent directory
 #lesson-management-service is the grandparent directory of the current file
 sys.path.append(str(parent_directory))
-from hand_detection_service import process_frames
+from hand_detection_service import (
+    detect_frames,
+    detect_frames_sharded,
+    select_from_landmarks,
+    skip_early_frames,
+    LiveDetectionSession,
+    HandsPoolTimeout,
+    SelectedFrame,
+    warmup,
+    is_warmed_up,
+)
+from hand_detection_service.landmark_store import (
+    LandmarkStore,
+    LandmarkSequence,
+    default_landmark_store_dir,
+    landmark_key,
+    video_content_hash,
+)
+from hand_detection_service.lazy_imports import lazy_import
+from hand_detection_service.motion import frame_sampler, STATIC_FRAME_THRESHOLD
+from hand_detection_service.engines import DETECTION_ENGINE
+from hand_detection_service.sign_classifier import load_sign_verifier
+from frame_storage import create_frame_storage
+import frame_archive
+from cleanup import SessionJanitor
+from tracing import setup_tracing, span, traced, current_span, start_request_timings, format_server_timing
+
+# Heavy libraries are imported on first use so the module imports quickly
+cv2 = lazy_import("cv2")
+Image = lazy_import("PIL.Image")
 
 # Load gpt key from .env file
 load_dotenv()
 
-s3 = boto3.client(
-    's3',
-    region_name=os.getenv("AWS_REGION"),  # e.g., "eu-central-1"
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),       # optional if IAM role is used
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")  # optional if IAM role is used
-)
-
 bucket_name = os.getenv("S3_BUCKET_NAME")  # e.g., "signifyappbucket"
 
-# Initialize OpenAI client
-GPT_API_KEY = os.getenv("GPT_API_KEY")
-if not GPT_API_KEY:
-    raise ValueError("GPT_API_KEY not found in environment variables")
+# External clients are created on first use (or in the app lifespan) instead of at import,
+# tests and benchmarks can inject stand-ins with set_s3_client / set_openai_client
+_s3_client = None
+_openai_client = None
+
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client(
+            's3',
+            region_name=os.getenv("AWS_REGION"),  # e.g., "eu-central-1"
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),       # optional if IAM role is used
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")  # optional if IAM role is used
+        )
+    return _s3_client
+
+def set_s3_client(s3_client):
+    global _s3_client
+    _s3_client = s3_client
+
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        GPT_API_KEY = os.getenv("GPT_API_KEY")
+        if not GPT_API_KEY:
+            raise ValueError("GPT_API_KEY not found in environment variables")
+        from openai import OpenAI
+        # Initialize OpenAI client without any proxy settings
+        _openai_client = OpenAI(api_key=GPT_API_KEY)
+    return _openai_client
+
+def set_openai_client(openai_client):
+    global _openai_client
+    _openai_client = openai_client
+
+# Frame storage backend (s3, local or memory), selected with FRAME_STORAGE_BACKEND
+_frame_storage = None
+
+def get_frame_storage():
+    global _frame_storage
+    if _frame_storage is None:
+        _frame_storage = create_frame_storage(
+            os.getenv("FRAME_STORAGE_BACKEND", "s3"), s3_client_factory=get_s3_client, bucket=bucket_name
+        )
+    return _frame_storage
+
+def set_frame_storage(frame_storage):
+    global _frame_storage
+    _frame_storage = frame_storage
+
+# Landmarks of processed videos keyed by content hash, see hand_detection_service/landmark_store.py
+_landmark_store = None
+
+def get_landmark_store():
+    global _landmark_store
+    if _landmark_store is None:
+        _landmark_store = LandmarkStore(default_landmark_store_dir())
+    return _landmark_store
+
+def set_landmark_store(landmark_store):
+    global _landmark_store
+    _landmark_store = landmark_store
+
+def video_landmark_key(video_path):
+    """Landmark store key of a video under the current sampling and detection settings, None if the store is off"""
+    if not VideoConstants.LANDMARK_STORE:
+        return None
+    try:
+        content_hash = video_content_hash(video_path)
+    except OSError as e:
+        print(f"Could not hash {video_path}: {e}")
+        return None
+    return landmark_key(content_hash, **detection_settings())
+
+def detection_settings():
+    """The sampling and detection settings the landmarks of an upload depend on"""
+    return {
+        "sampling": VideoConstants.FRAME_SAMPLING,
+        "interval": VideoConstants.FRAME_INTERVAL,
+        "min_interval": VideoConstants.MIN_FRAME_INTERVAL,
+        "roi": VideoConstants.ROI_DETECTION,
+        "prefilter": VideoConstants.STATIC_PREFILTER,
+        "engine": DETECTION_ENGINE,
+    }
+
+# Local sign classifier, None when disabled or no trained model is deployed (SIGN_CLASSIFIER_MODEL)
+_sign_verifier = None
+_sign_verifier_loaded = False
+
+def get_sign_verifier():
+    global _sign_verifier, _sign_verifier_loaded
+    if not _sign_verifier_loaded:
+        _sign_verifier_loaded = True
+        if VideoConstants.SIGN_VERIFIER:
+            try:
+                _sign_verifier = load_sign_verifier(
+                    accept=VideoConstants.SIGN_VERIFIER_ACCEPT, reject=VideoConstants.SIGN_VERIFIER_REJECT
+                )
+            except Exception as e:
+                print(f"Could not load the sign classifier: {e}")
+            # a model trained on differently sampled landmarks would judge motion it never saw
+            mismatched = _sign_verifier.mismatched_settings(detection_settings()) if _sign_verifier else []
+            if mismatched:
+                print(f"Sign classifier disabled, it was trained with other settings for: {', '.join(mismatched)}")
+                _sign_verifier = None
+    return _sign_verifier
+
+def set_sign_verifier(sign_verifier):
+    global _sign_verifier, _sign_verifier_loaded
+    _sign_verifier = sign_verifier
+    _sign_verifier_loaded = True
+
+@traced("verify_locally")
+def verify_locally(landmark_log, target_word):
+    """The local classifier's verdict in the send_frames_to_gpt format when it is confident, otherwise None"""
+    verifier = get_sign_verifier()
+    if verifier is None or not landmark_log:
+        return None
+    verdict = verifier.verify([landmarks for _, _, landmarks in landmark_log], target_word)
+    stage = current_span()
+    stage.set_attribute("verdict", verdict["answer"] if verdict else "undecided")
+    if verdict is None:
+        return None
+    print(f"Local sign classifier: {verdict}")
+    feedback = "" if verdict["answer"] == "yes" else (
+        f'The gesture looked like "{verdict["predicted"].upper()}" rather than "{target_word.upper()}".'
+    )
+    return {"answer": verdict["answer"], "feedback": feedback, "confidence": verdict["confidence"],
+            "verified_by": "local_classifier"}
+
+# Deletes session frames after the verdict and sweeps leftovers, see cleanup.py for the retention settings
+janitor = SessionJanitor(get_frame_storage)
+
+async def run_cleanup_sweeps():
+    while True:
+        await asyncio.sleep(janitor.policy.sweep_interval_seconds)
+        try:
+            await asyncio.to_thread(janitor.sweep)
+        except Exception as e:
+            print(f"Error in cleanup sweep: {e}")
+
+def preload_libraries():
+    """Import the heavy libraries now, used before forking workers
+
+    Only modules are loaded here. The S3 and OpenAI clients hold connection pools that must
+    not be shared across fork(), every worker builds its own with build_clients.
+    """
+    cv2.load()
+    Image.load()
+    import mediapipe  # noqa: F401
+
+def build_clients():
+    """Build the storage and GPT clients of this process so the first request does not pay for it"""
+    if get_frame_storage().name == "s3":
+        get_s3_client()
+    try:
+        get_openai_client()
+    except ValueError as e:
+        print(f"Warning: {e}, GPT requests will fail")
+
+def startup_warmup():
+    preload_libraries()
+    build_clients()
+    warmup()
+
+# why the startup warmup failed, reported by /readyz, None while it runs or once it succeeded
+_warmup_error = None
 
-# Initialize OpenAI client without any proxy settings
-client = OpenAI(api_key=GPT_API_KEY)
+def report_warmup_failure(task):
+    """Done callback of the startup warmup task, logs the exception the task ended with"""
+    global _warmup_error
+    if task.cancelled() or task.exception() is None:
+        return
+    error = task.exception()
+    _warmup_error = f"{type(error).__name__}: {error}"
+    print(f"Startup warmup failed, the service will not report ready: {_warmup_error}")
+    traceback.print_exception(error)
+
+# Build the clients and warm up MediaPipe in the background on startup, /readyz reports ready
+# once it is done. Under gunicorn the worker hooks have already done both before the app starts.
+@asynccontextmanager
+async def lifespan(app):
+    global _warmup_error
+    warmup_task = None
+    _warmup_error = None
+    if not is_warmed_up():
+        warmup_task = asyncio.create_task(asyncio.to_thread(startup_warmup))
+        warmup_task.add_done_callback(report_warmup_failure)
+    sweep_task = asyncio.create_task(run_cleanup_sweeps())
+    yield
+    sweep_task.cancel()
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
 
 #app init
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS makes sure that the API can be accessed from any origin 
 # should be restricted in future, only makes sense for development right now
@@ -74,8 +313,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["Server-Timing"],  # lets the client read the per-stage server timings
 )
 
+setup_tracing()
+
+# Collect the stage timings of every request and return them in a Server-Timing header
+# so the timings measured in the app can be matched with the server stages
+@app.middleware("http")
+async def server_timing_middleware(request: Request, call_next):
+    timings = start_request_timings()
+    start_time = time.perf_counter()
+    response = await call_next(request)
+    timings["total"] = (time.perf_counter() - start_time) * 1000
+    response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
+
 # Directories - Using absolute paths otherwise app crashes and cannot find the paths
 WORKSPACE_DIR = Path(__file__).resolve().parent
 EXTRACTED_FRAMES_DIR = str(WORKSPACE_DIR / "extracted_frames")
@@ -87,6 +340,20 @@ os.makedirs(EXTRACTED_FRAMES_DIR, exist_ok=True)
 os.makedirs(SELECTED_FRAMES_DIR, exist_ok=True)
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
+# Liveness probe, never touches the models
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+# Readiness probe, the load balancer only routes traffic here once the hand detection graph is warm
+@app.get("/readyz")
+async def readyz():
+    if _warmup_error is not None:
+        return JSONResponse(status_code=503, content={"status": "warmup_failed", "error": _warmup_error})
+    if not is_warmed_up():
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
 # Define input model
 class VideoRequest(BaseModel):
     video_url: str  # Path or URL to the video file
@@ -117,35 +384,13 @@ async def upload_video(file: UploadFile = File(...)):
         print(f"An error occurred during upload: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to upload video: {str(e)}")
 
+@traced("extract_frames")
 def extract_frames(video_path, interval=VideoConstants.FRAME_INTERVAL):
-    cap = cv2.VideoCapture(video_path)
-    frame_id = 0
-    frame_count = 0
-    s3_frame_keys = []
-
     # Generate unique folder name for this video session
     unique_id = str(uuid.uuid4())
     s3_folder = f"USER_DATA/{unique_id}/"
 
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        if frame_count % interval == 0:
-            s3_key = f"{s3_folder}frame_{frame_id}.jpg"
-            try:
-                upload_frame_to_s3(frame, s3_key)
-                s3_frame_keys.append(s3_key)
-                frame_id += 1
-            except Exception as e:
-                print(f"Error uploading frame {frame_id}: {str(e)}")
-                continue
-
-        frame_count += 1
-
-    cap.release()
+    s3_frame_keys = extract_frames_to_s3(video_path, s3_folder, interval)
     return s3_frame_keys, unique_id  # also return the folder ID if needed
 
 async def process_frame_batch(frame_batch):
@@ -161,26 +406,24 @@ async def process_frame_batch(frame_batch):
         else:
             frame_paths = frame_batch
         
+        if not (isinstance(frame_paths, list) and all(isinstance(path, str) and path.startswith('USER_DATA/') for path in frame_paths)):
+            print(f"Warning: Invalid frame paths format: {frame_paths}")
+            return []
+
+        # Download all frames from the frame storage in one batched call
+        frames = await asyncio.to_thread(load_frames, frame_paths)
+
         # ThreadPoolExecutor is used to process the frames in parallel
         with ThreadPoolExecutor() as executor:
             loop = asyncio.get_event_loop()
             tasks = []
-            
-            if isinstance(frame_paths, list) and all(isinstance(path, str) and path.startswith('USER_DATA/') for path in frame_paths):
-                for i, s3_path in enumerate(frame_paths):
-                    try:
-                        # Download frame from S3
-                        frame = load_frame_from_s3(s3_path)
-                        if frame is not None:
-                            temp_path = os.path.join(temp_dir, f"processed_frame_{i}.jpg")
-                            tasks.append(loop.run_in_executor(executor, lambda p: cv2.imwrite(p, frame), temp_path))
-                        else:
-                            print(f"Warning: Failed to load frame from S3: {s3_path}")
-                    except Exception as e:
-                        print(f"Error processing S3 frame {s3_path}: {e}")
-            else:
-                print(f"Warning: Invalid frame paths format: {frame_paths}")
-                return []
+
+            for i, (s3_path, frame) in enumerate(zip(frame_paths, frames)):
+                if frame is not None:
+                    temp_path = os.path.join(temp_dir, f"processed_frame_{i}.jpg")
+                    tasks.append(loop.run_in_executor(executor, cv2.imwrite, temp_path, frame))
+                else:
+                    print(f"Warning: Failed to load frame from storage: {s3_path}")
             
             if not tasks:
                 print("No valid frames to process")
@@ -197,15 +440,108 @@ async def process_frame_batch(frame_batch):
         print(f"Error in process_frame_batch: {e}")
         return []
 
-def load_frame_from_s3(s3_key):
-    try:
-        obj = s3.get_object(Bucket=bucket_name, Key=s3_key)
-        image_bytes = obj['Body'].read()
-        image_array = np.asarray(bytearray(image_bytes), dtype=np.uint8)
-        return cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-    except Exception as e:
-        print(f"Failed to load frame {s3_key}: {e}")
-        return None
+def encode_frame(frame):
+    """JPEG encode a frame, returns the bytes or None if encoding failed"""
+    success, buffer = cv2.imencode('.jpg', frame)
+    return buffer.tobytes() if success else None
+
+def decode_frame(image_bytes):
+    image_array = np.frombuffer(image_bytes, dtype=np.uint8)
+    return cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+
+def load_encoded_frames(s3_keys, archive_indexes=None):
+    """Fetch the encoded frames for plain keys and archive references, None for frames that failed
+
+    archive_indexes is an optional {archive key: index} cache shared between calls that read the
+    same archive window by window.
+    """
+    storage = get_frame_storage()
+    encoded = {}
+
+    # frames packed in a session archive are read with ranged GETs, one group per archive
+    archives = {}
+    plain_keys = []
+    for s3_key in s3_keys:
+        ref = frame_archive.parse_frame_ref(s3_key)
+        if ref is None:
+            plain_keys.append(s3_key)
+        else:
+            archives.setdefault(ref[0], []).append((s3_key, ref[1]))
+
+    for archive_key, refs in archives.items():
+        try:
+            index = archive_indexes.get(archive_key) if archive_indexes is not None else None
+            if index is None:
+                index = frame_archive.read_index(storage, archive_key)
+                if archive_indexes is not None:
+                    archive_indexes[archive_key] = index
+            frames = frame_archive.read_frames(storage, archive_key, [i for _, i in refs], index=index)
+            for s3_key, index in refs:
+                encoded[s3_key] = frames.get(index)
+        except Exception as e:
+            print(f"Failed to read frame archive {archive_key}: {e}")
+
+    for s3_key, image_bytes in zip(plain_keys, storage.get_many(plain_keys)):
+        encoded[s3_key] = image_bytes
+    return [encoded.get(s3_key) for s3_key in s3_keys]
+
+def load_frames(s3_keys, archive_indexes=None):
+    """Load and decode several frames with batched storage calls, None for frames that failed"""
+    frames = []
+    for s3_key, image_bytes in zip(s3_keys, load_encoded_frames(s3_keys, archive_indexes)):
+        frame = decode_frame(image_bytes) if image_bytes is not None else None
+        if frame is None:
+            print(f"Failed to load frame {s3_key}")
+        frames.append(frame)
+    return frames
+
+def frame_id(s3_key):
+    """Name of a frame without folder, timestamp and extension, e.g. "frame_3" for both key layouts"""
+    return s3_key.rpartition("#")[2].rpartition("/")[2].split(".")[0]
+
+def frame_timestamp_ms(s3_key):
+    """Position of a frame in its video in ms, from a frame_<n>.t<ms>.jpg key, None for keys without one"""
+    name = s3_key.rpartition("#")[2].rpartition("/")[2]
+    for part in name.split(".")[1:]:
+        if part.startswith("t") and part[1:].isdigit():
+            return int(part[1:])
+    return None
+
+def iter_session_frames(s3_keys, window=VideoConstants.FRAME_WINDOW):
+    """Yield (frame id, frame, timestamp_ms) for the given keys in order, skipping frames that failed to load
+
+    timestamp_ms is the position of the frame in its video recorded at extraction, see
+    frame_timestamp_ms, so detection sees the real spacing of adaptively sampled frames.
+
+    Frames are fetched and decoded window by window, the next window is prefetched on a
+    background thread while the current one is consumed. At most two windows of decoded frames
+    are alive at any time, so memory does not grow with the length of the video.
+    """
+    windows = [s3_keys[start:start + window] for start in range(0, len(s3_keys), window)]
+    if not windows:
+        return
+    archive_indexes = {}
+
+    def load_window(keys):
+        with span("load_frames", frames=len(keys)) as load_stage:
+            frames = load_frames(keys, archive_indexes)
+            load_stage.set_attribute("bytes.decoded", sum(frame.nbytes for frame in frames if frame is not None))
+            return frames
+
+    def prefetch(keys):
+        # run in a copy of the request context so the span and its timing land in this request
+        return executor.submit(contextvars.copy_context().run, load_window, keys)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-prefetch") as executor:
+        pending = prefetch(windows[0])
+        for i, keys in enumerate(windows):
+            frames = pending.result()
+            if i + 1 < len(windows):
+                pending = prefetch(windows[i + 1])
+            for s3_key, frame in zip(keys, frames):
+                if frame is not None:
+                    yield frame_id(s3_key), frame, frame_timestamp_ms(s3_key)
+            del frames
 
 # resize the image to 256x256 and convert it to RGB for faster processing and less memory usage
 def optimize_image_for_api(frame):
@@ -241,7 +577,11 @@ def optimize_image_for_api(frame):
 # send the frames to the GPT API
 import json
 
+@traced("send_frames_to_gpt")
 async def send_frames_to_gpt(frames, target_word):
+    stage = current_span()
+    stage.set_attribute("frames", len(frames))
+    stage.set_attribute("gpt.model", VideoConstants.GPT_MODEL)
     if not frames:
         print("No frames to send to GPT")
         return {
@@ -253,13 +593,17 @@ async def send_frames_to_gpt(frames, target_word):
     
     opt_start_time = time.time()
     
-    with ThreadPoolExecutor() as executor:
-        loop = asyncio.get_event_loop()
-        tasks = [
-            loop.run_in_executor(executor, optimize_image_for_api, frame)
-            for frame in frames
-        ]
-        optimized_images = await asyncio.gather(*tasks)
+    with span("optimize_images", frames=len(frames)) as opt_stage:
+        with ThreadPoolExecutor() as executor:
+            loop = asyncio.get_event_loop()
+            tasks = [
+                loop.run_in_executor(
+                    executor, optimize_image_for_api, frame
+                )
+                for frame in frames
+            ]
+            optimized_images = await asyncio.gather(*tasks)
+        opt_stage.set_attribute("bytes.base64", sum(len(image) for image in optimized_images if image))
     
     opt_time = time.time() - opt_start_time
     print(f"  - Image optimization time: {opt_time:.2f} seconds")
@@ -307,14 +651,18 @@ async def send_frames_to_gpt(frames, target_word):
         
         api_start_time = time.time()
         
-        response = await asyncio.to_thread(
-            lambda: client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": message_content}],
-                max_tokens=VideoConstants.GPT_MAX_TOKENS,
-                temperature=VideoConstants.GPT_TEMPERATURE
+        with span("gpt_request", model=VideoConstants.GPT_MODEL) as api_stage:
+            response = await asyncio.to_thread(
+                lambda: get_openai_client().chat.completions.create(
+                    model=VideoConstants.GPT_MODEL,
+                    messages=[{"role": "user", "content": message_content}],
+                    max_tokens=VideoConstants.GPT_MAX_TOKENS,
+                    temperature=VideoConstants.GPT_TEMPERATURE
+                )
             )
-        )
+            if getattr(response, "usage", None) is not None:
+                api_stage.set_attribute("gpt.prompt_tokens", response.usage.prompt_tokens)
+                api_stage.set_attribute("gpt.completion_tokens", response.usage.completion_tokens)
         
         api_time = time.time() - api_start_time
         print(f"  - GPT API call time: {api_time:.2f} seconds")
@@ -351,8 +699,15 @@ async def send_frames_to_gpt(frames, target_word):
         }
 
 
-def process_with_detection_s3(frame_keys, s3_folder_prefix):
-    """Process frames stored in S3 with hand detection"""
+@traced("process_with_detection_s3")
+def process_with_detection_s3(frame_keys, s3_folder_prefix, landmarks_key=None, landmark_log=None):
+    """Process frames stored in S3 with hand detection, returns the selected frames as SelectedFrame records
+
+    The records hold no images, load the ones that are needed with load_selected_frames. With
+    landmarks_key the landmarks are looked up in the landmark store first, on a hit no frame is
+    loaded and MediaPipe does not run. On a miss they are stored afterwards.
+    landmark_log, if given, receives (frame id, frame index, landmarks) for every frame.
+    """
     try:
         if not frame_keys:
             print("No frame keys provided")
@@ -370,52 +725,94 @@ def process_with_detection_s3(frame_keys, s3_folder_prefix):
         frame_keys = sorted(frame_keys, key=extract_frame_number)
 
         # Skip early frames
-        if len(frame_keys) > 12:
-            frame_keys = frame_keys[2:]
-
-        # Load frames from S3 into memory (as numpy arrays)
-        frames = []
-        for key in frame_keys:
-            frame = load_frame_from_s3(key)
-            if frame is not None:
-                frames.append((key, frame))
-            else:
-                print(f"Failed to load frame: {key}")
+        frame_keys = skip_early_frames(frame_keys)
 
-        if not frames:
-            print("No valid frames loaded from S3")
-            return []
+        # A video processed before only needs the selection rerun on its stored landmarks
+        store = get_landmark_store() if landmarks_key else None
+        stored = store.get(landmarks_key) if store else None
+        if stored is not None:
+            if landmark_log is not None:
+                landmark_log.extend(stored)
+            return select_from_stored_landmarks(stored, frame_keys)
+        if landmark_log is None and store:
+            landmark_log = []
 
-        # Save processed frames to a temp directory before detection (optional but useful for reuse)
-        local_temp_dir = os.path.join("/tmp", s3_folder_prefix.replace("/", "_"))
-        os.makedirs(local_temp_dir, exist_ok=True)
-        local_paths = []
+        # Stream the frames from the frame storage through detection, only a bounded window of
+        # decoded frames is in memory at a time
+        sharded = VideoConstants.SHARD_WORKERS > 1 and len(frame_keys) >= VideoConstants.SHARD_MIN_FRAMES
+        debug_dir = SELECTED_FRAMES_DIR if VideoConstants.SAVE_SELECTED_FRAMES else None
+        static_threshold = STATIC_FRAME_THRESHOLD if VideoConstants.STATIC_PREFILTER else None
+        with span("process_frames", frames=len(frame_keys), sharded=sharded) as detection_stage:
+            if sharded:
+                selected_frames = detect_frames_sharded(
+                    iter_session_frames(frame_keys), threshold=VideoConstants.HAND_DETECTION_THRESHOLD,
+                    workers=VideoConstants.SHARD_WORKERS, debug_dir=debug_dir, roi=VideoConstants.ROI_DETECTION,
+                    static_threshold=static_threshold, landmark_log=landmark_log
+                )
+            else:
+                selected_frames = detect_frames(
+                    iter_session_frames(frame_keys), threshold=VideoConstants.HAND_DETECTION_THRESHOLD,
+                    debug_dir=debug_dir, roi=VideoConstants.ROI_DETECTION, static_threshold=static_threshold,
+                    landmark_log=landmark_log
+                )
+            detection_stage.set_attribute("frames.selected", len(selected_frames))
 
-        for i, (s3_key, frame) in enumerate(frames):
-            local_path = os.path.join(local_temp_dir, f"frame_{i}.jpg")
-            cv2.imwrite(local_path, frame)
-            local_paths.append(local_path)
+        if store and landmark_log:
+            try:
+                store.put(landmarks_key, LandmarkSequence.from_records(landmark_log))
+            except Exception as e:
+                print(f"Error storing landmarks for {landmarks_key}: {e}")
 
-        # Process valid local paths
-        selected_frames = process_frames(local_paths, SELECTED_FRAMES_DIR, threshold=VideoConstants.HAND_DETECTION_THRESHOLD)
+        if not selected_frames:
+            print("No frames selected from S3")
 
         return selected_frames
 
+    except HandsPoolTimeout:
+        # no graph freed up in time, the request fails rather than looking like a video without hands
+        raise
     except Exception as e:
         print(f"Error in process_with_detection_s3: {e}")
         return []
     
+def select_from_stored_landmarks(stored, frame_keys):
+    """Frame selection on stored landmarks, no frame is loaded"""
+    with span("process_frames", frames=len(frame_keys), landmark_store="hit") as detection_stage:
+        timestamps_ms = {frame_id(key): frame_timestamp_ms(key) for key in frame_keys}
+        selected_frames = [
+            SelectedFrame(selected_id, landmarks, movement)
+            for selected_id, landmarks, movement in select_from_landmarks(
+                stored, threshold=VideoConstants.HAND_DETECTION_THRESHOLD, timestamps_ms=timestamps_ms
+            )
+            if selected_id in timestamps_ms
+        ]
+        detection_stage.set_attribute("frames.selected", len(selected_frames))
+    return selected_frames
+
+@traced("load_selected_frames")
+def load_selected_frames(selected_frames, frame_keys):
+    """The images of the given SelectedFrame records, from the session's frame keys, in order
+
+    Frames that fail to load are left out.
+    """
+    keys_by_id = {frame_id(key): key for key in frame_keys}
+    keys = [keys_by_id[selected.frame_id] for selected in selected_frames if selected.frame_id in keys_by_id]
+    current_span().set_attribute("frames", len(keys))
+    return [image for image in load_frames(keys) if image is not None]
+
+@traced("select_optimal_frames")
 def select_optimal_frames(frames, max_frames=VideoConstants.MAX_FRAMES):
     """
     Select the optimal frames to send to GPT API to balance accuracy and cost.
     
     Parameters:
-    frames (list): List of frame file paths with detected hands
+    frames (list): SelectedFrame records (or frame file paths) with detected hands
     max_frames (int): Maximum number of frames to select, defaults to 15
     
     Returns:
-    list: Selected frame file paths
+    list: Selected frames, same type as the input
     """
+    current_span().set_attribute("frames", len(frames))
     if not frames:
         return []
     
@@ -430,8 +827,8 @@ def select_optimal_frames(frames, max_frames=VideoConstants.MAX_FRAMES):
     if frame_count <= 2:
         return frames
         
-    def extract_frame_number(filepath):
-        filename = os.path.basename(filepath)
+    def extract_frame_number(frame):
+        filename = frame.frame_id if isinstance(frame, SelectedFrame) else os.path.basename(frame)
         try:
             # something like "selected_frame_frame_42.jpg"
             if "selected_frame_frame_" in filename:
@@ -484,6 +881,7 @@ def select_optimal_frames(frames, max_frames=VideoConstants.MAX_FRAMES):
             selected.append(sorted_frames[new_index])
     
     selected.sort(key=lambda x: sorted_frames.index(x))
+    current_span().set_attribute("frames.selected", len(selected))
     
     print(f"Optimized frame selection: {len(frames)} frames with hand gestures → {len(selected)} frames to send to GPT")
     return selected
@@ -535,11 +933,14 @@ def preprocess_frames_for_detection(frames_dir, target_size=VideoConstants.TARGE
 
 # Main Workflow
 @app.post("/process-video")
-async def process_video(request: Request):
+@traced("process_video")
+async def process_video(request: Request, background_tasks: BackgroundTasks):
+    session_prefix = None
     try:
         data = await request.json()
         video_url = data.get("video_url")
         target_word = data.get("target_word", "hello")  # Default to "hello" if not provided
+        current_span().set_attribute("target_word", target_word)
         
         print(f"\nProcessing video for target word: {target_word}\n")  # Add logging
         
@@ -548,21 +949,33 @@ async def process_video(request: Request):
             
         # Extract frames from video
         frame_paths, unique_id = extract_frames(video_url)
+        session_prefix = f"USER_DATA/{unique_id}/"
         
-        # Process frames with hand detection
-        frames = process_with_detection_s3(frame_paths, f"USER_DATA/{unique_id}/")
-        
-        # Select optimal frames
-        optimal_frames = select_optimal_frames(frames)
-        
-        # get GPT result with optimized frames
-        gpt_start_time = time.time()
-        gpt_result = await send_frames_to_gpt(optimal_frames, target_word)
-        gpt_time = time.time() - gpt_start_time
-        print(f"GPT API processing time: {gpt_time:.2f} seconds")
+        # Process frames with hand detection, off the event loop so sessions can be detected in
+        # parallel (every session gets its own graph from the hands pool)
+        landmarks_key = await asyncio.to_thread(video_landmark_key, video_url)
+        landmark_log = [] if get_sign_verifier() else None
+        frames = await asyncio.to_thread(
+            process_with_detection_s3, frame_paths, session_prefix, landmarks_key, landmark_log
+        )
+
+        # a confident local verdict skips the GPT round trip
+        gpt_result = verify_locally(landmark_log, target_word)
+        if gpt_result is None:
+            # Select optimal frames, only those are loaded from the frame storage
+            optimal_frames = select_optimal_frames(frames)
+            images = await asyncio.to_thread(load_selected_frames, optimal_frames, frame_paths)
+
+            # get GPT result with optimized frames
+            gpt_start_time = time.time()
+            gpt_result = await send_frames_to_gpt(images, target_word)
+            gpt_time = time.time() - gpt_start_time
+            print(f"GPT API processing time: {gpt_time:.2f} seconds")
         
-        # Clean up after we're done with everything
+        # Clean up after we're done with everything,
+        # the session frames are deleted after the response has been sent
         await cleanup_files()
+        background_tasks.add_task(janitor.session_finished, session_prefix)
         
         return {"status": "success", "analysis": gpt_result}
         
@@ -570,41 +983,215 @@ async def process_video(request: Request):
         print(f"An error occurred in process_video: {e}")
         # Clean up even if there's an error
         await cleanup_files()
+        if session_prefix:
+            background_tasks.add_task(janitor.session_finished, session_prefix)
         return {
             "status": "error",
-            "message": "An internal error has occurred. Please try again later."
+            "message": "The service is busy. Please try again in a moment." if isinstance(e, HandsPoolTimeout)
+            else "An internal error has occurred. Please try again later."
         }
 
+# Live detection: the app streams downscaled frames while it records, detection runs as they
+# arrive and GPT is called as soon as recording stops.
+#   client -> {"type": "start", "target_word": "hello"}        first message
+#   client -> JPEG bytes                                        binary message, one per frame
+#   server -> {"type": "frame", "index": i, "selected": bool}   after every frame
+#   client -> {"type": "stop"}                                  recording finished
+#   server -> {"type": "result", "status": "success", "analysis": {...}}, then closes
+# A text message that is not a JSON object or has an unknown type gets a {"type": "error"} reply,
+# the stream stays open so the frames recorded so far are not lost.
+LIVE_MESSAGE_TYPES = ("start", "stop")
+
+def parse_live_message(text):
+    """The JSON object of a text message, None if it is not one"""
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) else None
+
+@app.websocket("/ws/live-detection")
+async def live_detection(websocket: WebSocket):
+    await websocket.accept()
+    session = None
+    try:
+        message = await asyncio.wait_for(websocket.receive(), timeout=VideoConstants.LIVE_IDLE_TIMEOUT)
+        if message["type"] == "websocket.disconnect":
+            return
+        start = parse_live_message(message["text"]) if message.get("text") is not None else None
+        if start is None or start.get("type") != "start":
+            await websocket.send_json({"type": "error", "message": "Expected a start message"})
+            await websocket.close(code=1008)
+            return
+        target_word = start.get("target_word", "hello")
+        print(f"\nLive detection started for target word: {target_word}\n")
+
+        landmark_log = [] if get_sign_verifier() else None
+        # the classifier was trained on the frames the upload sampler picks, it only gets to see the
+        # same selection of the stream (the client sends the camera frames as they are captured)
+        verifier_sampler = make_frame_sampler() if landmark_log is not None else None
+        verifier_frames = set()
+        # the encoded frames as the client sent them, kept for the selected frames only
+        selected_images = {}
+        session = LiveDetectionSession(
+            threshold=VideoConstants.HAND_DETECTION_THRESHOLD,
+            roi=VideoConstants.ROI_DETECTION,
+            static_threshold=STATIC_FRAME_THRESHOLD if VideoConstants.STATIC_PREFILTER else None,
+            landmark_log=landmark_log,
+        )
+        # may wait for a free graph of the live pool, keep the event loop responsive
+        try:
+            await asyncio.to_thread(session.open)
+        except HandsPoolTimeout:
+            print("Live detection rejected, every live graph is in use")
+            await websocket.send_json({"type": "error", "message": "Live detection is busy, please try again"})
+            await websocket.close(code=1013)
+            return
+        # frames are timestamped on arrival, engines that track by time get the real frame spacing
+        stream_start = time.monotonic()
+
+        while True:
+            message = await asyncio.wait_for(websocket.receive(), timeout=VideoConstants.LIVE_IDLE_TIMEOUT)
+            if message["type"] == "websocket.disconnect":
+                print(f"Live detection client left after {session.frames_seen} frames")
+                return
+            if message.get("bytes") is not None:
+                if session.frames_seen >= VideoConstants.LIVE_MAX_FRAMES:
+                    await websocket.send_json({"type": "error", "message": "Too many frames"})
+                    await websocket.close(code=1009)
+                    return
+                frame = decode_frame(message["bytes"])
+                if frame is None:
+                    await websocket.send_json({"type": "frame", "index": None, "error": "Could not decode frame"})
+                    continue
+                timestamp_ms = (time.monotonic() - stream_start) * 1000
+                if verifier_sampler is not None and verifier_sampler.should_sample(frame):
+                    verifier_frames.add(session.frames_seen)
+                selected = await asyncio.to_thread(session.add_frame, frame, None, timestamp_ms)
+                if selected is not None:
+                    selected_images[selected.frame_id] = message["bytes"]
+                await websocket.send_json(
+                    {"type": "frame", "index": session.frames_seen - 1, "selected": selected is not None}
+                )
+            elif message.get("text") is not None:
+                control = parse_live_message(message["text"])
+                if control is None:
+                    await websocket.send_json({"type": "error", "message": "Expected a JSON object"})
+                elif control.get("type") == "stop":
+                    break
+                elif control.get("type") in LIVE_MESSAGE_TYPES:
+                    await websocket.send_json({"type": "error", "message": f"Unexpected {control['type']} message"})
+                else:
+                    await websocket.send_json({"type": "error", "message": f"Unknown message type {control.get('type')!r}"})
+
+        print(f"Live detection: {len(session.selected_frames)} of {session.frames_seen} frames selected")
+        if landmark_log is not None:
+            landmark_log = skip_early_frames([entry for entry in landmark_log if entry[1] in verifier_frames])
+        gpt_result = verify_locally(landmark_log, target_word)
+        if gpt_result is None:
+            optimal_frames = select_optimal_frames(session.selected_frames)
+            images = [decode_frame(selected_images[selected.frame_id]) for selected in optimal_frames]
+            gpt_result = await send_frames_to_gpt(images, target_word)
+        await websocket.send_json({"type": "result", "status": "success", "analysis": gpt_result})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        print("Live detection client disconnected")
+    except asyncio.TimeoutError:
+        print("Live detection stream timed out")
+        await websocket.close(code=1001)
+    except Exception as e:
+        print(f"An error occurred in live_detection: {e}")
+        try:
+            await websocket.send_json({
+                "type": "error",
+                "message": "An internal error has occurred. Please try again later."
+            })
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        if session is not None:
+            session.close()
+
+def make_frame_sampler(interval=VideoConstants.FRAME_INTERVAL):
+    """The sampler that picks the frames of an upload under the FRAME_SAMPLING mode"""
+    return frame_sampler(VideoConstants.FRAME_SAMPLING, interval, VideoConstants.MIN_FRAME_INTERVAL)
+
 def extract_frames_to_s3(video_path, s3_folder, interval=VideoConstants.FRAME_INTERVAL):
     cap = cv2.VideoCapture(video_path)
+    storage = get_frame_storage()
     frame_id = 0
     frame_count = 0
+    uploaded_bytes = 0
     s3_frame_keys = []
+    batch = []
+
+    # in the "objects" layout frames are stored in batches, the storage backend uploads a batch concurrently
+    def flush(batch):
+        nonlocal uploaded_bytes
+        try:
+            storage.put_many(batch)
+            s3_frame_keys.extend(key for key, _ in batch)
+            uploaded_bytes += sum(len(data) for _, data in batch)
+        except Exception as e:
+            print(f"Error uploading frames {batch[0][0]}..{batch[-1][0]}: {str(e)}")
+
+    use_archive = VideoConstants.STORAGE_LAYOUT == "archive"
+    archive_key = f"{s3_folder}{frame_archive.ARCHIVE_NAME}"
+    # the archive is written frame by frame to a spooled file, only its index stays in memory
+    archive = frame_archive.ArchiveWriter() if use_archive else None
+    archive_timestamps = []
+    sampler = make_frame_sampler(interval)
 
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
             break
 
-        if frame_count % interval == 0:
-            s3_key = f"{s3_folder}frame_{frame_id}.jpg"
-            try:
-                upload_frame_to_s3(frame, s3_key)
-                s3_frame_keys.append(s3_key)
+        if sampler.should_sample(frame):
+            data = encode_frame(frame)
+            if data is not None:
+                # the frame keys record where the frame sits in the video, adaptive sampling
+                # leaves uneven gaps between the sampled frames
+                timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+                if use_archive:
+                    archive.add(data)
+                    archive_timestamps.append(timestamp_ms)
+                else:
+                    batch.append((f"{s3_folder}{frame_archive.frame_name(frame_id, timestamp_ms)}", data))
+                    if len(batch) >= VideoConstants.STORAGE_BATCH_SIZE:
+                        flush(batch)
+                        batch = []
                 frame_id += 1
-            except Exception as e:
-                print(f"Error uploading frame {frame_id}: {str(e)}")
-                continue
 
         frame_count += 1
-
     cap.release()
-    return s3_frame_keys
 
-def upload_frame_to_s3(frame, s3_key):
-    success, buffer = cv2.imencode('.jpg', frame)
-    if success:
-        s3.upload_fileobj(io.BytesIO(buffer), os.getenv("S3_BUCKET_NAME"), s3_key)
+    if use_archive:
+        # the whole session is streamed into one object
+        with archive:
+            if len(archive):
+                try:
+                    storage.put_stream(archive_key, archive.open())
+                    s3_frame_keys.extend(
+                        frame_archive.frame_ref(archive_key, i, timestamp_ms)
+                        for i, timestamp_ms in enumerate(archive_timestamps)
+                    )
+                    uploaded_bytes += archive.size
+                except Exception as e:
+                    print(f"Error uploading frame archive {archive_key}: {str(e)}")
+    elif batch:
+        flush(batch)
+
+    stage = current_span()
+    stage.set_attribute("storage.backend", storage.name)
+    stage.set_attribute("storage.layout", VideoConstants.STORAGE_LAYOUT)
+    stage.set_attribute("frames.decoded", frame_count)
+    stage.set_attribute("frames.uploaded", len(s3_frame_keys))
+    stage.set_attribute("frames.motion_sampled", sampler.motion_samples)
+    stage.set_attribute("bytes.uploaded", uploaded_bytes)
+    return s3_frame_keys
 
 
 async def cleanup_files():
@@ -635,9 +1222,16 @@ async def cleanup_files():
         raise
 
 if __name__ == "__main__":
-    # capture the time spent on the process
+    # Single process server for development,
+    # production runs under gunicorn: gunicorn -c gunicorn.conf.py video_hand_processing:app
     import uvicorn
     start_time = time.time()
-    # Run the server on all network interfaces
-    print(f"Time elapsed: {time.time() - start_time}")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    warmup()
+    print(f"Warmup finished in {time.time() - start_time:.2f} seconds")
+    # Run the server on all network interfaces, in-flight requests get GRACEFUL_TIMEOUT seconds on shutdown
+    uvicorn.run(
+        app,
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_TIMEOUT", "60")),
+    )
@@ -1 +1,17 @@
-from .real_time_hand_detection import process_frames
\ No newline at end of file
+from .real_time_hand_detection import (
+    process_frames,
+    detect_frames,
+    select_from_landmarks,
+    skip_early_frames,
+    LiveDetectionSession,
+    HandsPoolTimeout,
+    SelectedFrame,
+    warmup,
+    is_warmed_up,
+)
+from .sharded_detection import detect_frames_sharded
+from .landmarks import HandLandmarks, sequence_movement
+from .landmark_store import LandmarkStore, LandmarkSequence, video_content_hash, landmark_key
+from .engines import create_engine, ENGINES
+from .features import landmark_features, LandmarkFeatures, normalized_movement
+from .smoothing import LandmarkSmoother
@@ -0,0 +1,169 @@
+"""
+Hand landmark engines.
+
+An engine owns one detection graph and is what HandsPool hands out. Every engine offers
+
+    detect(frame, timestamp_ms=None)   HandLandmarks for a BGR frame, None without hands
+    reset()                            forget the tracking state before the next video
+    close()                            release the graph
+
+HAND_DETECTION_ENGINE picks the engine the pool builds:
+
+    solutions   mp.solutions.hands, the legacy graph (default)
+    tasks       MediaPipe Tasks HandLandmarker in VIDEO mode. Tracking is driven by the frame
+                timestamps, real timestamps (e.g. CAP_PROP_POS_MSEC) are passed through, frames
+                without one are spaced HAND_LANDMARKER_FRAME_PERIOD_MS apart. Needs the
+                hand_landmarker.task model bundle, see HAND_LANDMARKER_MODEL.
+    onnx        palm detection and hand landmark models on ONNX Runtime, batched across
+                frames, see onnx_engine.py
+
+Engines with a batch_size above 1 also offer detect_batch(frames, timestamps=None), detection
+then runs whole batches of frames per call.
+"""
+import os
+import numpy as np
+from .lazy_imports import lazy_import
+from .landmarks import HandLandmarks, NUM_LANDMARKS, MAX_HANDS
+from .onnx_engine import OnnxHandEngine
+
+cv2 = lazy_import("cv2")
+mp = lazy_import("mediapipe")
+
+DETECTION_ENGINE = os.getenv("HAND_DETECTION_ENGINE", "solutions")
+
+# https://storage.googleapis.com/mediapipe-models/hand_landmarker/hand_landmarker/float16/latest/hand_landmarker.task
+HAND_LANDMARKER_MODEL = os.getenv(
+    "HAND_LANDMARKER_MODEL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "hand_landmarker.task")
+)
+# "cpu" or "gpu", the GPU delegate needs a MediaPipe build with GPU support
+HAND_LANDMARKER_DELEGATE = os.getenv("HAND_LANDMARKER_DELEGATE", "cpu")
+# spacing of frames that come without a timestamp, the default matches 30 fps sampled every 6th frame
+HAND_LANDMARKER_FRAME_PERIOD_MS = int(os.getenv("HAND_LANDMARKER_FRAME_PERIOD_MS", "200"))
+
+
+class SolutionsHandsEngine:
+    """mp.solutions.hands graph in tracking mode, timestamps are not used"""
+
+    name = "solutions"
+
+    def __init__(self, max_num_hands=MAX_HANDS, model_complexity=0):
+        # Initialize MediaPipe Hands with CPU-only mode
+        self._hands = mp.solutions.hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_num_hands,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+            model_complexity=model_complexity  # Use lightweight model
+        )
+
+    def detect(self, frame, timestamp_ms=None):
+        results = self._hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return HandLandmarks.from_mediapipe(results)  # None if no hand detected
+
+    def reset(self):
+        self._hands.reset()
+
+    def close(self):
+        self._hands.close()
+
+
+class TasksHandLandmarkerEngine:
+    """
+    MediaPipe Tasks HandLandmarker in VIDEO running mode.
+
+    VIDEO mode requires strictly increasing timestamps per landmarker, so timestamps that do not
+    advance are nudged forward by a millisecond. reset() drops the landmarker, the next video
+    gets a fresh one with timestamps starting over, so no tracking state crosses videos.
+    """
+
+    name = "tasks"
+
+    def __init__(self, model_asset_path=HAND_LANDMARKER_MODEL, delegate=HAND_LANDMARKER_DELEGATE,
+                 max_num_hands=MAX_HANDS, frame_period_ms=HAND_LANDMARKER_FRAME_PERIOD_MS):
+        if not os.path.isfile(model_asset_path):
+            raise FileNotFoundError(
+                f"HandLandmarker model not found at {model_asset_path}, download hand_landmarker.task "
+                "and point HAND_LANDMARKER_MODEL at it"
+            )
+        self.model_asset_path = model_asset_path
+        self.delegate = delegate.upper()
+        self.max_num_hands = max_num_hands
+        self.frame_period_ms = frame_period_ms
+        self._last_timestamp_ms = None
+        # fail on a bad model or delegate here rather than on the first frame of a request
+        self._landmarker = self._create()
+
+    def _create(self):
+        from mediapipe.tasks.python import BaseOptions, vision
+
+        options = vision.HandLandmarkerOptions(
+            base_options=BaseOptions(
+                model_asset_path=self.model_asset_path,
+                delegate=getattr(BaseOptions.Delegate, self.delegate),
+            ),
+            running_mode=vision.RunningMode.VIDEO,
+            num_hands=self.max_num_hands,
+            min_hand_detection_confidence=0.5,
+            min_hand_presence_confidence=0.5,
+            min_tracking_confidence=0.5,
+        )
+        return vision.HandLandmarker.create_from_options(options)
+
+    def _next_timestamp(self, timestamp_ms):
+        if timestamp_ms is None:
+            timestamp_ms = 0 if self._last_timestamp_ms is None else self._last_timestamp_ms + self.frame_period_ms
+        timestamp_ms = int(timestamp_ms)
+        if self._last_timestamp_ms is not None and timestamp_ms <= self._last_timestamp_ms:
+            timestamp_ms = self._last_timestamp_ms + 1
+        self._last_timestamp_ms = timestamp_ms
+        return timestamp_ms
+
+    def detect(self, frame, timestamp_ms=None):
+        if self._landmarker is None:
+            self._landmarker = self._create()
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        result = self._landmarker.detect_for_video(image, self._next_timestamp(timestamp_ms))
+        return landmarks_from_tasks(result)
+
+    def reset(self):
+        self.close()
+        self._last_timestamp_ms = None
+
+    def close(self):
+        if self._landmarker is not None:
+            self._landmarker.close()
+            self._landmarker = None
+
+
+def landmarks_from_tasks(result):
+    """HandLandmarks from a HandLandmarkerResult, None if no hand was detected"""
+    if not result.hand_landmarks:
+        return None
+    points = [[(p.x, p.y, p.z) for p in hand] for hand in result.hand_landmarks]
+    handedness, confidence = [], []
+    for h in range(len(points)):
+        if h < len(result.handedness) and result.handedness[h]:
+            category = result.handedness[h][0]
+            handedness.append(category.category_name)
+            confidence.append(category.score)
+        else:
+            handedness.append(str(h))
+            confidence.append(1.0)
+    return HandLandmarks(np.asarray(points, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3), handedness, confidence)
+
+
+ENGINES = {
+    SolutionsHandsEngine.name: SolutionsHandsEngine,
+    TasksHandLandmarkerEngine.name: TasksHandLandmarkerEngine,
+    OnnxHandEngine.name: OnnxHandEngine,
+}
+
+
+def create_engine(name=None, **options):
+    """Build the engine named name (default HAND_DETECTION_ENGINE)"""
+    name = name or DETECTION_ENGINE
+    try:
+        engine = ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown hand detection engine {name!r}, expected one of {sorted(ENGINES)}") from None
+    return engine(**options)
@@ -0,0 +1,92 @@
+"""
+Export MediaPipe's palm detection and hand landmark models to ONNX for the "onnx" engine.
+
+The .tflite files ship with the mediapipe package. tf2onnx converts them with a fixed batch of 1,
+this script then makes the batch dimension symbolic so OnnxHandEngine can run several frames
+(or hand crops) in one call. Needs tensorflow, tf2onnx and onnx, none of which the service
+itself needs, run it wherever those are installed:
+
+    pip install tensorflow-cpu tf2onnx onnx
+    python -m hand_detection_service.export_onnx_models --output-dir hand_detection_service/models
+
+Writes palm_detection_<variant>.onnx and hand_landmark_<variant>.onnx, the file names the
+engine looks for by default.
+"""
+import os
+import argparse
+import subprocess
+import sys
+import numpy as np
+
+
+def mediapipe_model_path(module, name):
+    import mediapipe
+    return os.path.join(os.path.dirname(mediapipe.__file__), "modules", module, name)
+
+
+def convert(tflite_path, onnx_path, opset):
+    subprocess.run(
+        [sys.executable, "-m", "tf2onnx.convert", "--tflite", tflite_path, "--output", onnx_path, "--opset", str(opset)],
+        check=True,
+    )
+
+
+def make_batch_dynamic(onnx_path):
+    """Replace the fixed batch of 1 of every graph input, output and Reshape target by a symbolic dimension"""
+    import onnx
+    from onnx import numpy_helper
+
+    # infer the shapes of the batch 1 graph first, Reshape targets like [1, -1, 18] need them
+    model = onnx.shape_inference.infer_shapes(onnx.load(onnx_path))
+    graph = model.graph
+    inferred = {
+        value.name: [dim.dim_value for dim in value.type.tensor_type.shape.dim]
+        for value in list(graph.value_info) + list(graph.output)
+    }
+    for value in list(graph.input) + list(graph.output):
+        value.type.tensor_type.shape.dim[0].dim_param = "batch"
+    # the converted graph reshapes to constant shapes like [1, 2016, 18], let the batch float
+    initializers = {initializer.name: initializer for initializer in graph.initializer}
+    for node in graph.node:
+        if node.op_type != "Reshape" or node.input[1] not in initializers:
+            continue
+        shape = numpy_helper.to_array(initializers[node.input[1]]).copy()
+        if len(shape) < 2 or shape[0] != 1:
+            continue
+        if -1 in shape:
+            output_shape = inferred.get(node.output[0])
+            if not output_shape or 0 in output_shape:
+                raise ValueError(f"Cannot make Reshape {node.name} batch dynamic, its output shape is unknown")
+            shape = np.array(output_shape, dtype=shape.dtype)
+        shape[0] = -1
+        # shape constants are shared between Reshape nodes, every node gets its own copy
+        name = f"{node.output[0]}_batch_shape"
+        graph.initializer.append(numpy_helper.from_array(shape, name))
+        node.input[1] = name
+    used = {name for node in graph.node for name in node.input}
+    for initializer in [initializer for initializer in graph.initializer if initializer.name not in used]:
+        graph.initializer.remove(initializer)
+    # the recorded intermediate shapes still say batch 1, runtimes infer them again
+    del graph.value_info[:]
+    onnx.checker.check_model(model)
+    onnx.save(model, onnx_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the MediaPipe hand models to ONNX with a dynamic batch")
+    parser.add_argument("--output-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+    parser.add_argument("--variant", choices=["lite", "full"], default="lite")
+    parser.add_argument("--opset", type=int, default=13)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for module, name in [("palm_detection", f"palm_detection_{args.variant}"),
+                         ("hand_landmark", f"hand_landmark_{args.variant}")]:
+        onnx_path = os.path.join(args.output_dir, f"{name}.onnx")
+        convert(mediapipe_model_path(module, f"{name}.tflite"), onnx_path, args.opset)
+        make_batch_dynamic(onnx_path)
+        print(f"Exported {onnx_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Camera-independent hand features computed from landmark sequences.
+
+Landmarks come in normalized image coordinates, so the same gesture gives larger numbers close
+to the camera than far from it. The features here are wrist-relative and measured in palm
+lengths (wrist to middle finger MCP), which makes them independent of where the hand is and
+how large it appears:
+
+    normalized     (..., 21, 3)  points relative to the wrist, in palm lengths
+    angles         (..., 15)     flexion angle (radians) at the three joints of every finger
+    tip_distances  (..., 15)     distances between the five fingertips (10) and from every tip
+                                 to the wrist (5), in palm lengths
+    velocity       (..., 21, 3)  per-frame point displacement in palm lengths (per second with
+                                 timestamps), 0 for the first frame of a hand
+    speed          (...,)        mean point speed of each hand
+
+Every function works on whole arrays with any leading dimensions, the time axis of a sequence
+is the one before the hand axis: (T, hands, 21, 3) for one video, (B, T, hands, 21, 3) for a
+batch. Hands missing in a frame are NaN (see stack_landmarks) and stay NaN in every feature.
+"""
+import numpy as np
+
+from .landmarks import NUM_LANDMARKS, stack_landmarks
+
+WRIST = 0
+MIDDLE_FINGER_MCP = 9
+FINGERTIPS = (4, 8, 12, 16, 20)
+# landmark chains from the wrist to every fingertip
+FINGER_CHAINS = (
+    (0, 1, 2, 3, 4),
+    (0, 5, 6, 7, 8),
+    (0, 9, 10, 11, 12),
+    (0, 13, 14, 15, 16),
+    (0, 17, 18, 19, 20),
+)
+NUM_ANGLES = 3 * len(FINGER_CHAINS)
+NUM_TIP_DISTANCES = len(FINGERTIPS) * (len(FINGERTIPS) - 1) // 2 + len(FINGERTIPS)
+# smallest palm length in normalized image units, below it the hand is too small to normalize
+MIN_PALM_SIZE = 1e-4
+
+_JOINT_PREV = np.array([chain[j - 1] for chain in FINGER_CHAINS for j in (1, 2, 3)])
+_JOINT = np.array([chain[j] for chain in FINGER_CHAINS for j in (1, 2, 3)])
+_JOINT_NEXT = np.array([chain[j + 1] for chain in FINGER_CHAINS for j in (1, 2, 3)])
+_TIP_PAIRS = np.array([(a, b) for i, a in enumerate(FINGERTIPS) for b in FINGERTIPS[i + 1:]]
+                      + [(WRIST, tip) for tip in FINGERTIPS])
+
+
+def palm_size(points):
+    """(...) wrist to middle finger MCP distance of (..., 21, 3) points, NaN if degenerate"""
+    size = np.linalg.norm(points[..., MIDDLE_FINGER_MCP, :] - points[..., WRIST, :], axis=-1)
+    return np.where(size > MIN_PALM_SIZE, size, np.nan)
+
+
+def normalize_landmarks(points, aspect_ratio=1.0):
+    """
+    Return (normalized, scale): points relative to the wrist in palm lengths, and the palm length.
+
+    aspect_ratio is the frame width / height. Normalized image coordinates squeeze x on wide
+    frames, x (and z, which shares its scale) are stretched back so lengths are isotropic.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if aspect_ratio != 1.0:
+        points = points * np.array([aspect_ratio, 1.0, aspect_ratio], dtype=np.float32)
+    scale = palm_size(points)
+    normalized = (points - points[..., WRIST:WRIST + 1, :]) / scale[..., None, None]
+    return normalized, scale
+
+
+def joint_angles(normalized):
+    """(..., 15) angle between the two bones meeting at every finger joint, 0 for a straight finger"""
+    incoming = normalized[..., _JOINT, :] - normalized[..., _JOINT_PREV, :]
+    outgoing = normalized[..., _JOINT_NEXT, :] - normalized[..., _JOINT, :]
+    cos = np.sum(incoming * outgoing, axis=-1) / (
+        np.linalg.norm(incoming, axis=-1) * np.linalg.norm(outgoing, axis=-1) + 1e-9
+    )
+    return np.arccos(np.clip(cos, -1.0, 1.0)).astype(np.float32)
+
+
+def fingertip_distances(normalized):
+    """(..., 15) distances between every pair of fingertips, then from every fingertip to the wrist"""
+    return np.linalg.norm(
+        normalized[..., _TIP_PAIRS[:, 0], :] - normalized[..., _TIP_PAIRS[:, 1], :], axis=-1
+    ).astype(np.float32)
+
+
+def landmark_velocity(points, scale, timestamps_ms=None):
+    """
+    (..., T, hands, 21, 3) displacement of every point since the previous frame, in palm lengths.
+
+    points are the raw (aspect corrected) points, so the velocity includes the movement of the
+    whole hand, divided by the palm length of the current frame. With timestamps_ms (one per
+    frame, broadcast against the leading dimensions) it is per second instead of per frame.
+    """
+    velocity = np.zeros_like(points, dtype=np.float32)
+    velocity[..., 1:, :, :, :] = np.diff(points, axis=-4) / scale[..., 1:, :, None, None]
+    if timestamps_ms is not None:
+        dt = np.diff(np.asarray(timestamps_ms, dtype=np.float32), axis=-1) / 1000.0
+        velocity[..., 1:, :, :, :] /= np.maximum(dt, 1e-3)[..., :, None, None, None]
+    # a hand appearing has no previous position, NaN there would only mean "no data"
+    appeared = np.isnan(velocity) & ~np.isnan(points)
+    velocity[appeared] = 0.0
+    return velocity
+
+
+class LandmarkFeatures:
+    """Features of a landmark sequence, see the module docstring for the arrays"""
+
+    __slots__ = ("keys", "normalized", "scale", "angles", "tip_distances", "velocity", "speed")
+
+    def __init__(self, keys, normalized, scale, angles, tip_distances, velocity, speed):
+        self.keys = keys
+        self.normalized = normalized
+        self.scale = scale
+        self.angles = angles
+        self.tip_distances = tip_distances
+        self.velocity = velocity
+        self.speed = speed
+
+    @property
+    def present(self):
+        """(..., T, hands) True where the hand was detected"""
+        return ~np.isnan(self.scale)
+
+    def frame_vectors(self):
+        """
+        (..., T, hands * dims) float32 matrix with one row per frame for scorers and classifiers:
+        per hand the normalized points, angles, tip distances and velocity, missing hands are 0.
+        """
+        parts = [
+            self.normalized.reshape(*self.normalized.shape[:-2], -1),
+            self.angles,
+            self.tip_distances,
+            self.velocity.reshape(*self.velocity.shape[:-2], -1),
+        ]
+        vectors = np.nan_to_num(np.concatenate(parts, axis=-1), nan=0.0, posinf=0.0, neginf=0.0)
+        return vectors.reshape(*vectors.shape[:-2], -1).astype(np.float32)
+
+
+def landmark_features(sequence, aspect_ratio=1.0, timestamps_ms=None, keys=None):
+    """
+    Features of a landmark sequence in one vectorized pass.
+
+    sequence is a list of per-frame HandLandmarks (None for frames without hands), or an already
+    stacked (..., T, hands, 21, 3) array with NaN for missing hands. keys names the hand axis
+    of a stacked array, for a list they come from stack_landmarks.
+    """
+    if isinstance(sequence, np.ndarray):
+        points = sequence.astype(np.float32, copy=False)
+        keys = list(keys) if keys is not None else [str(h) for h in range(points.shape[-3])]
+    else:
+        points, keys = stack_landmarks(sequence)
+    if points.shape[-2:] != (NUM_LANDMARKS, 3):
+        raise ValueError(f"Expected (..., T, hands, {NUM_LANDMARKS}, 3) landmarks, got {points.shape}")
+    if aspect_ratio != 1.0:
+        points = points * np.array([aspect_ratio, 1.0, aspect_ratio], dtype=np.float32)
+
+    normalized, scale = normalize_landmarks(points)
+    with np.errstate(invalid="ignore"):
+        velocity = landmark_velocity(points, scale, timestamps_ms)
+        speed = np.linalg.norm(velocity, axis=-1).mean(axis=-1)
+        return LandmarkFeatures(
+            keys, normalized, scale, joint_angles(normalized), fingertip_distances(normalized), velocity, speed
+        )
+
+
+def normalized_movement(features):
+    """
+    Scale-invariant counterpart of sequence_movement: per frame the mean point speed (palm
+    lengths) of the hands present in this and the previous frame.
+
+    Frames without hands get 0, frames whose hands were not in the previous frame inf. Unlike
+    sequence_movement, frames are compared with their direct predecessor, pass the features of
+    the frames with hands only when gaps should be bridged.
+    """
+    present = features.present
+    shared = np.zeros_like(present)
+    shared[..., 1:, :] = present[..., 1:, :] & present[..., :-1, :]
+    counts = shared.sum(axis=-1)
+    totals = np.where(shared, features.speed, 0.0).sum(axis=-1)
+    return np.where(
+        counts > 0, totals / np.maximum(counts, 1), np.where(present.any(axis=-1), np.inf, 0.0)
+    ).astype(np.float32)
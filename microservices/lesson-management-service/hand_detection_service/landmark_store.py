@@ -0,0 +1,237 @@
+"""
+Persistent store of the per-frame landmarks of a video.
+
+Entries are keyed by the content hash of the video (plus the sampling and detection settings
+that produced the landmarks), so re-evaluating the same upload, tuning thresholds or retrying a
+request can run the frame selection on stored landmarks without MediaPipe.
+
+Every entry is one compressed .npz file:
+
+    frame_ids      str      id of every sampled frame, in video order
+    frame_indices  int32    position of the frame in the detection loop
+    keys           str      distinct hand keys ("Left", "Right", ...) of the video
+    row_frame      int32    per hand row: position in frame_ids   } index from frames to rows,
+    row_hand       uint8    per hand row: hand slot in its frame  } rows are grouped by hand key
+    row_key        uint8    per hand row: index into keys
+    confidence     float16  per hand row: handedness score
+    deltas         float16  per hand row: (21, 3) points minus the previous row of the same hand
+
+The deltas are taken against the decoded previous row, so float16 rounding does not add up
+over a long track. The store evicts the least recently read entries once it grows beyond
+max_bytes.
+"""
+import io
+import os
+import hashlib
+import tempfile
+import threading
+import numpy as np
+
+from .landmarks import HandLandmarks, NUM_LANDMARKS
+
+LANDMARK_STORE_MAX_BYTES = int(os.getenv("LANDMARK_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+_ENTRY_SUFFIX = ".npz"
+
+
+def video_content_hash(path, chunk_size=1024 * 1024):
+    """sha256 of a video file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def landmark_key(content_hash, **settings):
+    """Store key for a video and the settings its landmarks depend on"""
+    if not settings:
+        return content_hash
+    described = ",".join(f"{name}={settings[name]}" for name in sorted(settings))
+    return f"{content_hash}-{hashlib.sha256(described.encode()).hexdigest()[:12]}"
+
+
+class LandmarkSequence:
+    """The stored landmarks of one video, landmarks[i] is None for frames without hands"""
+
+    __slots__ = ("frame_ids", "frame_indices", "landmarks")
+
+    def __init__(self, frame_ids, frame_indices, landmarks):
+        self.frame_ids = list(frame_ids)
+        self.frame_indices = [int(i) for i in frame_indices]
+        self.landmarks = list(landmarks)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from (frame id, frame index, landmarks) records, e.g. a detect_frames landmark_log"""
+        records = list(records)
+        return cls([r[0] for r in records], [r[1] for r in records], [r[2] for r in records])
+
+    def __len__(self):
+        return len(self.frame_ids)
+
+    def __iter__(self):
+        return iter(zip(self.frame_ids, self.frame_indices, self.landmarks))
+
+    def landmarks_for(self, frame_id):
+        try:
+            return self.landmarks[self.frame_ids.index(frame_id)]
+        except ValueError:
+            return None
+
+
+def encode_sequence(sequence):
+    """Arrays of the .npz entry for a LandmarkSequence"""
+    keys = []
+    rows = []  # (key index, frame position, hand slot, points, confidence)
+    for position, landmarks in enumerate(sequence.landmarks):
+        if landmarks is None:
+            continue
+        for hand, key in enumerate(landmarks.handedness):
+            if key not in keys:
+                keys.append(key)
+            rows.append((keys.index(key), position, hand, landmarks.points[hand], landmarks.confidence[hand]))
+    rows.sort(key=lambda row: (row[0], row[1]))
+
+    deltas = np.zeros((len(rows), NUM_LANDMARKS, 3), dtype=np.float16)
+    previous_key, decoded = None, None
+    for r, (key, _, _, points, _) in enumerate(rows):
+        reference = decoded if key == previous_key else np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        deltas[r] = (points - reference).astype(np.float16)
+        decoded = reference + deltas[r].astype(np.float32)
+        previous_key = key
+
+    return {
+        "frame_ids": np.array(sequence.frame_ids, dtype=str),
+        "frame_indices": np.array(sequence.frame_indices, dtype=np.int32),
+        "keys": np.array(keys, dtype=str),
+        "row_frame": np.array([row[1] for row in rows], dtype=np.int32),
+        "row_hand": np.array([row[2] for row in rows], dtype=np.uint8),
+        "row_key": np.array([row[0] for row in rows], dtype=np.uint8),
+        "confidence": np.array([row[4] for row in rows], dtype=np.float16),
+        "deltas": deltas,
+    }
+
+
+def decode_sequence(arrays):
+    """LandmarkSequence from the arrays of an .npz entry"""
+    # NpzFile decompresses on every item access, read each array once
+    frame_ids = [str(frame_id) for frame_id in arrays["frame_ids"]]
+    frame_indices = arrays["frame_indices"]
+    keys = [str(key) for key in arrays["keys"]]
+    row_frame = arrays["row_frame"]
+    row_hand = arrays["row_hand"]
+    row_key = arrays["row_key"]
+    confidence = arrays["confidence"].astype(np.float32)
+    deltas = arrays["deltas"].astype(np.float32)
+
+    # rows are grouped by hand key, a running sum inside each group undoes the delta encoding
+    points = np.empty_like(deltas)
+    group_starts = np.flatnonzero(np.r_[True, row_key[1:] != row_key[:-1]]) if len(row_key) else []
+    group_ends = list(group_starts[1:]) + [len(row_key)]
+    for start, end in zip(group_starts, group_ends):
+        points[start:end] = np.cumsum(deltas[start:end], axis=0)
+
+    rows_per_frame = {}
+    for r in np.lexsort((row_hand, row_frame)):
+        rows_per_frame.setdefault(int(row_frame[r]), []).append(r)
+    landmarks = [None] * len(frame_ids)
+    for position, frame_rows in rows_per_frame.items():
+        landmarks[position] = HandLandmarks(
+            points[frame_rows], [keys[row_key[r]] for r in frame_rows], confidence[frame_rows]
+        )
+    return LandmarkSequence(frame_ids, frame_indices, landmarks)
+
+
+class LandmarkStore:
+    """Directory of landmark entries with size based, least recently read eviction"""
+
+    def __init__(self, root_dir, max_bytes=LANDMARK_STORE_MAX_BYTES):
+        self.root_dir = os.path.abspath(root_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, key):
+        if not key or "/" in key or os.sep in key or key.startswith("."):
+            raise ValueError(f"Invalid landmark store key: {key}")
+        return os.path.join(self.root_dir, key + _ENTRY_SUFFIX)
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """The stored LandmarkSequence, None if the key is unknown or the entry is unreadable"""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                sequence = decode_sequence(arrays)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Dropping unreadable landmark entry {key}: {e}")
+            self.delete(key)
+            return None
+        try:
+            # the modification time doubles as the last access time for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return sequence
+
+    def put(self, key, sequence):
+        """Store a LandmarkSequence, returns the entry size in bytes"""
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **encode_sequence(sequence))
+        data = buffer.getvalue()
+        path = self._path(key)
+        # write to a temp file first so concurrent readers (other workers) never see half an entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        return len(data)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def entries(self):
+        """Return {key: (size_in_bytes, last_access_epoch)}"""
+        entries = {}
+        for name in os.listdir(self.root_dir):
+            if name.endswith(_ENTRY_SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.root_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries[name[:-len(_ENTRY_SUFFIX)]] = (stat.st_size, stat.st_mtime)
+        return entries
+
+    def total_bytes(self):
+        return sum(size for size, _ in self.entries().values())
+
+    def evict(self):
+        """Delete the least recently read entries until the store fits max_bytes, returns bytes freed"""
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for size, _ in entries.values())
+            freed = 0
+            for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+                if total - freed <= self.max_bytes:
+                    break
+                if self.delete(key):
+                    freed += size
+            return freed
+
+
+def default_landmark_store_dir():
+    return os.getenv("LANDMARK_STORE_DIR") or os.path.join(tempfile.gettempdir(), "signify_landmarks")
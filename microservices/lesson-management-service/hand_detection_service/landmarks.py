@@ -0,0 +1,177 @@
+"""
+Compact per-frame hand landmark records and the movement math between them.
+
+MediaPipe reports the hands of a frame in no particular order, so comparing landmarks by list
+position mixes up the left and right hand whenever the order flips. HandLandmarks keeps the
+points of every hand together with its handedness label and confidence, and movement is only
+ever computed between hands with the same label.
+"""
+import numpy as np
+
+NUM_LANDMARKS = 21
+MAX_HANDS = 2
+
+
+class HandLandmarks:
+    """Landmarks of the hands detected in one frame
+
+    points      float32 array (hands, 21, 3) in normalized image coordinates
+    handedness  tuple with one key per hand, "Left"/"Right" as reported by MediaPipe
+    confidence  float32 array (hands,) with the handedness score of each hand
+    """
+
+    __slots__ = ("points", "handedness", "confidence")
+
+    def __init__(self, points, handedness, confidence=None):
+        self.points = np.ascontiguousarray(points, dtype=np.float32)
+        self.handedness = _unique_keys(handedness)
+        self.confidence = (
+            np.ones(len(self.handedness), dtype=np.float32) if confidence is None
+            else np.asarray(confidence, dtype=np.float32)
+        )
+
+    @classmethod
+    def from_mediapipe(cls, results):
+        """Build the record from a MediaPipe Hands result, None if no hand was detected"""
+        if not results.multi_hand_landmarks:
+            return None
+        hands = len(results.multi_hand_landmarks)
+        points = np.empty((hands, NUM_LANDMARKS, 3), dtype=np.float32)
+        for h, hand_landmarks in enumerate(results.multi_hand_landmarks):
+            for i, landmark in enumerate(hand_landmarks.landmark):
+                points[h, i] = (landmark.x, landmark.y, landmark.z)
+        handedness, confidence = [], []
+        for h in range(hands):
+            if results.multi_handedness and h < len(results.multi_handedness):
+                classification = results.multi_handedness[h].classification[0]
+                handedness.append(classification.label)
+                confidence.append(classification.score)
+            else:
+                handedness.append(str(h))
+                confidence.append(1.0)
+        return cls(points, handedness, confidence)
+
+    @classmethod
+    def from_array(cls, points):
+        """Wrap a bare (hands, 21, 3) array, hands are keyed by their position"""
+        points = np.asarray(points, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3)
+        return cls(points, [str(h) for h in range(len(points))])
+
+    def __len__(self):
+        return len(self.handedness)
+
+    def __repr__(self):
+        hands = ", ".join(f"{key}={score:.2f}" for key, score in zip(self.handedness, self.confidence))
+        return f"HandLandmarks({hands})"
+
+    def hand(self, key):
+        """Points (21, 3) of the hand with the given key, None if it was not detected"""
+        try:
+            return self.points[self.handedness.index(key)]
+        except ValueError:
+            return None
+
+    def bounding_box(self):
+        """Normalized (x0, y0, x1, y1) box around every detected hand"""
+        xy = self.points[..., :2].reshape(-1, 2)
+        x0, y0 = xy.min(axis=0)
+        x1, y1 = xy.max(axis=0)
+        return float(x0), float(y0), float(x1), float(y1)
+
+    def from_crop(self, box, frame_size):
+        """Map landmarks detected on the crop box=(x0, y0, x1, y1) (pixels) back to the full frame"""
+        x0, y0, x1, y1 = box
+        width, height = frame_size
+        crop_width, crop_height = x1 - x0, y1 - y0
+        points = self.points.copy()
+        points[..., 0] = (points[..., 0] * crop_width + x0) / width
+        points[..., 1] = (points[..., 1] * crop_height + y0) / height
+        # z shares the scale of x
+        points[..., 2] *= crop_width / width
+        return HandLandmarks(points, self.handedness, self.confidence)
+
+    def matching_points(self, other):
+        """Return (own points, other points) stacked for the hands both frames share"""
+        shared = [key for key in self.handedness if key in other.handedness]
+        own = self.points[[self.handedness.index(key) for key in shared]]
+        theirs = other.points[[other.handedness.index(key) for key in shared]]
+        return own, theirs
+
+
+def _unique_keys(labels):
+    # MediaPipe occasionally labels both hands the same, keep them apart as "Left" and "Left#1"
+    keys, seen = [], {}
+    for label in labels:
+        count = seen.get(label, 0)
+        keys.append(label if count == 0 else f"{label}#{count}")
+        seen[label] = count + 1
+    return tuple(keys)
+
+
+def as_hand_landmarks(landmarks):
+    """Accept a HandLandmarks record, a bare (hands, 21, 3) array or None"""
+    if landmarks is None or isinstance(landmarks, HandLandmarks):
+        return landmarks
+    return HandLandmarks.from_array(landmarks)
+
+
+def has_landmarks(landmarks):
+    return landmarks is not None and len(landmarks) > 0
+
+
+def hand_movement(prev_landmarks, current_landmarks):
+    """Mean point distance over the hands present in both frames
+
+    0 if the current frame has no hands, inf if the previous one has none or the two frames do
+    not share a hand (a hand appeared, which counts like the first detection).
+    """
+    if not has_landmarks(current_landmarks):
+        return 0
+    if not has_landmarks(prev_landmarks):
+        return float("inf")
+    current, prev = as_hand_landmarks(current_landmarks).matching_points(as_hand_landmarks(prev_landmarks))
+    if len(current) == 0:
+        return float("inf")
+    return float(np.linalg.norm(current - prev, axis=-1).mean())
+
+
+def stack_landmarks(landmark_sequence):
+    """Stack per-frame landmarks into one (frames, hand keys, 21, 3) float32 array
+
+    Every distinct hand key of the sequence gets its own slot, hands missing in a frame are NaN.
+    Returns (stacked, keys).
+    """
+    records = [as_hand_landmarks(landmarks) for landmarks in landmark_sequence]
+    keys = []
+    for record in records:
+        if record is not None:
+            keys.extend(key for key in record.handedness if key not in keys)
+    stacked = np.full((len(records), max(len(keys), 1), NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+    slots = {key: slot for slot, key in enumerate(keys)}
+    for t, record in enumerate(records):
+        if record is not None:
+            for h, key in enumerate(record.handedness):
+                stacked[t, slots[key]] = record.points[h]
+    return stacked, keys
+
+
+def sequence_movement(landmark_sequence):
+    """
+    Movement of every frame of a sequence relative to the previous frame with hands, in one pass.
+
+    Returns a float32 array with one value per frame: inf for the first frame with hands, 0 for
+    frames without hands, otherwise the same value hand_movement gives.
+    """
+    movement = np.zeros(len(landmark_sequence), dtype=np.float32)
+    detected = np.flatnonzero([has_landmarks(landmarks) for landmarks in landmark_sequence])
+    if len(detected) == 0:
+        return movement
+    stacked, _ = stack_landmarks([landmark_sequence[t] for t in detected])
+    # (frames - 1, hand keys, 21) point distances, NaN wherever a hand is missing in either frame
+    distances = np.linalg.norm(np.diff(stacked, axis=0), axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        counts = np.sum(~np.isnan(distances), axis=(1, 2))
+        totals = np.nansum(distances, axis=(1, 2))
+        movement[detected[1:]] = np.where(counts > 0, totals / np.maximum(counts, 1), np.inf)
+    movement[detected[0]] = np.inf
+    return movement
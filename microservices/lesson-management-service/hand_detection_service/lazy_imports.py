@@ -0,0 +1,30 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access.
+
+    Heavy libraries (cv2, MediaPipe, PIL) take seconds to import; deferring them keeps service
+    start, test collection and autoscaling spin-up fast. cv2 rewrites its own sys.modules entry
+    while importing, which importlib.util.LazyLoader does not allow, hence this small proxy.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
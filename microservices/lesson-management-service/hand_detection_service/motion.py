@@ -0,0 +1,112 @@
+"""
+Cheap motion measurements on downscaled grayscale frames.
+
+A 64x48 thumbnail difference costs a fraction of a millisecond, against tens of milliseconds for
+a MediaPipe pass. Two users:
+
+    AdaptiveSampler     picks the frames to sample from a video, the base interval in calm
+                        stretches and denser where the scene moves a lot (frame_sampler
+                        builds it or the FixedSampler stride from the FRAME_SAMPLING mode)
+    StaticFrameFilter   tells detection which frames did not change since the last frame that
+                        went through MediaPipe, their landmarks are reused instead
+"""
+import os
+import numpy as np
+from .lazy_imports import lazy_import
+
+cv2 = lazy_import("cv2")
+
+THUMBNAIL_SIZE = (64, 48)
+# mean absolute thumbnail difference (0..1) below which a frame counts as static
+STATIC_FRAME_THRESHOLD = float(os.getenv("HAND_DETECTION_STATIC_THRESHOLD", "0.006"))
+# above this difference to the last sample a frame is sampled before the base interval is up
+HIGH_MOTION_THRESHOLD = float(os.getenv("FRAME_SAMPLING_MOTION_THRESHOLD", "0.04"))
+
+
+def motion_thumbnail(frame, size=THUMBNAIL_SIZE):
+    """Downscaled float32 grayscale copy of a BGR frame, values 0..1"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+
+
+def motion_score(thumbnail, reference):
+    """Mean absolute difference of two thumbnails, 0 for identical frames"""
+    return float(np.abs(thumbnail - reference).mean())
+
+
+class AdaptiveSampler:
+    """
+    Decides frame by frame whether to sample it.
+
+    A frame is sampled once base_interval frames have passed since the last sample, or earlier
+    (but never closer than min_interval) when it differs from the last sample by more than
+    high_motion. Calm stretches are sampled at the base rate, fast gestures more densely.
+    """
+
+    def __init__(self, base_interval, min_interval=None, high_motion=HIGH_MOTION_THRESHOLD):
+        self.base_interval = max(1, base_interval)
+        self.min_interval = max(1, min(min_interval or self.base_interval // 3, self.base_interval))
+        self.high_motion = high_motion
+        self._since_sample = None
+        self._reference = None
+        self.motion_samples = 0
+
+    def should_sample(self, frame):
+        if self._since_sample is None or self._since_sample + 1 >= self.base_interval:
+            return self._sample(frame)
+        self._since_sample += 1
+        if self._since_sample >= self.min_interval and self.min_interval < self.base_interval:
+            if motion_score(motion_thumbnail(frame), self._reference) > self.high_motion:
+                self.motion_samples += 1
+                return self._sample(frame)
+        return False
+
+    def _sample(self, frame):
+        self._since_sample = 0
+        self._reference = motion_thumbnail(frame)
+        return True
+
+
+class FixedSampler:
+    """Samples every base_interval-th frame, the AdaptiveSampler interface without motion checks"""
+
+    def __init__(self, base_interval):
+        self.base_interval = max(1, base_interval)
+        self._index = 0
+        self.motion_samples = 0
+
+    def should_sample(self, frame):
+        sample = self._index % self.base_interval == 0
+        self._index += 1
+        return sample
+
+
+def frame_sampler(sampling, base_interval, min_interval=None):
+    """Sampler for one video: AdaptiveSampler in "adaptive" mode, a FixedSampler stride otherwise"""
+    if sampling == "adaptive":
+        return AdaptiveSampler(base_interval, min_interval)
+    return FixedSampler(base_interval)
+
+
+class StaticFrameFilter:
+    """
+    Flags frames that look like the last frame MediaPipe processed.
+
+    Frames are compared against that reference frame rather than their direct predecessor, so
+    slow drift adds up and eventually triggers a new detection.
+    """
+
+    def __init__(self, threshold=STATIC_FRAME_THRESHOLD):
+        self.threshold = threshold
+        self._reference = None
+        self.skipped = 0
+        self.processed = 0
+
+    def is_static(self, frame):
+        thumbnail = motion_thumbnail(frame)
+        if self._reference is not None and motion_score(thumbnail, self._reference) < self.threshold:
+            self.skipped += 1
+            return True
+        self._reference = thumbnail
+        self.processed += 1
+        return False
@@ -0,0 +1,275 @@
+"""
+Batched hand landmark engine on ONNX Runtime.
+
+MediaPipe runs one image per graph call. This engine runs the same two models MediaPipe uses
+(palm detection, then hand landmarks on a rotated crop around every palm) exported to ONNX,
+and feeds them whole batches: all frames of a batch go through palm detection in one call,
+all hand crops of the batch through the landmark model in a second call. The pre- and
+post-processing follows MediaPipe's hand graphs:
+
+    letterbox to 192x192      -> palm detection  -> SSD anchors, sigmoid scores, weighted NMS
+    palm -> rotated square    (wrist to middle finger MCP points up, 2.6x the palm box, shifted
+                               half a box towards the fingers)
+    crop to 224x224           -> hand landmarks  -> presence score, handedness, 21 points
+    points back to the frame
+
+Every frame is detected on its own, there is no tracking from one frame to the next, so the
+frames of a batch are independent and the result does not depend on how frames are batched.
+
+The models are exported once from the .tflite files in the mediapipe package, see
+export_onnx_models.py. Models exported with a fixed batch of 1 still work, one call per frame.
+"""
+import os
+import numpy as np
+from .lazy_imports import lazy_import
+from .landmarks import HandLandmarks, NUM_LANDMARKS, MAX_HANDS
+
+cv2 = lazy_import("cv2")
+ort = lazy_import("onnxruntime")
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+PALM_DETECTION_MODEL = os.getenv("HAND_PALM_DETECTION_ONNX", os.path.join(MODELS_DIR, "palm_detection_lite.onnx"))
+HAND_LANDMARK_MODEL = os.getenv("HAND_LANDMARK_ONNX", os.path.join(MODELS_DIR, "hand_landmark_lite.onnx"))
+# frames per inference call, and ONNX Runtime threads per engine (the pool already runs one engine per core)
+ONNX_BATCH_SIZE = int(os.getenv("HAND_DETECTION_BATCH_SIZE", "16"))
+ONNX_THREADS = int(os.getenv("HAND_DETECTION_ONNX_THREADS", "1"))
+
+PALM_INPUT_SIZE = 192
+LANDMARK_INPUT_SIZE = 224
+# palm detection anchors (SsdAnchorsCalculator options of palm_detection_cpu)
+PALM_ANCHOR_STRIDES = (8, 16, 16, 16)
+PALM_SCORE_CLIP = 100.0
+PALM_KEYPOINTS = 7
+MIN_DETECTION_CONFIDENCE = 0.5
+MIN_PRESENCE_CONFIDENCE = 0.5
+NMS_IOU_THRESHOLD = 0.3
+# palm box -> hand crop (RectTransformationCalculator options of the hand graph)
+HAND_CROP_SCALE = 2.6
+HAND_CROP_SHIFT_Y = -0.5
+# the landmark model reports z in crop pixels scaled by this factor (TensorsToLandmarksCalculator)
+LANDMARK_Z_NORMALIZATION = 0.4
+# the handedness output is the score of the first label of handedness.txt
+HANDEDNESS_LABELS = ("Left", "Right")
+
+
+def palm_anchors(input_size=PALM_INPUT_SIZE, strides=PALM_ANCHOR_STRIDES):
+    """(anchors, 2) anchor centers in 0..1, layers sharing a stride share the grid (2 anchors per layer)"""
+    anchors = []
+    layer = 0
+    while layer < len(strides):
+        stride = strides[layer]
+        repeats = 0
+        while layer < len(strides) and strides[layer] == stride:
+            repeats += 2
+            layer += 1
+        cells = int(np.ceil(input_size / stride))
+        ys, xs = np.meshgrid((np.arange(cells) + 0.5) / cells, (np.arange(cells) + 0.5) / cells, indexing="ij")
+        centers = np.stack([xs.ravel(), ys.ravel()], axis=-1)
+        anchors.append(np.repeat(centers, repeats, axis=0))
+    return np.concatenate(anchors).astype(np.float32)
+
+
+def letterbox(frame, size=PALM_INPUT_SIZE):
+    """Scale the frame into a size x size square with black borders, returns (image, scale, pad_x, pad_y)"""
+    height, width = frame.shape[:2]
+    scale = size / max(width, height)
+    resized = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    pad_x, pad_y = (size - resized.shape[1]) // 2, (size - resized.shape[0]) // 2
+    image = np.zeros((size, size, 3), dtype=np.uint8)
+    image[pad_y:pad_y + resized.shape[0], pad_x:pad_x + resized.shape[1]] = resized
+    return image, scale, pad_x, pad_y
+
+
+def weighted_nms(boxes, scores, iou_threshold=NMS_IOU_THRESHOLD, max_detections=MAX_HANDS):
+    """
+    MediaPipe's weighted non maximum suppression.
+
+    boxes is (n, 4 + 2 * keypoints) with (x0, y0, x1, y1) first, returns (merged rows, scores)
+    where every kept row is the score weighted mean of the candidates overlapping it.
+    """
+    order = np.argsort(-scores)
+    kept_rows, kept_scores = [], []
+    while len(order) and len(kept_rows) < max_detections:
+        top = boxes[order[0]]
+        rest = boxes[order]
+        ix0 = np.maximum(top[0], rest[:, 0])
+        iy0 = np.maximum(top[1], rest[:, 1])
+        ix1 = np.minimum(top[2], rest[:, 2])
+        iy1 = np.minimum(top[3], rest[:, 3])
+        intersection = np.clip(ix1 - ix0, 0, None) * np.clip(iy1 - iy0, 0, None)
+        areas = (rest[:, 2] - rest[:, 0]) * (rest[:, 3] - rest[:, 1])
+        top_area = (top[2] - top[0]) * (top[3] - top[1])
+        iou = intersection / np.maximum(top_area + areas - intersection, 1e-9)
+        overlapping = iou > iou_threshold
+        weights = scores[order[overlapping]]
+        kept_rows.append((rest[overlapping] * weights[:, None]).sum(axis=0) / weights.sum())
+        kept_scores.append(scores[order[0]])
+        order = order[~overlapping]
+    return kept_rows, kept_scores
+
+
+def hand_crop_rect(palm, frame_size):
+    """
+    Rotated square (center x, center y, side, rotation) in pixels around the hand of a palm.
+
+    palm is a decoded detection row in pixels: box (x0, y0, x1, y1), then the keypoints.
+    """
+    width, height = frame_size
+    x0, y0, x1, y1 = palm[:4]
+    wrist, middle_finger = palm[4:6], palm[8:10]
+    # rotate so the wrist -> middle finger MCP direction points up
+    rotation = np.pi / 2 - np.arctan2(-(middle_finger[1] - wrist[1]), middle_finger[0] - wrist[0])
+    rotation = (rotation + np.pi) % (2 * np.pi) - np.pi
+    box_width, box_height = x1 - x0, y1 - y0
+    center_x = (x0 + x1) / 2 - box_height * HAND_CROP_SHIFT_Y * np.sin(rotation)
+    center_y = (y0 + y1) / 2 + box_height * HAND_CROP_SHIFT_Y * np.cos(rotation)
+    side = max(box_width, box_height) * HAND_CROP_SCALE
+    return float(center_x), float(center_y), float(side), float(rotation)
+
+
+def crop_transform(rect, size=LANDMARK_INPUT_SIZE):
+    """Affine transform from the frame to the size x size crop of a rotated rect"""
+    center_x, center_y, side, rotation = rect
+    cos, sin = np.cos(rotation), np.sin(rotation)
+    # top left, top right and bottom left corner of the rect in the frame
+    corners = np.array([(-0.5, -0.5), (0.5, -0.5), (-0.5, 0.5)], dtype=np.float32) * side
+    source = np.stack([
+        center_x + corners[:, 0] * cos - corners[:, 1] * sin,
+        center_y + corners[:, 0] * sin + corners[:, 1] * cos,
+    ], axis=-1).astype(np.float32)
+    target = np.array([(0, 0), (size, 0), (0, size)], dtype=np.float32)
+    return cv2.getAffineTransform(source, target)
+
+
+class OnnxHandEngine:
+    """
+    Palm detection and hand landmarks on ONNX Runtime, batched across frames.
+
+    detect_batch(frames) is the batched entry point, detect(frame) runs a batch of one.
+    The engine keeps no state between frames, reset() has nothing to forget.
+    """
+
+    name = "onnx"
+
+    def __init__(self, palm_model=PALM_DETECTION_MODEL, landmark_model=HAND_LANDMARK_MODEL,
+                 batch_size=ONNX_BATCH_SIZE, threads=ONNX_THREADS, max_num_hands=MAX_HANDS):
+        for path in (palm_model, landmark_model):
+            if not os.path.isfile(path):
+                raise FileNotFoundError(
+                    f"ONNX hand model not found at {path}, export the models with "
+                    "python -m hand_detection_service.export_onnx_models"
+                )
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self._palm = ort.InferenceSession(palm_model, options, providers=["CPUExecutionProvider"])
+        self._landmark = ort.InferenceSession(landmark_model, options, providers=["CPUExecutionProvider"])
+        self.batch_size = max(1, batch_size)
+        self.max_num_hands = max_num_hands
+        self._anchors = palm_anchors()
+        # models exported without a symbolic batch dimension only take one image per call
+        self._palm_batches = not isinstance(self._palm.get_inputs()[0].shape[0], int)
+        self._landmark_batches = not isinstance(self._landmark.get_inputs()[0].shape[0], int)
+        self._landmark_outputs = self._output_order(self._landmark)
+
+    @staticmethod
+    def _output_order(session):
+        # (landmarks, presence, handedness) output names, the world landmarks are not used
+        outputs = session.get_outputs()
+        by_name = {output.name: output.name for output in outputs}
+        if {"Identity", "Identity_1", "Identity_2"} <= set(by_name):
+            return ["Identity", "Identity_1", "Identity_2"]
+        return [output.name for output in outputs[:3]]
+
+    def _run(self, session, images, batches, output_names=None):
+        input_name = session.get_inputs()[0].name
+        step = self.batch_size if batches else 1
+        results = [
+            session.run(output_names, {input_name: images[start:start + step]})
+            for start in range(0, len(images), step)
+        ]
+        return [np.concatenate(parts) for parts in zip(*results)]
+
+    def _detect_palms(self, frames):
+        """Per frame a list of palm rows in frame pixels (box, then keypoints)"""
+        letterboxed = [letterbox(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames]
+        images = np.stack([image for image, _, _, _ in letterboxed]).astype(np.float32) / 255.0
+        regressors, classificators = self._run(self._palm, images, self._palm_batches)
+        scores = 1 / (1 + np.exp(-np.clip(classificators[..., 0], -PALM_SCORE_CLIP, PALM_SCORE_CLIP)))
+
+        palms = []
+        for f, (_, scale, pad_x, pad_y) in enumerate(letterboxed):
+            candidates = np.flatnonzero(scores[f] >= MIN_DETECTION_CONFIDENCE)
+            if len(candidates) == 0:
+                palms.append([])
+                continue
+            raw = regressors[f, candidates] / PALM_INPUT_SIZE
+            anchors = self._anchors[candidates]
+            center = raw[:, :2] + anchors
+            half_size = raw[:, 2:4] / 2
+            keypoints = raw[:, 4:4 + 2 * PALM_KEYPOINTS].reshape(-1, PALM_KEYPOINTS, 2) + anchors[:, None]
+            rows = np.concatenate([center - half_size, center + half_size, keypoints.reshape(len(raw), -1)], axis=1)
+            rows, _ = weighted_nms(rows, scores[f, candidates], max_detections=self.max_num_hands)
+            # letterbox coordinates (0..1 of the square) back to frame pixels
+            palms.append([
+                (np.asarray(row).reshape(-1, 2) * PALM_INPUT_SIZE - (pad_x, pad_y)).ravel() / scale
+                for row in rows
+            ])
+        return palms
+
+    def detect_batch(self, frames, timestamps=None):
+        """HandLandmarks (None without hands) for every frame, timestamps are not needed"""
+        if not frames:
+            return []
+        palms = self._detect_palms(frames)
+
+        crops, owners = [], []
+        for f, frame_palms in enumerate(palms):
+            height, width = frames[f].shape[:2]
+            rgb = None
+            for palm in frame_palms:
+                rgb = cv2.cvtColor(frames[f], cv2.COLOR_BGR2RGB) if rgb is None else rgb
+                rect = hand_crop_rect(palm, (width, height))
+                transform = crop_transform(rect)
+                crops.append(cv2.warpAffine(rgb, transform, (LANDMARK_INPUT_SIZE, LANDMARK_INPUT_SIZE),
+                                            flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT))
+                owners.append((f, rect, cv2.invertAffineTransform(transform)))
+        results = [None] * len(frames)
+        if not crops:
+            return results
+
+        images = np.stack(crops).astype(np.float32) / 255.0
+        points, presence, handedness = self._run(
+            self._landmark, images, self._landmark_batches, self._landmark_outputs
+        )
+        hands_per_frame = {}
+        for c, (f, rect, inverse) in enumerate(owners):
+            if presence[c, 0] < MIN_PRESENCE_CONFIDENCE:
+                continue
+            crop_points = points[c].reshape(NUM_LANDMARKS, 3)
+            xy = crop_points[:, :2] @ inverse[:, :2].T + inverse[:, 2]
+            height, width = frames[f].shape[:2]
+            hand = np.empty((NUM_LANDMARKS, 3), dtype=np.float32)
+            hand[:, 0] = xy[:, 0] / width
+            hand[:, 1] = xy[:, 1] / height
+            # z is relative to the crop, scale it like x (MediaPipe's normalized frame width)
+            hand[:, 2] = crop_points[:, 2] / LANDMARK_INPUT_SIZE / LANDMARK_Z_NORMALIZATION * rect[2] / width
+            left_score = float(handedness[c, 0])
+            label, score = (HANDEDNESS_LABELS[0], left_score) if left_score >= 0.5 else (HANDEDNESS_LABELS[1], 1 - left_score)
+            hands_per_frame.setdefault(f, []).append((hand, label, score))
+
+        for f, hands in hands_per_frame.items():
+            results[f] = HandLandmarks(
+                np.stack([hand for hand, _, _ in hands]), [label for _, label, _ in hands], [score for _, _, score in hands]
+            )
+        return results
+
+    def detect(self, frame, timestamp_ms=None):
+        return self.detect_batch([frame])[0]
+
+    def reset(self):
+        pass
+
+    def close(self):
+        self._palm = None
+        self._landmark = None
@@ -1,108 +1,563 @@
-import cv2
 import sys
-import mediapipe as mp
 import numpy as np
 import os
-import pickle
-import json
+import logging
+import itertools
+import queue
+import threading
+from contextlib import contextmanager
+from .lazy_imports import lazy_import
+from .landmarks import has_landmarks, hand_movement
+from .motion import StaticFrameFilter
+from .smoothing import LandmarkSmoother, LANDMARK_SMOOTHING
+from .engines import create_engine
+
+# cv2 is imported on first use (MediaPipe by the engines), importing this module stays cheap
+cv2 = lazy_import("cv2")
 
 # Set environment variable to force CPU usage
 os.environ['CUDA_VISIBLE_DEVICES'] = '-1'  # Disable GPU
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce TensorFlow logging
 
-# Initialize MediaPipe Hands with CPU-only mode
-mp_hands = mp.solutions.hands.Hands(
-    static_image_mode=False,
-    max_num_hands=2,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5,
-    model_complexity=0  # Use lightweight model
-)
+def default_pool_size():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, int(os.getenv("HAND_DETECTION_POOL_SIZE", cpus)))
+
+# seconds a video session waits for a free graph before it fails instead of queueing on
+HAND_DETECTION_POOL_TIMEOUT = float(os.getenv("HAND_DETECTION_POOL_TIMEOUT", "30"))
+# live streams hold a graph for as long as the user records, they get graphs of their own so an
+# open stream never holds up the detection of uploaded videos
+LIVE_DETECTION_POOL_SIZE = max(1, int(os.getenv("LIVE_DETECTION_POOL_SIZE", "1")))
+LIVE_DETECTION_POOL_TIMEOUT = float(os.getenv("LIVE_DETECTION_POOL_TIMEOUT", "5"))
+
+class HandsPoolTimeout(TimeoutError):
+    """No graph of the pool became free within the checkout timeout"""
+
+class HandsPool:
+    """
+    Pool of hand landmark engines (MediaPipe graphs, see engines.py).
+
+    A graph is not safe to use from several threads and, with static_image_mode=False, carries
+    tracking state from one frame to the next. Every video session checks out a graph of its
+    own, resets its tracking state and returns it when done, so concurrent sessions neither
+    share a graph nor see each other's hands. Graphs are created on demand up to size, further
+    sessions wait up to timeout seconds (None waits forever) for a graph to be returned and
+    then raise HandsPoolTimeout.
+    """
+
+    def __init__(self, size=None, factory=create_engine, timeout=HAND_DETECTION_POOL_TIMEOUT):
+        self.size = size or default_pool_size()
+        self.timeout = timeout
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise HandsPoolTimeout(f"no hand detection graph free after {timeout} s") from None
+
+    @contextmanager
+    def checkout(self, reset=True, timeout=None):
+        """Borrow a graph for one video, its tracking state is reset unless reset=False
+
+        Waits at most timeout seconds (default: the pool's timeout) for a free graph.
+        """
+        hands = self._acquire(self.timeout if timeout is None else timeout)
+        try:
+            if reset:
+                hands.reset()
+            yield hands
+        finally:
+            self._idle.put(hands)
+
+    def warmup(self, frames=3, size=(240, 320)):
+        """Create every graph of the pool and run a few blank frames through each"""
+        blank = np.zeros((size[0], size[1], 3), dtype=np.uint8)
+        graphs = [self._acquire(self.timeout) for _ in range(self.size)]
+        try:
+            for hands in graphs:
+                for _ in range(frames):
+                    extract_landmarks(blank, hands)
+                hands.reset()
+        finally:
+            for hands in graphs:
+                self._idle.put(hands)
+
+    @property
+    def created(self):
+        return self._created
+
+# The pool is created on first use so every (forked) worker process builds its own graphs.
+# A graph created before fork() would lose its calculator threads in the child.
+_hands_pool = None
+_hands_pool_lock = threading.Lock()
+
+_live_hands_pool = None
+
+def get_hands_pool():
+    global _hands_pool
+    with _hands_pool_lock:
+        if _hands_pool is None:
+            _hands_pool = HandsPool()
+        return _hands_pool
+
+def get_live_hands_pool():
+    """The graphs LiveDetectionSession streams check out, separate from the video sessions' pool"""
+    global _live_hands_pool
+    with _hands_pool_lock:
+        if _live_hands_pool is None:
+            _live_hands_pool = HandsPool(LIVE_DETECTION_POOL_SIZE, timeout=LIVE_DETECTION_POOL_TIMEOUT)
+        return _live_hands_pool
+
+_warmed_up = False
+
+def warmup(frames=3, size=(240, 320)):
+    """Run a few blank frames through every pooled graph so the first real requests do not pay graph initialization"""
+    global _warmed_up
+    get_hands_pool().warmup(frames, size)
+    get_live_hands_pool().warmup(frames, size)
+    _warmed_up = True
+
+def is_warmed_up():
+    return _warmed_up
 
-STATE_FILE = "prev_landmarks.pkl"
 THRESHOLD_SMALL = 0.001
 THRESHOLD_MODERATE = 0.05
 THRESHOLD_LARGE = 0.1
 MIN_FRAME_DISTANCE = 1
+# sessions longer than EARLY_SKIP_MIN_FRAMES sampled frames start detection EARLY_FRAMES_SKIPPED in
+EARLY_FRAMES_SKIPPED = 2
+EARLY_SKIP_MIN_FRAMES = 12
+
+logger = logging.getLogger(__name__)
+
+# Per-frame debug output is sampled, only every Nth message is logged to keep I/O off the hot path
+DEBUG_LOG_SAMPLE_RATE = max(1, int(os.getenv("HAND_DETECTION_LOG_SAMPLE_RATE", "25")))
+_debug_log_counter = itertools.count()
+
+def sampled_debug(message, *args):
+    if logger.isEnabledFor(logging.DEBUG) and next(_debug_log_counter) % DEBUG_LOG_SAMPLE_RATE == 0:
+        logger.debug(message, *args)
 
 # Helper function to calculate Euclidean distance
 def euclidean_distance(pt1, pt2):
-    return np.linalg.norm(np.array(pt1) - np.array(pt2))
-
-# Extract landmarks from a frame
-def extract_landmarks(frame):
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = mp_hands.process(frame_rgb)
-    if not results.multi_hand_landmarks:
-        return None  # No hand detected
-    landmarks = []
-    for hand_landmarks in results.multi_hand_landmarks:
-        for landmark in hand_landmarks.landmark:
-            landmarks.append((landmark.x, landmark.y, landmark.z))
-    return landmarks
-
-
-# Analyze movement between two sets of landmarks
+    return np.linalg.norm(np.asarray(pt1, dtype=np.float32) - np.asarray(pt2, dtype=np.float32))
+
+# Extract landmarks from a frame, returns a HandLandmarks record keyed by handedness (None if no hand detected).
+# timestamp_ms is the position of the frame in its video, engines that track by time use it
+def extract_landmarks(frame, hands=None, timestamp_ms=None):
+    if hands is None:
+        # a single image, borrow a freshly reset graph for it
+        with get_hands_pool().checkout() as hands:
+            return extract_landmarks(frame, hands, timestamp_ms)
+    return hands.detect(frame, timestamp_ms)
+
+
+# ROI mode: padding around the hand box (fraction of its size), smallest crop side in pixels and
+# how often a full frame is still searched for hands that entered outside the crop
+ROI_PADDING = float(os.getenv("HAND_DETECTION_ROI_PADDING", "0.5"))
+ROI_MIN_SIZE = int(os.getenv("HAND_DETECTION_ROI_MIN_SIZE", "96"))
+ROI_REFRESH_INTERVAL = int(os.getenv("HAND_DETECTION_ROI_REFRESH_INTERVAL", "30"))
+
+class RoiTracker:
+    """
+    Landmark extraction on a padded crop around the hands of the previous frame.
+
+    The crop is kept while the hands stay inside its inner area and only moved when they get
+    close to its border, so the graph sees a steady view. Detection falls back to the full
+    frame when no hand is found in the crop, and every refresh_interval frames to pick up
+    hands that appeared elsewhere. Landmarks are always returned in full-frame coordinates.
+    """
+
+    def __init__(self, padding=ROI_PADDING, min_size=ROI_MIN_SIZE, refresh_interval=ROI_REFRESH_INTERVAL):
+        self.padding = padding
+        self.min_size = min_size
+        self.refresh_interval = refresh_interval
+        self.box = None
+        self._since_full_frame = 0
+        self.crop_frames = 0
+        self.full_frames = 0
+
+    def reset(self):
+        self.box = None
+        self._since_full_frame = 0
+
+    def _box_around(self, landmarks, width, height):
+        x0, y0, x1, y1 = landmarks.bounding_box()
+        x0, x1 = x0 * width, x1 * width
+        y0, y1 = y0 * height, y1 * height
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        half_w = max((x1 - x0) * (1 + 2 * self.padding), self.min_size) / 2
+        half_h = max((y1 - y0) * (1 + 2 * self.padding), self.min_size) / 2
+        return (max(0, int(cx - half_w)), max(0, int(cy - half_h)),
+                min(width, int(cx + half_w)), min(height, int(cy + half_h)))
+
+    def _inside(self, landmarks, width, height):
+        # the hands are still well inside the crop: no closer to its border than half the padding
+        bx0, by0, bx1, by1 = self.box
+        x0, y0, x1, y1 = landmarks.bounding_box()
+        margin_x = (bx1 - bx0) * self.padding / (2 * (1 + 2 * self.padding))
+        margin_y = (by1 - by0) * self.padding / (2 * (1 + 2 * self.padding))
+        return (x0 * width >= bx0 + margin_x or bx0 == 0) and (x1 * width <= bx1 - margin_x or bx1 == width) \
+            and (y0 * height >= by0 + margin_y or by0 == 0) and (y1 * height <= by1 - margin_y or by1 == height)
+
+    def extract(self, frame, hands, timestamp_ms=None):
+        height, width = frame.shape[:2]
+        self._since_full_frame += 1
+        if self.box is not None and self._since_full_frame < self.refresh_interval:
+            x0, y0, x1, y1 = self.box
+            landmarks = extract_landmarks(frame[y0:y1, x0:x1], hands, timestamp_ms)
+            if landmarks is not None:
+                self.crop_frames += 1
+                landmarks = landmarks.from_crop(self.box, (width, height))
+                if not self._inside(landmarks, width, height):
+                    self.box = self._box_around(landmarks, width, height)
+                return landmarks
+
+        # no crop yet, hands lost in the crop or time for a full-frame look
+        self.full_frames += 1
+        self._since_full_frame = 0
+        landmarks = extract_landmarks(frame, hands, timestamp_ms)
+        self.box = self._box_around(landmarks, width, height) if landmarks is not None else None
+        return landmarks
+
+
+def make_extractor(roi=False, static_threshold=None):
+    """
+    Landmark extraction function for one video, called as extract(frame, hands, timestamp_ms=None).
+
+    roi=True detects on a crop around the previous hands (RoiTracker). With static_threshold
+    frames that barely differ from the last frame MediaPipe processed skip MediaPipe and reuse
+    its landmarks (StaticFrameFilter).
+    """
+    extract = RoiTracker().extract if roi else extract_landmarks
+    if static_threshold is None:
+        return extract
+    static_filter = StaticFrameFilter(static_threshold)
+    last_landmarks = None
+
+    def extract_unless_static(frame, hands, timestamp_ms=None):
+        nonlocal last_landmarks
+        if not static_filter.is_static(frame):
+            last_landmarks = extract(frame, hands, timestamp_ms)
+        return last_landmarks
+
+    extract_unless_static.static_filter = static_filter
+    return extract_unless_static
+
+
+def batches_frames(hands):
+    """True for engines that detect whole batches of frames per call (detect_batch)"""
+    return getattr(hands, "batch_size", 1) > 1 and hasattr(hands, "detect_batch")
+
+
+def iter_batched_landmarks(items, hands, static_filter=None):
+    """
+    Yield (frame index, frame id, frame, timestamp_ms, landmarks) for (index, frame id, frame,
+    timestamp_ms) items, detecting hands.batch_size frames per call.
+
+    With a static_filter, frames that barely changed since the last detected frame are left out
+    of the batches and get that frame's landmarks, like make_extractor's prefilter. ROI tracking
+    needs the previous frame's result and does not apply to batches.
+    """
+    pending = []
+
+    def flush():
+        nonlocal last_landmarks
+        detected = iter(hands.detect_batch(
+            [frame for _, _, frame, _, static in pending if not static],
+            [timestamp_ms for _, _, _, timestamp_ms, static in pending if not static],
+        ))
+        for i, frame_id, frame, timestamp_ms, static in pending:
+            if not static:
+                last_landmarks = next(detected)
+            yield i, frame_id, frame, timestamp_ms, last_landmarks
+        pending.clear()
+
+    last_landmarks = None
+    detect_count = 0
+    for i, frame_id, frame, timestamp_ms in items:
+        static = static_filter is not None and static_filter.is_static(frame)
+        pending.append((i, frame_id, frame, timestamp_ms, static))
+        detect_count += not static
+        if detect_count == hands.batch_size:
+            yield from flush()
+            detect_count = 0
+    if pending:
+        yield from flush()
+
+
+# Analyze movement between two sets of landmarks, only hands with the same handedness are compared
 def calculate_hand_movement(prev_landmarks, current_landmarks):
-    if not current_landmarks:
-        return 0
-    if not prev_landmarks:
-        return float("inf")  # Large movement for initialization
-    distances = [
-        euclidean_distance(prev_landmarks[i], current_landmarks[i])
-        for i in range(min(len(prev_landmarks), len(current_landmarks)))
-    ]
-    result = sum(distances) / len(distances)
-    print(f"Distance results: {result}")
+    result = hand_movement(prev_landmarks, current_landmarks)
+    if has_landmarks(current_landmarks) and has_landmarks(prev_landmarks):
+        sampled_debug("Distance results: %s", result)
     return result
 
+class FrameSelector:
+    """
+    Movement based frame selection for one video, fed the landmarks of one frame at a time.
+
+    The selection only depends on the landmark sequence, so it gives the same result whether
+    the landmarks were extracted frame by frame or in parallel chunks. With smoothing the
+    movement is measured on the One Euro filtered trajectory (see smoothing.py), so landmark
+    jitter on a still hand does not get frames selected.
+    """
+
+    def __init__(self, threshold=THRESHOLD_SMALL, min_frame_distance=MIN_FRAME_DISTANCE, smoothing=LANDMARK_SMOOTHING):
+        self.threshold = threshold
+        self.min_frame_distance = min_frame_distance
+        self.prev_landmarks = None
+        self.last_selected_landmarks = None
+        self.smoother = LandmarkSmoother() if smoothing else None
+
+    def step(self, current_landmarks, frame_index, timestamp_ms=None):
+        """Returns (is_selected, movement) for the next frame, landmarks are None without hands
+
+        timestamp_ms only paces the smoothing, without it frames are taken to be evenly spaced.
+        """
+        if self.smoother is not None:
+            current_landmarks = self.smoother.filter(current_landmarks, frame_index, timestamp_ms)
+        if current_landmarks is None:
+            return False, 0
+
+        # Calculate movement
+        movement = calculate_hand_movement(self.prev_landmarks, current_landmarks)
+        self.prev_landmarks = current_landmarks
+
+        # Avoid redundancy by comparing with the last selected frame
+        if has_landmarks(self.last_selected_landmarks):
+            similarity = calculate_hand_movement(self.last_selected_landmarks, current_landmarks)
+            sampled_debug("Similarity: %s", similarity)
+            if similarity < self.threshold and frame_index % self.min_frame_distance != 0:
+                return False, movement  # Skip frame
+
+        sampled_debug("Movement: %s", movement)
+        # Select frame if movement exceeds threshold
+        is_selected = movement > self.threshold
+        if is_selected:
+            self.last_selected_landmarks = current_landmarks
+        return is_selected, movement
+
 # Process a single frame
-def process_frame(frame, prev_landmarks, last_selected_landmarks, threshold=THRESHOLD_SMALL, min_frame_distance=MIN_FRAME_DISTANCE, frame_index=0):
-    current_landmarks = extract_landmarks(frame)
-    if current_landmarks is None:
-        return False, prev_landmarks, last_selected_landmarks
-
-    # Calculate movement
-    movement = calculate_hand_movement(prev_landmarks, current_landmarks)
-    
-    # Avoid redundancy by comparing with the last selected frame
-    if last_selected_landmarks:
-        similarity = calculate_hand_movement(last_selected_landmarks, current_landmarks)
-        print(f"Similarity: {similarity}")
-        if similarity < threshold and frame_index % min_frame_distance != 0:
-            return False, current_landmarks, last_selected_landmarks # Skip frame
-
-    print(f"Movement: {movement}")
-    # Select frame if movement exceeds threshold
-    is_selected = movement > threshold
-    return is_selected, current_landmarks, current_landmarks if is_selected else last_selected_landmarks
+def process_frame(frame, prev_landmarks, last_selected_landmarks, threshold=THRESHOLD_SMALL, min_frame_distance=MIN_FRAME_DISTANCE, frame_index=0, hands=None):
+    # a single frame has no trajectory to smooth
+    selector = FrameSelector(threshold, min_frame_distance, smoothing=False)
+    selector.prev_landmarks = prev_landmarks
+    selector.last_selected_landmarks = last_selected_landmarks
+    is_selected, _ = selector.step(extract_landmarks(frame, hands), frame_index)
+    return is_selected, selector.prev_landmarks, selector.last_selected_landmarks
 
-def process_frames(frames, output_dir, threshold=THRESHOLD_SMALL, min_frame_distance=MIN_FRAME_DISTANCE):
-    os.makedirs(output_dir, exist_ok=True)
+def load_frame_item(item):
+    """
+    Return (frame id, frame, timestamp in ms) for a frame path, a (frame id, ndarray) pair or a
+    (frame id, ndarray, timestamp_ms) triple. frame is None if it cannot be read, the timestamp
+    None if the item has none.
+    """
+    if not isinstance(item, (str, os.PathLike)):
+        return item if len(item) == 3 else (item[0], item[1], None)
+    # Extract the original frame number from the frame filename
+    original_frame_number = os.path.splitext(os.path.basename(item))[0]
+
+    # Load the frame
+    frame_path = os.path.join("extracted_frames", item)
+    frame = cv2.imread(frame_path)
+    if frame is None:
+        print(f"Error: Could not load frame from {frame_path}", file=sys.stderr)
+    return original_frame_number, frame, None
+
+def selected_frame_path(output_dir, original_frame_number):
+    return os.path.join(output_dir, f"selected_frame_{original_frame_number}.jpg")
+
+def save_selected_frame(output_dir, original_frame_number, frame):
+    # Save the selected frame with its original frame number
+    output_path = selected_frame_path(output_dir, original_frame_number)
+    cv2.imwrite(output_path, frame)
+    return output_path
+
+class SelectedFrame:
+    """
+    A frame picked by the movement selection: its id, landmarks and movement score.
+
+    The image itself is not kept, a long video would otherwise hold every selected frame in
+    memory while only a few of them are ever used. Callers load the frames they pick by id.
+    """
+
+    __slots__ = ("frame_id", "landmarks", "movement")
+
+    def __init__(self, frame_id, landmarks, movement):
+        self.frame_id = frame_id
+        self.landmarks = landmarks
+        self.movement = movement
+
+    def __repr__(self):
+        return f"SelectedFrame({self.frame_id!r}, movement={self.movement:.4f}, hands={len(self.landmarks)})"
+
+def detect_frames(frames, threshold=THRESHOLD_SMALL, min_frame_distance=MIN_FRAME_DISTANCE, debug_dir=None, roi=False,
+                  static_threshold=None, landmark_log=None):
+    """
+    Select the frames with significant hand movement, without touching the disk.
+
+    frames is an iterable of (frame id, BGR ndarray) pairs, or (frame id, ndarray, timestamp_ms)
+    triples with the position of the frame in its video, which paces the smoothing and the
+    engines that track by time (frame file paths are accepted too).
+    It is consumed one frame at a time, so a generator keeps only the current frame in memory,
+    and the frames run through a pooled graph of their own, so several videos can be processed
+    from different threads. Returns a SelectedFrame with the frame id, its landmarks and its
+    movement score for every selected frame, the frames themselves are not kept. With
+    debug_dir the selected frames are written there as selected_frame_<frame id>.jpg. roi and static_threshold pick the
+    extraction mode, see make_extractor, engines that detect batches of frames (batch_size > 1)
+    are fed batches instead, see iter_batched_landmarks. landmark_log, if given, is a list that receives
+    (frame id, frame index, landmarks) for every frame, e.g. for the landmark store.
+    """
+    if debug_dir:
+        os.makedirs(debug_dir, exist_ok=True)
     selected_frames = []
-    prev_landmarks = None
-    last_selected_landmarks = None
+    selector = FrameSelector(threshold, min_frame_distance)
+    extract = make_extractor(roi, static_threshold)
+    static_filter = getattr(extract, "static_filter", None)
+
+    def loaded_frames():
+        for i, item in enumerate(frames):
+            frame_id, frame, timestamp_ms = load_frame_item(item)
+            if frame is not None:
+                yield i, frame_id, frame, timestamp_ms
+
+    # one graph per video, checked out of the pool with its tracking state reset
+    with get_hands_pool().checkout() as hands:
+        if batches_frames(hands):
+            detected = iter_batched_landmarks(loaded_frames(), hands, static_filter)
+        else:
+            detected = (
+                (i, frame_id, frame, timestamp_ms, extract(frame, hands, timestamp_ms))
+                for i, frame_id, frame, timestamp_ms in loaded_frames()
+            )
+        for i, frame_id, frame, timestamp_ms, landmarks in detected:
+            if landmark_log is not None:
+                landmark_log.append((frame_id, i, landmarks))
+            is_selected, movement = selector.step(landmarks, i, timestamp_ms)
+            if is_selected:
+                selected_frames.append(SelectedFrame(frame_id, landmarks, movement))
+                if debug_dir:
+                    save_selected_frame(debug_dir, frame_id, frame)
+
+    if static_filter is not None:
+        logger.debug("Static prefilter skipped MediaPipe on %d of %d frames",
+                     static_filter.skipped, static_filter.skipped + static_filter.processed)
+    return selected_frames
+
+class LiveDetectionSession:
+    """
+    Incremental detection for frames that arrive one at a time, e.g. streamed while recording.
 
-    for i, frame_path in enumerate(frames):
-        # Extract the original frame number from the frame filename
-        original_frame_number = os.path.splitext(os.path.basename(frame_path))[0]
+    The session holds a graph of the live pool (get_live_hands_pool) from open() to close(), a
+    stream never takes a graph away from the detection of uploaded videos. Frames are fed with
+    add_frame and the selected ones accumulate in selected_frames, ready the moment the stream
+    ends. Like detect_frames the session keeps no images, the caller holds on to the frames
+    add_frame reports as selected. add_frame must not be called concurrently for the same
+    session. landmark_log works like detect_frames' landmark_log.
+    """
 
-        # Load the frame
-        frame_path = os.path.join("extracted_frames", frame_path)
-        frame = cv2.imread(frame_path)
-        if frame is None:
-            print(f"Error: Could not load frame from {frame_path}", file=sys.stderr)
-            continue
+    def __init__(self, threshold=THRESHOLD_SMALL, min_frame_distance=MIN_FRAME_DISTANCE, roi=False,
+                 static_threshold=None, landmark_log=None):
+        self.selector = FrameSelector(threshold, min_frame_distance)
+        self.landmark_log = landmark_log
+        self.selected_frames = []
+        self.frames_seen = 0
+        self._extract = make_extractor(roi, static_threshold)
+        self._checkout = None
+        self._hands = None
 
-        # Process the frame
-        is_selected, prev_landmarks, last_selected_landmarks = process_frame(
-            frame, prev_landmarks, last_selected_landmarks, threshold, min_frame_distance, i
-        )
+    def open(self, timeout=None):
+        """Check out a graph of the live pool, raises HandsPoolTimeout when none frees up in time"""
+        # one graph per stream, checked out of the live pool with its tracking state reset
+        checkout = get_live_hands_pool().checkout(timeout=timeout)
+        self._hands = checkout.__enter__()
+        self._checkout = checkout
+        return self
 
+    def close(self):
+        if self._checkout is not None:
+            self._checkout.__exit__(None, None, None)
+            self._checkout = None
+            self._hands = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_frame(self, frame, frame_id=None, timestamp_ms=None):
+        """Run detection and selection on the next frame, returns its SelectedFrame or None
+
+        timestamp_ms is the capture time of the frame relative to the start of the stream.
+        """
+        if self._hands is None:
+            raise RuntimeError("LiveDetectionSession is not open")
+        i = self.frames_seen
+        self.frames_seen += 1
+        landmarks = self._extract(frame, self._hands, timestamp_ms)
+        if frame_id is None:
+            frame_id = f"frame_{i}"
+        if self.landmark_log is not None:
+            self.landmark_log.append((frame_id, i, landmarks))
+        is_selected, movement = self.selector.step(landmarks, i, timestamp_ms)
+        if not is_selected:
+            return None
+        selected = SelectedFrame(frame_id, landmarks, movement)
+        self.selected_frames.append(selected)
+        return selected
+
+def skip_early_frames(frames):
+    """The frames of a session detection runs on, without the early ones of long sessions"""
+    return frames[EARLY_FRAMES_SKIPPED:] if len(frames) > EARLY_SKIP_MIN_FRAMES else frames
+
+def select_from_landmarks(landmark_sequence, threshold=THRESHOLD_SMALL, min_frame_distance=MIN_FRAME_DISTANCE,
+                          smoothing=LANDMARK_SMOOTHING, timestamps_ms=None):
+    """
+    Run the frame selection on already extracted landmarks, no MediaPipe involved.
+
+    landmark_sequence yields (frame id, frame index, landmarks), like a stored LandmarkSequence.
+    timestamps_ms optionally maps frame ids to the position of the frame in its video, like the
+    timestamps detect_frames got. Returns (frame id, landmarks, movement) for every selected frame.
+    """
+    selector = FrameSelector(threshold, min_frame_distance, smoothing)
+    timestamps_ms = timestamps_ms or {}
+    selected = []
+    for frame_id, i, landmarks in landmark_sequence:
+        is_selected, movement = selector.step(landmarks, i, timestamps_ms.get(frame_id))
         if is_selected:
-            # Save the selected frame with its original frame number
-            output_path = os.path.join(output_dir, f"selected_frame_{original_frame_number}.jpg")
-            cv2.imwrite(output_path, frame)
-            selected_frames.append(output_path)
+            selected.append((frame_id, landmarks, movement))
+    return selected
 
-    return selected_frames
\ No newline at end of file
+def process_frames(frames, output_dir, threshold=THRESHOLD_SMALL, min_frame_distance=MIN_FRAME_DISTANCE):
+    """detect_frames for file based callers: writes the selected frames to output_dir and returns their paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    return [
+        selected_frame_path(output_dir, selected.frame_id)
+        for selected in detect_frames(frames, threshold, min_frame_distance, debug_dir=output_dir)
+    ]
@@ -0,0 +1,159 @@
+"""
+Sharded hand detection for long videos.
+
+Landmark extraction is the expensive part of detect_frames and only depends on the frames
+themselves, while the selection is a cheap sequential pass over the landmarks.
+detect_frames_sharded cuts the frame sequence into chunks, extracts the landmarks of every
+chunk in a worker process and feeds the stitched landmark sequence through the same
+FrameSelector detect_frames uses, in frame order, so the selection rule is applied exactly as
+in the sequential loop.
+
+Each chunk is preceded by the last `overlap` frames that went to detection before it. Their
+landmarks are dropped, they only let the worker's tracker lock on to the hands before the first
+frame of the chunk, the way it already has in a single sequential pass. The static prefilter
+compares every frame with the last detected one, possibly chunks back, so it runs here in frame
+order and the workers only get the frames that need detection.
+"""
+import os
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .real_time_hand_detection import (
+    THRESHOLD_SMALL,
+    MIN_FRAME_DISTANCE,
+    FrameSelector,
+    SelectedFrame,
+    get_hands_pool,
+    make_extractor,
+    batches_frames,
+    iter_batched_landmarks,
+    load_frame_item,
+    save_selected_frame,
+)
+from .motion import StaticFrameFilter
+
+CHUNK_SIZE = int(os.getenv("HAND_DETECTION_CHUNK_SIZE", "64"))
+CHUNK_OVERLAP = int(os.getenv("HAND_DETECTION_CHUNK_OVERLAP", "8"))
+
+# one pool per worker count, a pool is never replaced while sessions may still submit to it
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _init_worker():
+    # a worker handles one chunk at a time, a single graph is enough
+    os.environ["HAND_DETECTION_POOL_SIZE"] = "1"
+
+
+def get_executor(workers):
+    """Process pool with `workers` processes shared by every session of this process
+
+    Pools are kept per size, so a session asking for another worker count gets its own pool
+    instead of replacing the one other sessions are using. Workers are spawned rather than
+    forked, MediaPipe's calculator threads do not survive fork().
+    """
+    with _executor_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            executor = _executors[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return executor
+
+
+def shutdown_executor():
+    """Shut every pool down once its submitted chunks are done"""
+    with _executor_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
+
+
+def extract_chunk_landmarks(frames, warmup_frames=0, roi=False, timestamps=None):
+    """Worker side: the landmarks of every frame, None for frames without hands
+
+    The first warmup_frames frames only prime the tracker, their landmarks are not returned.
+    timestamps holds the timestamp in ms (or None) of every frame.
+    """
+    extract = make_extractor(roi)
+    timestamps = timestamps or [None] * len(frames)
+    with get_hands_pool().checkout() as hands:
+        if batches_frames(hands):
+            items = [(i, None, frame, timestamp_ms) for i, (frame, timestamp_ms) in enumerate(zip(frames, timestamps))]
+            landmarks = [record for _, _, _, _, record in iter_batched_landmarks(items, hands)]
+        else:
+            landmarks = [extract(frame, hands, timestamp_ms) for frame, timestamp_ms in zip(frames, timestamps)]
+    return landmarks[warmup_frames:]
+
+
+def detect_frames_sharded(frames, threshold=THRESHOLD_SMALL, min_frame_distance=MIN_FRAME_DISTANCE,
+                          workers=None, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, debug_dir=None, roi=False,
+                          static_threshold=None, landmark_log=None):
+    """
+    detect_frames with the landmark extraction spread over worker processes.
+
+    frames is consumed chunk by chunk and at most two chunks per worker are in flight, so
+    memory stays bounded for long videos. Returns SelectedFrame records like detect_frames.
+    """
+    workers = workers or os.cpu_count() or 1
+    if debug_dir:
+        os.makedirs(debug_dir, exist_ok=True)
+    executor = get_executor(workers)
+    selector = FrameSelector(threshold, min_frame_distance)
+    static_filter = StaticFrameFilter(static_threshold) if static_threshold is not None else None
+    selected_frames = []
+    in_flight = deque()
+    # the last frames that went to detection, they prime the tracker of the next chunk
+    tail = deque(maxlen=max(overlap, 0))
+    last_landmarks = None
+
+    def collect():
+        nonlocal last_landmarks
+        # chunks are collected in submission order, the selector sees the frames in video order
+        chunk, future = in_flight.popleft()
+        detected = iter(future.result())
+        for i, frame_id, frame, timestamp_ms, static in chunk:
+            # a static frame reuses the landmarks of the last detected frame, possibly of an earlier chunk
+            landmarks = last_landmarks if static else next(detected)
+            last_landmarks = landmarks
+            if landmark_log is not None:
+                landmark_log.append((frame_id, i, landmarks))
+            is_selected, movement = selector.step(landmarks, i, timestamp_ms)
+            if is_selected:
+                selected_frames.append(SelectedFrame(frame_id, landmarks, movement))
+                if debug_dir:
+                    save_selected_frame(debug_dir, frame_id, frame)
+
+    def submit(chunk):
+        warmup = list(tail)
+        detect = [(frame, timestamp_ms) for _, _, frame, timestamp_ms, static in chunk if not static]
+        tail.extend(detect)
+        in_flight.append((chunk, executor.submit(
+            extract_chunk_landmarks, [frame for frame, _ in warmup + detect], len(warmup), roi,
+            [timestamp_ms for _, timestamp_ms in warmup + detect],
+        )))
+        while len(in_flight) > 2 * workers:
+            collect()
+
+    chunk = []
+    for i, item in enumerate(frames):
+        frame_id, frame, timestamp_ms = load_frame_item(item)
+        if frame is None:
+            continue
+        # the prefilter runs here in frame order, a worker would only see the frames of its chunk
+        static = static_filter is not None and static_filter.is_static(frame)
+        chunk.append((i, frame_id, frame, timestamp_ms, static))
+        if len(chunk) == chunk_size:
+            submit(chunk)
+            chunk = []
+    if chunk:
+        submit(chunk)
+    while in_flight:
+        collect()
+
+    return selected_frames
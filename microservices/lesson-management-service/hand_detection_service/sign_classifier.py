@@ -0,0 +1,206 @@
+"""
+Tiny landmark-sequence sign classifier, used to verify attempts locally before asking GPT.
+
+A clip is reduced to the frames with hands, turned into per-frame features (joint angles,
+fingertip distances and motion of the left and right hand, see features.py) and resampled to
+SEQUENCE_LENGTH frames. The model is a temporal 1D convolution over those frames, ReLU, mean
+and max pooling over time and a linear layer to the vocabulary:
+
+    (T, 68) -> conv k=3 -> (T-2, channels) -> [mean, max] -> (2 * channels) -> (words)
+
+The probabilities are temperature scaled, the temperature is fitted on held out clips by the
+training script, so a confidence of 0.9 means right about 9 times out of 10 on that data.
+Inference is plain numpy and takes well under a millisecond. Weights are stored as float16 in
+one .npz file, see train_sign_classifier.py for how it is produced.
+"""
+import os
+import numpy as np
+
+from .landmarks import has_landmarks, stack_landmarks
+from .features import landmark_features, WRIST
+
+SIGN_CLASSIFIER_MODEL = os.getenv(
+    "SIGN_CLASSIFIER_MODEL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "sign_classifier.npz")
+)
+SEQUENCE_LENGTH = 24
+HAND_SLOTS = ("Left", "Right")
+FRAME_FEATURES_PER_HAND = 15 + 15 + 1 + 2 + 1  # angles, tip distances, speed, wrist velocity xy, present
+FRAME_FEATURES = FRAME_FEATURES_PER_HAND * len(HAND_SLOTS)
+# how the training landmarks were sampled and detected, stored in the model metadata. The motion
+# features depend on the frame spacing, a model only verifies sequences produced the same way
+SAMPLING_SETTINGS = ("sampling", "interval", "min_interval", "roi", "prefilter", "engine")
+
+
+def sequence_input(landmark_sequence, length=SEQUENCE_LENGTH):
+    """
+    (length, FRAME_FEATURES) float32 model input for a sequence of per-frame HandLandmarks,
+    None if no frame has hands. Frames without hands are dropped, hands are put in a fixed
+    left/right slot.
+    """
+    records = [landmarks for landmarks in landmark_sequence if has_landmarks(landmarks)]
+    if not records:
+        return None
+    points, keys = stack_landmarks(records)
+    slots = np.full((len(records), len(HAND_SLOTS)) + points.shape[2:], np.nan, dtype=np.float32)
+    for slot, key in enumerate(HAND_SLOTS):
+        if key in keys:
+            slots[:, slot] = points[:, keys.index(key)]
+
+    features = landmark_features(slots)
+    per_frame = np.concatenate([
+        features.angles,
+        features.tip_distances,
+        features.speed[..., None],
+        features.velocity[..., WRIST, :2],
+        features.present[..., None].astype(np.float32),
+    ], axis=-1)
+    per_frame = np.nan_to_num(per_frame, nan=0.0, posinf=0.0, neginf=0.0).reshape(len(records), FRAME_FEATURES)
+    return resample(per_frame, length)
+
+
+def resample(frames, length=SEQUENCE_LENGTH):
+    """Pick length frames spread evenly over the sequence (repeating frames of short ones)"""
+    positions = np.linspace(0, len(frames) - 1, length).round().astype(int)
+    return frames[positions]
+
+
+def conv_windows(inputs, kernel):
+    """(B, T, F) -> (B, T - kernel + 1, kernel * F) sliding windows for the temporal convolution"""
+    steps = inputs.shape[1] - kernel + 1
+    return np.concatenate([inputs[:, k:k + steps] for k in range(kernel)], axis=-1)
+
+
+def softmax(logits):
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class SignClassifier:
+    """The classifier weights and the forward pass, load() reads a trained .npz artifact"""
+
+    def __init__(self, labels, conv_weight, conv_bias, out_weight, out_bias, mean, std, temperature=1.0,
+                 kernel=3, metadata=None):
+        self.labels = list(labels)
+        self.conv_weight = np.asarray(conv_weight, dtype=np.float32)
+        self.conv_bias = np.asarray(conv_bias, dtype=np.float32)
+        self.out_weight = np.asarray(out_weight, dtype=np.float32)
+        self.out_bias = np.asarray(out_bias, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+        self.temperature = float(temperature)
+        self.kernel = kernel
+        self.metadata = dict(metadata or {})
+
+    @classmethod
+    def initialize(cls, labels, mean, std, channels=32, kernel=3, seed=0):
+        """Randomly initialized model for training"""
+        rng = np.random.RandomState(seed)
+        fan_in = kernel * FRAME_FEATURES
+        return cls(
+            labels,
+            rng.randn(fan_in, channels) * np.sqrt(2.0 / fan_in), np.zeros(channels),
+            rng.randn(2 * channels, len(labels)) * np.sqrt(1.0 / (2 * channels)), np.zeros(len(labels)),
+            mean, std, 1.0, kernel,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            metadata = {key[len("meta_"):]: arrays[key].item() for key in arrays.files if key.startswith("meta_")}
+            return cls(
+                [str(label) for label in arrays["labels"]],
+                arrays["conv_weight"], arrays["conv_bias"], arrays["out_weight"], arrays["out_bias"],
+                arrays["mean"], arrays["std"], float(arrays["temperature"]), int(arrays["kernel"]), metadata,
+            )
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(
+            path,
+            labels=np.array(self.labels, dtype=str),
+            conv_weight=self.conv_weight.astype(np.float16),
+            conv_bias=self.conv_bias.astype(np.float16),
+            out_weight=self.out_weight.astype(np.float16),
+            out_bias=self.out_bias.astype(np.float16),
+            mean=self.mean,
+            std=self.std,
+            temperature=np.float32(self.temperature),
+            kernel=np.int32(self.kernel),
+            **{f"meta_{key}": np.array(value) for key, value in self.metadata.items()},
+        )
+
+    def forward(self, inputs):
+        """
+        Logits (B, words) for a (B, SEQUENCE_LENGTH, FRAME_FEATURES) batch, before temperature
+        scaling. Also returns the intermediate arrays the training script needs for backprop.
+        """
+        windows = conv_windows((inputs - self.mean) / self.std, self.kernel)
+        hidden = np.maximum(windows @ self.conv_weight + self.conv_bias, 0.0)
+        pooled = np.concatenate([hidden.mean(axis=1), hidden.max(axis=1)], axis=-1)
+        return pooled @ self.out_weight + self.out_bias, (windows, hidden, pooled)
+
+    def predict_proba(self, inputs):
+        """Calibrated probabilities (B, words) for a batch of model inputs"""
+        logits, _ = self.forward(np.asarray(inputs, dtype=np.float32))
+        return softmax(logits / self.temperature)
+
+    def classify(self, landmark_sequence):
+        """{label: probability} for a sequence of per-frame HandLandmarks, None if it has no hands"""
+        inputs = sequence_input(landmark_sequence)
+        if inputs is None:
+            return None
+        return dict(zip(self.labels, self.predict_proba(inputs[None])[0].tolist()))
+
+
+class SignVerifier:
+    """
+    Decides an attempt locally when the classifier is confident enough.
+
+    verify() returns a verdict when the target word is predicted with at least accept
+    probability ("yes"), or when another word of the vocabulary is predicted with at least
+    reject probability ("no"). Anything else, and words outside the vocabulary, return None
+    and are left to GPT.
+    """
+
+    def __init__(self, classifier, accept=0.9, reject=0.95):
+        self.classifier = classifier
+        self.accept = accept
+        self.reject = reject
+
+    def mismatched_settings(self, settings):
+        """The SAMPLING_SETTINGS whose value in settings differs from the model's training run"""
+        metadata = self.classifier.metadata
+        return [key for key in SAMPLING_SETTINGS if key not in metadata or metadata[key] != settings.get(key)]
+
+    def knows(self, word):
+        return word.lower() in (label.lower() for label in self.classifier.labels)
+
+    def verify(self, landmark_sequence, target_word):
+        if not self.knows(target_word):
+            return None
+        probabilities = self.classifier.classify(landmark_sequence)
+        if probabilities is None:
+            return None
+        predicted = max(probabilities, key=probabilities.get)
+        confidence = probabilities[predicted]
+        target_probability = next(p for label, p in probabilities.items() if label.lower() == target_word.lower())
+        if target_probability >= self.accept:
+            answer = "yes"
+        elif predicted.lower() != target_word.lower() and confidence >= self.reject:
+            answer = "no"
+        else:
+            return None
+        return {
+            "answer": answer,
+            "predicted": predicted,
+            "confidence": round(confidence, 4),
+            "target_probability": round(target_probability, 4),
+        }
+
+
+def load_sign_verifier(path=SIGN_CLASSIFIER_MODEL, accept=0.9, reject=0.95):
+    """SignVerifier for the artifact at path, None if there is no trained model"""
+    if not os.path.isfile(path):
+        return None
+    return SignVerifier(SignClassifier.load(path), accept, reject)
@@ -0,0 +1,110 @@
+"""
+Streaming One Euro smoothing of hand landmarks.
+
+MediaPipe landmarks of a hand held still jitter by a few thousandths of the frame size from
+frame to frame, enough to cross a small movement threshold and get a frame selected that shows
+nothing new. The One Euro filter (Casiez et al., CHI 2012) is a low-pass filter whose cutoff
+rises with the speed of the signal:
+
+    cutoff = min_cutoff + beta * |smoothed speed|
+
+Slow or static hands are smoothed strongly, which removes the jitter, while a fast gesture
+raises the cutoff so the filtered landmarks follow it without noticeable lag. Parameters are
+in normalized image units and Hz, the filter runs on wall or frame time in milliseconds.
+"""
+import os
+import math
+import numpy as np
+
+from .landmarks import HandLandmarks, as_hand_landmarks
+
+LANDMARK_SMOOTHING = os.getenv("LANDMARK_SMOOTHING", "1") == "1"
+# cutoff frequency (Hz) for a hand at rest, lower removes more jitter
+LANDMARK_SMOOTHING_MIN_CUTOFF = float(os.getenv("LANDMARK_SMOOTHING_MIN_CUTOFF", "1.0"))
+# how fast the cutoff rises with the speed (normalized units / s), higher means less lag
+LANDMARK_SMOOTHING_BETA = float(os.getenv("LANDMARK_SMOOTHING_BETA", "20.0"))
+LANDMARK_SMOOTHING_D_CUTOFF = float(os.getenv("LANDMARK_SMOOTHING_D_CUTOFF", "1.0"))
+# time between two frames when only frame indices are known, FRAME_INTERVAL frames at 30 fps
+LANDMARK_SMOOTHING_FRAME_PERIOD_MS = float(os.getenv("LANDMARK_SMOOTHING_FRAME_PERIOD_MS", "200"))
+
+
+def smoothing_factor(dt, cutoff):
+    """Exponential smoothing factor of a first order low-pass with the given cutoff (Hz)"""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """One Euro filter over an array signal, every landmark gets its own adaptive cutoff"""
+
+    def __init__(self, min_cutoff=LANDMARK_SMOOTHING_MIN_CUTOFF, beta=LANDMARK_SMOOTHING_BETA,
+                 d_cutoff=LANDMARK_SMOOTHING_D_CUTOFF):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.value = None
+        self.derivative = None
+        self.timestamp_ms = None
+
+    def __call__(self, value, timestamp_ms):
+        """Filtered (..., 3) points for the next sample"""
+        value = np.asarray(value, dtype=np.float32)
+        if self.value is None:
+            self.value = value
+            self.derivative = np.zeros_like(value)
+            self.timestamp_ms = timestamp_ms
+            return value
+        # equal or out of order timestamps would divide by zero, treat them as 1 ms apart
+        dt = max(timestamp_ms - self.timestamp_ms, 1.0) / 1000.0
+        self.timestamp_ms = timestamp_ms
+
+        alpha_d = smoothing_factor(dt, self.d_cutoff)
+        self.derivative = alpha_d * (value - self.value) / dt + (1 - alpha_d) * self.derivative
+        # the cutoff follows the speed of each point, not of each coordinate
+        speed = np.linalg.norm(self.derivative, axis=-1, keepdims=True)
+        tau = 1.0 / (2 * math.pi * (self.min_cutoff + self.beta * speed))
+        alpha = 1.0 / (1.0 + tau / dt)
+        self.value = (alpha * value + (1 - alpha) * self.value).astype(np.float32)
+        return self.value
+
+
+class LandmarkSmoother:
+    """
+    One Euro filter state for every hand of one video or stream, keyed by handedness.
+
+    A hand that is missing from a frame loses its state and starts fresh when it comes back,
+    its old position says nothing about where it reappears.
+    """
+
+    def __init__(self, min_cutoff=LANDMARK_SMOOTHING_MIN_CUTOFF, beta=LANDMARK_SMOOTHING_BETA,
+                 d_cutoff=LANDMARK_SMOOTHING_D_CUTOFF, frame_period_ms=LANDMARK_SMOOTHING_FRAME_PERIOD_MS):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.frame_period_ms = frame_period_ms
+        self._filters = {}
+
+    def reset(self):
+        self._filters = {}
+
+    def filter(self, landmarks, frame_index, timestamp_ms=None):
+        """
+        Smoothed HandLandmarks for the landmarks of the next frame, None for a frame without hands.
+
+        timestamp_ms is the capture time of the frame, without it the frame index times
+        frame_period_ms is used.
+        """
+        record = as_hand_landmarks(landmarks)
+        if record is None or len(record) == 0:
+            self._filters = {}
+            return None
+        if timestamp_ms is None:
+            timestamp_ms = frame_index * self.frame_period_ms
+        filters = {}
+        points = np.empty_like(record.points)
+        for h, key in enumerate(record.handedness):
+            hand_filter = self._filters.get(key) or OneEuroFilter(self.min_cutoff, self.beta, self.d_cutoff)
+            points[h] = hand_filter(record.points[h], timestamp_ms)
+            filters[key] = hand_filter
+        self._filters = filters
+        return HandLandmarks(points, record.handedness, record.confidence)
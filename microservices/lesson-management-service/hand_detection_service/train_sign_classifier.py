@@ -0,0 +1,281 @@
+"""
+Train the sign classifier on recorded example clips.
+
+The data directory has one folder per word of the course vocabulary, holding example clips of
+that sign (videos, or .npz landmark entries as written by the landmark store):
+
+    data/
+        hello/    clip_01.mp4  clip_02.mov ...
+        thanks/   ...
+
+Clips go through the same pipeline as the service's uploads: the frames are picked by the
+--sampling sampler, the early frames of long clips are skipped and the landmarks are detected with
+the configured engine, ROI mode and static prefilter. The defaults come from the service's
+environment variables (FRAME_SAMPLING, MIN_FRAME_INTERVAL, HAND_DETECTION_ROI,
+HAND_DETECTION_PREFILTER), the settings are stored in the model and the service does not use a
+model trained with other settings. Landmarks are cached in --cache-dir so later runs skip
+detection. A share of the clips of every word is held out to pick the best epoch and fit the
+temperature that calibrates the confidence. The result is one small .npz file:
+
+    python -m hand_detection_service.train_sign_classifier --data-dir data \\
+        --output hand_detection_service/models/sign_classifier.npz
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import tempfile
+import numpy as np
+
+from .lazy_imports import lazy_import
+from .landmarks import HandLandmarks
+from .landmark_store import LandmarkStore, LandmarkSequence, decode_sequence, landmark_key, video_content_hash
+from .real_time_hand_detection import detect_frames, skip_early_frames
+from .motion import frame_sampler, STATIC_FRAME_THRESHOLD
+from .engines import DETECTION_ENGINE
+from .sign_classifier import SignClassifier, sequence_input, softmax, SIGN_CLASSIFIER_MODEL
+
+cv2 = lazy_import("cv2")
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".webm")
+# augment crops clips to at least this many frames with hands, shorter clips are not used
+MIN_HAND_FRAMES = 2
+
+
+def sampled_frames(path, settings):
+    """(frame id, frame) of the frames the service would run detection on for this clip"""
+    cap = cv2.VideoCapture(path)
+    sampler = frame_sampler(settings["sampling"], settings["interval"], settings["min_interval"])
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if sampler.should_sample(frame):
+            frames.append((f"frame_{len(frames)}", frame))
+    cap.release()
+    return skip_early_frames(frames)
+
+
+def clip_landmarks(path, settings, store):
+    """Per-frame landmarks of a clip, from the cache when it was extracted before"""
+    if path.endswith(".npz"):
+        with np.load(path, allow_pickle=False) as arrays:
+            return decode_sequence(arrays).landmarks
+    key = landmark_key(video_content_hash(path), **settings)
+    cached = store.get(key)
+    if cached is not None:
+        return cached.landmarks
+    landmark_log = []
+    detect_frames(
+        sampled_frames(path, settings), roi=settings["roi"],
+        static_threshold=STATIC_FRAME_THRESHOLD if settings["prefilter"] else None, landmark_log=landmark_log,
+    )
+    store.put(key, LandmarkSequence.from_records(landmark_log))
+    return [landmarks for _, _, landmarks in landmark_log]
+
+
+def load_dataset(data_dir, settings, store):
+    """{word: [landmark sequence per clip]}, clips with fewer than MIN_HAND_FRAMES frames with hands are skipped"""
+    dataset = {}
+    for word_dir in sorted(glob.glob(os.path.join(data_dir, "*"))):
+        if not os.path.isdir(word_dir):
+            continue
+        clips = [
+            path for path in sorted(glob.glob(os.path.join(word_dir, "*")))
+            if path.lower().endswith(VIDEO_EXTENSIONS + (".npz",))
+        ]
+        sequences = []
+        for path in clips:
+            landmarks = clip_landmarks(path, settings, store)
+            hand_frames = sum(record is not None for record in landmarks)
+            if hand_frames >= MIN_HAND_FRAMES:
+                sequences.append(landmarks)
+            else:
+                print(f"  {hand_frames} frames with hands in {path}, skipped")
+        if sequences:
+            dataset[os.path.basename(word_dir)] = sequences
+            print(f"{os.path.basename(word_dir)}: {len(sequences)} clips")
+    return dataset
+
+
+def augment(sequence, rng, noise=0.003):
+    """Random temporal crop of the clip with jittered landmarks"""
+    frames = [record for record in sequence if record is not None]
+    keep = max(MIN_HAND_FRAMES, int(len(frames) * rng.uniform(0.8, 1.0)))
+    start = rng.randint(0, len(frames) - keep + 1)
+    return [
+        HandLandmarks(record.points + rng.normal(0, noise, record.points.shape), record.handedness, record.confidence)
+        for record in frames[start:start + keep]
+    ]
+
+
+def split(dataset, val_share, rng):
+    """Per word held out clips, every word with at least two clips keeps one for validation"""
+    train, val = [], []
+    for label, sequences in enumerate(dataset.values()):
+        order = rng.permutation(len(sequences))
+        held_out = int(round(len(sequences) * val_share)) if len(sequences) > 1 else 0
+        held_out = max(held_out, 1) if len(sequences) > 1 and val_share > 0 else held_out
+        val += [(sequences[i], label) for i in order[:held_out]]
+        train += [(sequences[i], label) for i in order[held_out:]]
+    return train, val
+
+
+def to_arrays(examples, rng=None, copies=1):
+    inputs, labels = [], []
+    for sequence, label in examples:
+        for _ in range(copies):
+            inputs.append(sequence_input(augment(sequence, rng) if rng is not None else sequence))
+            labels.append(label)
+    return np.stack(inputs).astype(np.float32), np.array(labels)
+
+
+def loss_and_gradients(model, inputs, labels, weight_decay):
+    logits, (windows, hidden, pooled) = model.forward(inputs)
+    probabilities = softmax(logits)
+    batch = len(labels)
+    loss = -np.log(probabilities[np.arange(batch), labels] + 1e-12).mean()
+
+    d_logits = probabilities
+    d_logits[np.arange(batch), labels] -= 1
+    d_logits /= batch
+    grads = {"out_weight": pooled.T @ d_logits + weight_decay * model.out_weight, "out_bias": d_logits.sum(axis=0)}
+    d_pooled = d_logits @ model.out_weight.T
+    channels = hidden.shape[-1]
+    d_mean, d_max = d_pooled[:, :channels], d_pooled[:, channels:]
+    # mean pooling spreads the gradient over every step, max pooling routes it to the max step
+    d_hidden = np.repeat(d_mean[:, None, :] / hidden.shape[1], hidden.shape[1], axis=1)
+    steps = hidden.argmax(axis=1)
+    np.add.at(d_hidden, (np.arange(batch)[:, None], steps, np.arange(channels)[None, :]), d_max)
+    d_hidden *= hidden > 0
+    grads["conv_weight"] = windows.reshape(-1, windows.shape[-1]).T @ d_hidden.reshape(-1, channels) \
+        + weight_decay * model.conv_weight
+    grads["conv_bias"] = d_hidden.sum(axis=(0, 1))
+    return loss, grads
+
+
+def evaluate(model, inputs, labels, temperature=1.0):
+    logits, _ = model.forward(inputs)
+    probabilities = softmax(logits / temperature)
+    nll = -np.log(probabilities[np.arange(len(labels)), labels] + 1e-12).mean()
+    return float(nll), float((probabilities.argmax(axis=1) == labels).mean()), probabilities
+
+
+def expected_calibration_error(probabilities, labels, bins=10):
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == labels
+    edges = np.linspace(0, 1, bins + 1)
+    error = 0.0
+    for low, high in zip(edges[:-1], edges[1:]):
+        in_bin = (confidence > low) & (confidence <= high)
+        if in_bin.any():
+            error += in_bin.mean() * abs(correct[in_bin].mean() - confidence[in_bin].mean())
+    return float(error)
+
+
+def fit_temperature(model, inputs, labels):
+    """Temperature with the lowest held out negative log likelihood
+
+    Only temperatures >= 1 are considered: a small, perfectly separated validation set would
+    otherwise sharpen the probabilities without bound, and a verdict that skips GPT should
+    rather err on the side of too little confidence.
+    """
+    candidates = np.exp(np.linspace(0.0, np.log(10.0), 40))
+    return float(min(candidates, key=lambda t: evaluate(model, inputs, labels, t)[0]))
+
+
+def train(dataset, epochs=300, batch_size=32, learning_rate=3e-3, weight_decay=1e-4, channels=32,
+          augment_copies=8, val_share=0.2, seed=0):
+    rng = np.random.RandomState(seed)
+    labels = list(dataset)
+    train_examples, val_examples = split(dataset, val_share, rng)
+    train_inputs, train_labels = to_arrays(train_examples, rng, augment_copies)
+    val_inputs, val_labels = to_arrays(val_examples) if val_examples else (train_inputs, train_labels)
+
+    mean = train_inputs.reshape(-1, train_inputs.shape[-1]).mean(axis=0)
+    std = train_inputs.reshape(-1, train_inputs.shape[-1]).std(axis=0) + 1e-3
+    model = SignClassifier.initialize(labels, mean, std, channels=channels, seed=seed)
+    params = ["conv_weight", "conv_bias", "out_weight", "out_bias"]
+    moments = {name: (np.zeros_like(getattr(model, name)), np.zeros_like(getattr(model, name))) for name in params}
+    best = (np.inf, None)
+    step = 0
+    for epoch in range(epochs):
+        order = rng.permutation(len(train_labels))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            _, grads = loss_and_gradients(model, train_inputs[batch], train_labels[batch], weight_decay)
+            step += 1
+            for name in params:
+                # Adam
+                m, v = moments[name]
+                m[:] = 0.9 * m + 0.1 * grads[name]
+                v[:] = 0.999 * v + 0.001 * grads[name] ** 2
+                update = learning_rate * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-8)
+                setattr(model, name, (getattr(model, name) - update).astype(np.float32))
+        val_loss, val_accuracy, _ = evaluate(model, val_inputs, val_labels)
+        if val_loss < best[0]:
+            best = (val_loss, {name: getattr(model, name).copy() for name in params}, epoch, val_accuracy)
+        if epoch % 25 == 0:
+            print(f"epoch {epoch:>4}  val loss {val_loss:.4f}  val accuracy {val_accuracy:.3f}")
+
+    for name, value in best[1].items():
+        setattr(model, name, value)
+    _, _, uncalibrated = evaluate(model, val_inputs, val_labels)
+    model.temperature = fit_temperature(model, val_inputs, val_labels)
+    _, val_accuracy, calibrated = evaluate(model, val_inputs, val_labels, model.temperature)
+    model.metadata = {
+        "val_accuracy": round(val_accuracy, 4),
+        "val_clips": len(val_examples),
+        "train_clips": len(train_examples),
+        "ece_before": round(expected_calibration_error(uncalibrated, val_labels), 4),
+        "ece_after": round(expected_calibration_error(calibrated, val_labels), 4),
+        "best_epoch": best[2],
+    }
+    if not val_examples:
+        print("Warning: no held out clips, the temperature is fitted on the training clips")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the landmark sequence sign classifier")
+    parser.add_argument("--data-dir", required=True, help="one folder of example clips per word")
+    parser.add_argument("--output", default=SIGN_CLASSIFIER_MODEL)
+    parser.add_argument("--sampling", choices=["adaptive", "fixed"], default=os.getenv("FRAME_SAMPLING", "adaptive"),
+                        help="frame sampling mode, like FRAME_SAMPLING")
+    parser.add_argument("--interval", type=int, default=6, help="base sampling stride, like FRAME_INTERVAL")
+    parser.add_argument("--min-interval", type=int, default=int(os.getenv("MIN_FRAME_INTERVAL", "2")),
+                        help="closest adaptive samples, like MIN_FRAME_INTERVAL")
+    parser.add_argument("--roi", action=argparse.BooleanOptionalAction,
+                        default=os.getenv("HAND_DETECTION_ROI", "0") == "1",
+                        help="ROI detection, like HAND_DETECTION_ROI")
+    parser.add_argument("--prefilter", action=argparse.BooleanOptionalAction,
+                        default=os.getenv("HAND_DETECTION_PREFILTER", "1") == "1",
+                        help="static frame prefilter, like HAND_DETECTION_PREFILTER")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "signify_training_landmarks"))
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--channels", type=int, default=32)
+    parser.add_argument("--augment", type=int, default=8, help="augmented copies of every training clip")
+    parser.add_argument("--val-share", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings = {
+        "sampling": args.sampling, "interval": args.interval, "min_interval": args.min_interval,
+        "roi": args.roi, "prefilter": args.prefilter, "engine": DETECTION_ENGINE,
+    }
+    dataset = load_dataset(args.data_dir, settings, LandmarkStore(args.cache_dir, max_bytes=sys.maxsize))
+    if len(dataset) < 2:
+        parser.error("need example clips of at least two words")
+    start = time.perf_counter()
+    model = train(dataset, epochs=args.epochs, channels=args.channels, augment_copies=args.augment,
+                  val_share=args.val_share, seed=args.seed)
+    model.metadata.update(settings)
+    model.save(args.output)
+    print(f"Trained in {time.perf_counter() - start:.1f} s: {model.metadata}")
+    print(f"Model written to {args.output} ({os.path.getsize(args.output)} bytes, temperature {model.temperature:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+SERVICE_ROOT = Path(__file__).resolve().parent.parent
+
+# hand_detection_service is imported as a package from lesson-management-service, the gesture
+# service modules (frame_archive, cleanup, tracing, ...) and its benchmark scripts from their own
+# directories
+GESTURE_SERVICE = SERVICE_ROOT / "gpt-gesture-detection-service"
+for path in (SERVICE_ROOT, GESTURE_SERVICE, GESTURE_SERVICE / "benchmarks"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from hand_detection_service import real_time_hand_detection  # noqa: E402
+from hand_detection_service.landmarks import HandLandmarks  # noqa: E402
+
+STUB_HAND = np.random.RandomState(0).uniform(0.3, 0.6, (21, 3)).astype(np.float32)
+
+
+class TrackingStubEngine:
+    """Hand position read off the frame brightness, finds no hand on the first frame after reset
+
+    Like a real tracker its output depends on the frames it saw before, a chunk without warmup
+    frames would miss the hand on its first frame.
+    """
+
+    def __init__(self):
+        self.locked = False
+
+    def detect(self, frame, timestamp_ms=None):
+        was_locked, self.locked = self.locked, True
+        value = float(frame.mean())
+        if not was_locked or value < 10:
+            return None
+        return HandLandmarks((STUB_HAND + value / 1000)[None], ["Right"])
+
+    def reset(self):
+        self.locked = False
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def stub_hands_pool(monkeypatch):
+    """Every detection of the test runs on TrackingStubEngine graphs instead of MediaPipe"""
+    pool = real_time_hand_detection.HandsPool(size=4, factory=TrackingStubEngine)
+    monkeypatch.setattr(real_time_hand_detection, "_hands_pool", pool)
+    return pool
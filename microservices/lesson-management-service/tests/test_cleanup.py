@@ -0,0 +1,89 @@
+import os
+import time
+
+from cleanup import RetentionPolicy, SessionJanitor, session_temp_dir
+from frame_storage import InMemoryFrameStorage
+
+
+def make_janitor(tmp_path, storage, **policy):
+    return SessionJanitor(lambda: storage, RetentionPolicy(**policy), temp_root=str(tmp_path))
+
+
+def make_temp_dir(tmp_path, session_prefix, size=100, age=0):
+    path = session_temp_dir(session_prefix, str(tmp_path))
+    os.makedirs(path)
+    with open(os.path.join(path, "video.mp4"), "wb") as f:
+        f.write(b"v" * size)
+    if age:
+        old = time.time() - age
+        os.utime(path, (old, old))
+    return path
+
+
+def age_objects(storage, prefix, seconds):
+    for key, (data, modified) in list(storage._objects.items()):
+        if key.startswith(prefix):
+            storage._objects[key] = (data, modified - seconds)
+
+
+def test_session_finished_deletes_frames_and_temp_dir(tmp_path):
+    storage = InMemoryFrameStorage()
+    storage.put("USER_DATA/a/frame_0.jpg", b"12345")
+    storage.put("USER_DATA/b/frame_0.jpg", b"keep")
+    temp_dir = make_temp_dir(tmp_path, "USER_DATA/a/")
+    janitor = make_janitor(tmp_path, storage)
+
+    janitor.session_finished("USER_DATA/a/")
+
+    assert list(storage.list_keys("USER_DATA/")) == ["USER_DATA/b/frame_0.jpg"]
+    assert not os.path.exists(temp_dir)
+    assert janitor.totals == {"objects_deleted": 1, "storage_bytes_reclaimed": 5,
+                              "temp_dirs_removed": 1, "temp_bytes_reclaimed": 100}
+
+
+def test_retention_defers_deletion_to_the_sweep(tmp_path, monkeypatch):
+    storage = InMemoryFrameStorage()
+    storage.put("USER_DATA/a/frame_0.jpg", b"12345")
+    janitor = make_janitor(tmp_path, storage, frame_retention_seconds=60, orphan_max_age_seconds=3600)
+
+    janitor.session_finished("USER_DATA/a/")
+    assert janitor.sweep()["sessions"] == 0
+    assert storage.list_keys("USER_DATA/a/")
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert janitor.sweep()["sessions"] == 1
+    assert not storage.list_keys("USER_DATA/a/")
+
+
+def test_sweep_removes_orphans_by_their_newest_object(tmp_path):
+    storage = InMemoryFrameStorage()
+    storage.put("USER_DATA/old/frame_0.jpg", b"1")
+    storage.put("USER_DATA/old/frame_1.jpg", b"22")
+    storage.put("USER_DATA/mixed/frame_0.jpg", b"1")
+    age_objects(storage, "USER_DATA/old/", 7200)
+    age_objects(storage, "USER_DATA/mixed/", 7200)
+    # a recent object keeps the whole session alive
+    storage.put("USER_DATA/mixed/frame_1.jpg", b"1")
+    janitor = make_janitor(tmp_path, storage, orphan_max_age_seconds=3600)
+
+    report = janitor.sweep()
+
+    assert report["sessions"] == 1 and report["objects"] == 2 and report["storage_bytes"] == 3
+    assert sorted(storage.list_keys("USER_DATA/")) == ["USER_DATA/mixed/frame_0.jpg", "USER_DATA/mixed/frame_1.jpg"]
+
+
+def test_sweep_removes_stale_temp_dirs_only(tmp_path):
+    stale = make_temp_dir(tmp_path, "USER_DATA/stale/", size=10, age=7200)
+    fresh = make_temp_dir(tmp_path, "USER_DATA/fresh/")
+    janitor = make_janitor(tmp_path, InMemoryFrameStorage(), temp_dir_max_age_seconds=3600)
+
+    report = janitor.sweep()
+
+    assert report["temp_dirs"] == 1 and report["temp_bytes"] == 10
+    assert not os.path.exists(stale) and os.path.exists(fresh)
+
+
+def test_retention_never_shorter_than_orphan_age():
+    policy = RetentionPolicy(frame_retention_seconds=7200, orphan_max_age_seconds=60)
+    assert policy.orphan_max_age_seconds == 7200
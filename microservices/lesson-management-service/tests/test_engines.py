@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from hand_detection_service.engines import TasksHandLandmarkerEngine, create_engine, landmarks_from_tasks
+
+
+class FakeLandmarker:
+    """Stands in for the Tasks HandLandmarker, records the timestamps it is given"""
+
+    def __init__(self, result=None):
+        self.timestamps = []
+        self.closed = False
+        self.result = result or SimpleNamespace(hand_landmarks=[], handedness=[])
+
+    def detect_for_video(self, image, timestamp_ms):
+        # VIDEO mode rejects timestamps that do not increase
+        assert not self.timestamps or timestamp_ms > self.timestamps[-1]
+        self.timestamps.append(timestamp_ms)
+        return self.result
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def landmarkers(monkeypatch):
+    """Every TasksHandLandmarkerEngine gets FakeLandmarkers, listed in creation order"""
+    created = []
+
+    def create(engine):
+        created.append(FakeLandmarker())
+        return created[-1]
+
+    monkeypatch.setattr(TasksHandLandmarkerEngine, "_create", create)
+    return created
+
+
+@pytest.fixture
+def engine(landmarkers, tmp_path):
+    model = tmp_path / "hand_landmarker.task"
+    model.write_bytes(b"")
+    return TasksHandLandmarkerEngine(model_asset_path=str(model), frame_period_ms=200)
+
+
+FRAME = np.zeros((24, 32, 3), dtype=np.uint8)
+
+
+def test_tasks_engine_needs_the_model_bundle(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        TasksHandLandmarkerEngine(model_asset_path=str(tmp_path / "missing.task"))
+
+
+def test_frames_without_timestamps_are_spaced_by_the_frame_period(engine, landmarkers):
+    for _ in range(3):
+        assert engine.detect(FRAME) is None
+    assert landmarkers[0].timestamps == [0, 200, 400]
+
+
+def test_timestamps_that_do_not_advance_are_nudged(engine, landmarkers):
+    for timestamp_ms in (0.0, 66.7, 66.7, 50.0, 133.3, 133.9):
+        engine.detect(FRAME, timestamp_ms)
+    assert landmarkers[0].timestamps == [0, 66, 67, 68, 133, 134]
+
+
+def test_reset_starts_a_fresh_landmarker(engine, landmarkers):
+    engine.detect(FRAME, 1000)
+    engine.detect(FRAME, 1200)
+    engine.reset()
+    assert landmarkers[0].closed
+    # the next video starts over at 0 on a new landmarker, no tracking state carries over
+    engine.detect(FRAME, 0)
+    engine.detect(FRAME)
+    assert len(landmarkers) == 2
+    assert landmarkers[1].timestamps == [0, 200]
+
+
+def test_landmarks_from_tasks_result():
+    point = SimpleNamespace(x=0.5, y=0.25, z=-0.1)
+    result = SimpleNamespace(
+        hand_landmarks=[[point] * 21, [point] * 21],
+        handedness=[[SimpleNamespace(category_name="Left", score=0.9)], []],
+    )
+    landmarks = landmarks_from_tasks(result)
+    assert list(landmarks.handedness) == ["Left", "1"]
+    np.testing.assert_allclose(landmarks.points[0, 0], [0.5, 0.25, -0.1], rtol=1e-6)
+    assert landmarks_from_tasks(SimpleNamespace(hand_landmarks=[], handedness=[])) is None
+
+
+def test_create_engine_rejects_unknown_engines():
+    with pytest.raises(ValueError, match="mediapipe"):
+        create_engine("mediapipe")
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from hand_detection_service.features import (
+    FINGER_CHAINS,
+    FINGERTIPS,
+    WRIST,
+    fingertip_distances,
+    joint_angles,
+    landmark_features,
+    landmark_velocity,
+    normalize_landmarks,
+    normalized_movement,
+)
+from hand_detection_service.landmarks import HandLandmarks
+
+# fingers fanned out from the wrist, every one of them straight
+FINGER_DIRECTIONS = [(-1.0, -0.5), (-0.5, -1.0), (0.0, -1.0), (0.5, -1.0), (1.0, -0.5)]
+BONE = 0.03
+
+
+def straight_hand(wrist=(0.5, 0.6, 0.0)):
+    points = np.zeros((21, 3), dtype=np.float32)
+    points[WRIST] = wrist
+    for chain, (dx, dy) in zip(FINGER_CHAINS, FINGER_DIRECTIONS):
+        direction = np.array([dx, dy, 0.0]) / np.hypot(dx, dy)
+        for k, landmark in enumerate(chain[1:], start=1):
+            points[landmark] = points[WRIST] + direction * BONE * k
+    return points
+
+
+def random_hand(rng):
+    return rng.uniform(0.3, 0.7, (21, 3)).astype(np.float32)
+
+
+def rotate_xy(points, angle, center):
+    rotation = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+    return ((points - center) @ rotation.T + center).astype(np.float32)
+
+
+def test_features_do_not_depend_on_hand_position_or_size():
+    rng = np.random.RandomState(0)
+    # (T, hands, 21, 3): a hand moving over four frames
+    sequence = np.stack([random_hand(rng)[None] for _ in range(4)])
+    moved = sequence * 0.5 + np.array([0.2, -0.1, 0.05], dtype=np.float32)
+    near, far = landmark_features(sequence), landmark_features(moved)
+    for name in ("normalized", "angles", "tip_distances", "velocity", "speed"):
+        np.testing.assert_allclose(getattr(far, name), getattr(near, name), rtol=1e-4, atol=1e-5, err_msg=name)
+    np.testing.assert_allclose(far.scale, near.scale * 0.5, rtol=1e-5)
+
+
+def test_straight_fingers_have_no_joint_angles():
+    normalized, scale = normalize_landmarks(straight_hand())
+    assert scale == pytest.approx(BONE)
+    np.testing.assert_allclose(joint_angles(normalized), 0.0, atol=1e-3)
+
+    # bend the index finger by 90 degrees at its middle joint (landmark 6)
+    points = straight_hand()
+    points[7:9] = rotate_xy(points[7:9], np.pi / 2, points[6])
+    angles = joint_angles(normalize_landmarks(points)[0])
+    index_middle_joint = 1 * 3 + 1
+    assert angles[index_middle_joint] == pytest.approx(np.pi / 2, abs=1e-3)
+    assert np.delete(angles, index_middle_joint) == pytest.approx(0.0, abs=1e-3)
+
+
+def test_fingertip_distances_are_the_tip_pairs_then_tip_to_wrist():
+    normalized = normalize_landmarks(random_hand(np.random.RandomState(1)))[0]
+    pairs = [(a, b) for i, a in enumerate(FINGERTIPS) for b in FINGERTIPS[i + 1:]]
+    pairs += [(WRIST, tip) for tip in FINGERTIPS]
+    expected = [np.linalg.norm(normalized[a] - normalized[b]) for a, b in pairs]
+    np.testing.assert_allclose(fingertip_distances(normalized), expected, rtol=1e-5)
+    # thumb to index first, middle finger tip to wrist in the last block
+    assert pairs[0] == (4, 8) and pairs[12] == (WRIST, 12)
+
+
+def test_velocity_is_zero_where_a_hand_appears_and_nan_where_it_is_missing():
+    hand = straight_hand()
+    # (T=4, hands=1, 21, 3): present, missing, back and moved along x
+    points = np.stack([hand, np.full_like(hand, np.nan), hand, hand + [0.01, 0, 0]])[:, None]
+    scale = normalize_landmarks(points)[1]
+    with np.errstate(invalid="ignore"):
+        velocity = landmark_velocity(points, scale)
+    assert not velocity[0].any()
+    assert np.isnan(velocity[1]).all()
+    assert not velocity[2].any()
+    np.testing.assert_allclose(velocity[3, 0, :, 0], 0.01 / BONE, rtol=1e-4)
+
+
+def test_velocity_with_timestamps_is_per_second():
+    hand = straight_hand()
+    points = np.stack([hand, hand + [0.01, 0, 0], hand + [0.02, 0, 0]])[:, None]
+    scale = normalize_landmarks(points)[1]
+    # 100 ms then 50 ms between the frames, the second step is twice as fast
+    velocity = landmark_velocity(points, scale, timestamps_ms=[0.0, 100.0, 150.0])
+    np.testing.assert_allclose(velocity[1, 0, :, 0], 0.01 / BONE / 0.1, rtol=1e-4)
+    np.testing.assert_allclose(velocity[2, 0, :, 0], 0.01 / BONE / 0.05, rtol=1e-4)
+
+
+def test_normalized_movement_marks_frames_without_hands_and_new_hands():
+    hand = straight_hand()
+    sequence = [
+        None,
+        HandLandmarks(hand[None], ["Right"]),
+        HandLandmarks((hand + [0.01, 0, 0])[None], ["Right"]),
+        None,
+        HandLandmarks(hand[None], ["Right"]),
+    ]
+    movement = normalized_movement(landmark_features(sequence))
+    assert movement[0] == 0 and movement[3] == 0
+    assert movement[1] == np.inf and movement[4] == np.inf
+    assert movement[2] == pytest.approx(0.01 / BONE, rel=1e-4)
+
+
+def test_aspect_ratio_makes_lengths_isotropic():
+    # the same hand upright and turned by 90 degrees, seen on a frame twice as wide as high,
+    # where normalized image coordinates squeeze x (and z) by half
+    hand = straight_hand()
+    turned = rotate_xy(hand, np.pi / 2, hand[WRIST])
+    squeeze = np.array([0.5, 1.0, 0.5], dtype=np.float32)
+    upright_image, turned_image = (hand * squeeze)[None, None], (turned * squeeze)[None, None]
+
+    corrected = [landmark_features(points, aspect_ratio=2.0) for points in (upright_image, turned_image)]
+    np.testing.assert_allclose(corrected[0].tip_distances, corrected[1].tip_distances, rtol=1e-4)
+    np.testing.assert_allclose(corrected[0].angles, corrected[1].angles, atol=1e-3)
+    assert corrected[0].scale[0, 0] == pytest.approx(BONE)
+
+    squeezed = [landmark_features(points) for points in (upright_image, turned_image)]
+    assert not np.allclose(squeezed[0].tip_distances, squeezed[1].tip_distances, rtol=1e-2)
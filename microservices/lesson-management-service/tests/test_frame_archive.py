@@ -0,0 +1,104 @@
+import pytest
+
+import frame_archive
+from frame_storage import InMemoryFrameStorage
+
+FRAMES = [b"first", b"", b"x" * 1000, b"last frame"]
+
+
+class CountingStorage(InMemoryFrameStorage):
+    def __init__(self):
+        super().__init__()
+        self.ranges = []
+
+    def get_range(self, key, start, end):
+        self.ranges.append((start, end))
+        return super().get_range(key, start, end)
+
+
+def stored_archive(frames=FRAMES):
+    storage = CountingStorage()
+    storage.put("S/frames.sfa", frame_archive.pack_frames(frames))
+    return storage
+
+
+def test_pack_unpack_round_trip():
+    assert frame_archive.unpack_frames(frame_archive.pack_frames(FRAMES)) == FRAMES
+    assert frame_archive.unpack_frames(frame_archive.pack_frames([])) == []
+
+
+def test_unpack_rejects_foreign_blobs():
+    with pytest.raises(frame_archive.ArchiveFormatError):
+        frame_archive.unpack_frames(b"JPEG" + bytes(8))
+    with pytest.raises(frame_archive.ArchiveFormatError):
+        frame_archive.unpack_frames(b"SF")
+
+
+def test_frame_refs():
+    ref = frame_archive.frame_ref("USER_DATA/a/frames.sfa", 12)
+    assert ref == "USER_DATA/a/frames.sfa#frame_12.jpg"
+    assert frame_archive.parse_frame_ref(ref) == ("USER_DATA/a/frames.sfa", 12)
+    assert frame_archive.parse_frame_ref("USER_DATA/a/frame_12.jpg") is None
+    # the position of the frame in its video is part of the name, not of the archive index
+    ref = frame_archive.frame_ref("USER_DATA/a/frames.sfa", 12, timestamp_ms=400.4)
+    assert ref == "USER_DATA/a/frames.sfa#frame_12.t400.jpg"
+    assert frame_archive.parse_frame_ref(ref) == ("USER_DATA/a/frames.sfa", 12)
+
+
+def test_read_index_matches_packed_offsets():
+    storage = stored_archive()
+    index = frame_archive.read_index(storage, "S/frames.sfa")
+    blob = storage.get("S/frames.sfa")
+    assert [blob[offset:offset + length] for offset, length in index] == FRAMES
+
+
+def test_read_index_of_long_archive_needs_a_second_range(monkeypatch):
+    monkeypatch.setattr(frame_archive, "HEADER_PROBE_FRAMES", 2)
+    frames = [bytes([i]) * (i + 1) for i in range(10)]
+    storage = stored_archive(frames)
+    index = frame_archive.read_index(storage, "S/frames.sfa")
+    assert len(index) == 10
+    assert len(storage.ranges) == 2
+
+
+def test_read_frames_merges_neighbouring_ranges():
+    storage = stored_archive()
+    index = frame_archive.read_index(storage, "S/frames.sfa")
+    storage.ranges.clear()
+    frames = frame_archive.read_frames(storage, "S/frames.sfa", [3, 0, 2, 99], index)
+    assert frames == {0: FRAMES[0], 2: FRAMES[2], 3: FRAMES[3]}
+    assert len(storage.ranges) == 1
+
+
+def test_read_frames_splits_distant_ranges(monkeypatch):
+    monkeypatch.setattr(frame_archive, "RANGE_MERGE_GAP", 10)
+    storage = stored_archive()
+    frames = frame_archive.read_frames(storage, "S/frames.sfa", [0, 3])
+    assert frames == {0: FRAMES[0], 3: FRAMES[3]}
+    # one for the index, one per frame since the 1000 byte frame between them is not fetched
+    assert len(storage.ranges) == 3
+
+
+def test_archive_writer_streams_the_same_archive_as_pack_frames():
+    # a tiny spool limit makes the writer spill its payloads to disk
+    with frame_archive.ArchiveWriter(spool_bytes=16) as writer:
+        indices = [writer.add(data) for data in FRAMES]
+        assert indices == list(range(len(FRAMES)))
+        expected = frame_archive.pack_frames(FRAMES)
+        assert writer.size == len(expected)
+        assert writer.open().read() == expected
+        # reading in small pieces, the way a multipart upload does
+        stream = writer.open()
+        assert b"".join(iter(lambda: stream.read(7), b"")) == expected
+
+
+def test_archive_writer_uploads_through_put_stream(tmp_path):
+    from frame_storage import LocalFrameStorage
+
+    with frame_archive.ArchiveWriter(spool_bytes=16) as writer:
+        for data in FRAMES:
+            writer.add(data)
+        for storage in (InMemoryFrameStorage(), LocalFrameStorage(str(tmp_path))):
+            storage.put_stream("S/frames.sfa", writer.open())
+            frames = frame_archive.read_frames(storage, "S/frames.sfa", range(len(FRAMES)))
+            assert frames == dict(enumerate(FRAMES))
@@ -0,0 +1,102 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from hand_detection_service.landmarks import HandLandmarks
+from hand_detection_service.landmark_store import (
+    LandmarkSequence,
+    LandmarkStore,
+    decode_sequence,
+    encode_sequence,
+    landmark_key,
+)
+
+
+def tracked_sequence(frames=60, seed=0):
+    """A left hand drifting across the frame, a right hand in some frames, gaps without hands"""
+    rng = np.random.RandomState(seed)
+    left = rng.uniform(0.2, 0.4, (21, 3))
+    right = rng.uniform(0.6, 0.8, (21, 3))
+    landmarks = []
+    for t in range(frames):
+        left = left + rng.normal(0, 0.01, left.shape)
+        right = right + rng.normal(0, 0.01, right.shape)
+        if t % 7 == 3:
+            landmarks.append(None)
+        elif t % 3 == 0:
+            landmarks.append(HandLandmarks(np.stack([right, left]), ["Right", "Left"], [0.8, 0.9]))
+        else:
+            landmarks.append(HandLandmarks(left[None], ["Left"], [0.95]))
+    return LandmarkSequence([f"frame_{t}" for t in range(frames)], range(frames), landmarks)
+
+
+def assert_same_sequence(decoded, original, atol):
+    assert decoded.frame_ids == original.frame_ids
+    assert decoded.frame_indices == original.frame_indices
+    for got, expected in zip(decoded.landmarks, original.landmarks):
+        if expected is None:
+            assert got is None
+            continue
+        assert got.handedness == expected.handedness
+        np.testing.assert_allclose(got.points, expected.points, atol=atol)
+        np.testing.assert_allclose(got.confidence, expected.confidence, atol=1e-3)
+
+
+def test_encode_decode_round_trip_keeps_float16_precision_over_long_tracks():
+    original = tracked_sequence(frames=500)
+    # deltas against the decoded previous row, so the error stays at one float16 rounding step
+    assert_same_sequence(decode_sequence(encode_sequence(original)), original, atol=1e-3)
+
+
+def test_encode_decode_without_hands():
+    original = LandmarkSequence(["a", "b"], [0, 1], [None, None])
+    assert_same_sequence(decode_sequence(encode_sequence(original)), original, atol=0)
+
+
+def test_landmark_key_depends_on_settings():
+    assert landmark_key("abc") == "abc"
+    assert landmark_key("abc", interval=6, roi=False) == landmark_key("abc", roi=False, interval=6)
+    assert landmark_key("abc", interval=6) != landmark_key("abc", interval=3)
+
+
+def test_store_put_get(tmp_path):
+    store = LandmarkStore(str(tmp_path))
+    original = tracked_sequence()
+    store.put("video", original)
+    assert "video" in store
+    assert_same_sequence(store.get("video"), original, atol=1e-3)
+    assert store.get("missing") is None
+
+
+def test_store_drops_unreadable_entries(tmp_path):
+    store = LandmarkStore(str(tmp_path))
+    with open(os.path.join(str(tmp_path), "broken.npz"), "wb") as f:
+        f.write(b"not an npz file")
+    assert store.get("broken") is None
+    assert "broken" not in store
+
+
+def test_store_rejects_keys_outside_its_directory(tmp_path):
+    store = LandmarkStore(str(tmp_path))
+    for key in ("../escape", ".hidden", ""):
+        with pytest.raises(ValueError):
+            store.get(key)
+
+
+def test_store_evicts_least_recently_read_entries(tmp_path):
+    store = LandmarkStore(str(tmp_path), max_bytes=10 ** 9)
+    for i, key in enumerate(("a", "b", "c")):
+        store.put(key, tracked_sequence(seed=i))
+        old = time.time() - 100 + i
+        os.utime(os.path.join(str(tmp_path), key + ".npz"), (old, old))
+    # reading "a" makes it the most recently used entry
+    store.get("a")
+    sizes = {key: size for key, (size, _) in store.entries().items()}
+    store.max_bytes = sizes["a"] + sizes["c"]
+
+    freed = store.evict()
+
+    assert freed == sizes["b"]
+    assert sorted(store.entries()) == ["a", "c"]
@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+import pytest
+
+from hand_detection_service.landmarks import (
+    HandLandmarks,
+    hand_movement,
+    sequence_movement,
+    stack_landmarks,
+)
+
+
+def random_hands(rng, keys):
+    return HandLandmarks(rng.uniform(0, 1, (len(keys), 21, 3)), keys)
+
+
+def loop_movement(prev_points, current_points):
+    # the per-point loop the vectorized movement replaced, on flat lists of (x, y, z) points
+    if not current_points:
+        return 0
+    if not prev_points:
+        return float("inf")
+    distances = [
+        math.dist(prev_points[i], current_points[i])
+        for i in range(min(len(prev_points), len(current_points)))
+    ]
+    return sum(distances) / len(distances)
+
+
+def reference_sequence_movement(sequence):
+    movement, prev = [], None
+    for landmarks in sequence:
+        if landmarks is None:
+            movement.append(0.0)
+            continue
+        movement.append(hand_movement(prev, landmarks))
+        prev = landmarks
+    return np.array(movement, dtype=np.float32)
+
+
+def test_hand_movement_matches_the_point_loop():
+    rng = np.random.RandomState(0)
+    for _ in range(20):
+        prev, current = random_hands(rng, ["Right"]), random_hands(rng, ["Right"])
+        expected = loop_movement(prev.points[0].tolist(), current.points[0].tolist())
+        assert hand_movement(prev, current) == pytest.approx(expected, rel=1e-5)
+
+
+def test_hand_movement_only_compares_matching_hands():
+    rng = np.random.RandomState(1)
+    left, right = rng.uniform(0, 1, (2, 21, 3))
+    prev = HandLandmarks(np.stack([left, right]), ["Left", "Right"])
+    # same hands reported in the other order, nothing moved
+    assert hand_movement(prev, HandLandmarks(np.stack([right, left]), ["Right", "Left"])) == 0
+    assert hand_movement(HandLandmarks(left[None], ["Left"]), HandLandmarks(right[None], ["Right"])) == math.inf
+    assert hand_movement(None, prev) == math.inf
+    assert hand_movement(prev, None) == 0
+
+
+def test_sequence_movement_matches_frame_by_frame_movement():
+    rng = np.random.RandomState(2)
+    sequence = [
+        None,
+        random_hands(rng, ["Left"]),
+        random_hands(rng, ["Left", "Right"]),
+        None,
+        random_hands(rng, ["Right", "Left"]),
+        random_hands(rng, ["Right"]),
+        random_hands(rng, ["Left"]),
+    ]
+    np.testing.assert_allclose(sequence_movement(sequence), reference_sequence_movement(sequence), rtol=1e-5)
+
+
+def test_sequence_movement_without_hands():
+    assert sequence_movement([None, None]).tolist() == [0.0, 0.0]
+
+
+def test_stack_landmarks_pads_missing_hands_with_nan():
+    rng = np.random.RandomState(3)
+    stacked, keys = stack_landmarks([random_hands(rng, ["Left"]), None, random_hands(rng, ["Right", "Left"])])
+    assert keys == ["Left", "Right"]
+    assert stacked.shape == (3, 2, 21, 3)
+    assert np.isnan(stacked[0, 1]).all() and np.isnan(stacked[1]).all() and not np.isnan(stacked[2]).any()
+
+
+def test_duplicate_labels_are_kept_apart():
+    hands = HandLandmarks(np.zeros((2, 21, 3)), ["Left", "Left"])
+    assert hands.handedness == ("Left", "Left#1")
@@ -0,0 +1,45 @@
+import time
+import asyncio
+
+import httpx
+
+from load_test import NO_FRAMES_FEEDBACK, percentile, run_session
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 50) is None
+    assert percentile(list(range(1, 7)), 50) == 3
+    assert percentile([1, 2], 50) == 1
+    assert percentile(list(range(1, 21)), 95) == 19
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile([5], 99) == 5
+    assert percentile([3, 1, 2], 0) == 1
+    assert percentile([3, 1, 2], 100) == 3
+
+
+def run_against(analysis, arrived=None):
+    """run_session against a stub service that answers /process-video with analysis"""
+    def handler(request):
+        if request.url.path == "/upload-video":
+            return httpx.Response(200, json={"video_server_path": "/uploads/gesture_0.mp4"})
+        return httpx.Response(200, json={"status": "success", "analysis": analysis})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await run_session(client, "http://service", b"video", "gesture_0.mp4", "hello", arrived)
+
+    return asyncio.run(run())
+
+
+def test_a_verdict_without_frames_is_an_error():
+    assert run_against({"answer": "yes", "feedback": ""})["ok"]
+    record = run_against({"answer": "no", "feedback": NO_FRAMES_FEEDBACK})
+    assert not record["ok"] and record["error"] == "no frames"
+
+
+def test_latency_counts_from_the_arrival():
+    # the session arrived half a second before it got a slot
+    record = run_against({"answer": "yes", "feedback": ""}, arrived=time.perf_counter() - 0.5)
+    assert record["ok"]
+    assert record["queued_ms"] >= 500
+    assert record["total_ms"] >= record["queued_ms"]
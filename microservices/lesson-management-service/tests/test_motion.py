@@ -0,0 +1,53 @@
+import numpy as np
+
+from hand_detection_service.motion import (
+    AdaptiveSampler, FixedSampler, StaticFrameFilter, frame_sampler, motion_score, motion_thumbnail,
+)
+
+
+def frame(value, size=(96, 128)):
+    return np.full(size + (3,), value, dtype=np.uint8)
+
+
+def test_motion_score_of_identical_and_different_frames():
+    black, white = motion_thumbnail(frame(0)), motion_thumbnail(frame(255))
+    assert motion_score(black, black) == 0.0
+    assert motion_score(black, white) == 1.0
+
+
+def test_static_filter_compares_against_the_last_processed_frame():
+    static_filter = StaticFrameFilter(threshold=0.01)
+    # every step changes less than the threshold, the drift adds up against the reference
+    steps = [100, 101, 102, 103, 104]
+    assert [static_filter.is_static(frame(v)) for v in steps] == [False, True, True, False, True]
+    assert (static_filter.processed, static_filter.skipped) == (2, 3)
+
+
+def test_static_filter_passes_every_changing_frame():
+    static_filter = StaticFrameFilter(threshold=0.01)
+    assert not any(static_filter.is_static(frame(v)) for v in (0, 50, 100, 150))
+
+
+def test_adaptive_sampler_keeps_the_base_interval_when_calm():
+    sampler = AdaptiveSampler(base_interval=6, min_interval=2, high_motion=0.04)
+    picks = [i for i in range(18) if sampler.should_sample(frame(100))]
+    assert picks == [0, 6, 12]
+    assert sampler.motion_samples == 0
+
+
+def test_adaptive_sampler_samples_early_on_motion_but_not_closer_than_min_interval():
+    sampler = AdaptiveSampler(base_interval=6, min_interval=2, high_motion=0.04)
+    values = [0, 100, 200, 0, 100, 200, 0]
+    picks = [i for i, v in enumerate(values) if sampler.should_sample(frame(v))]
+    assert picks == [0, 2, 4, 6]
+    assert sampler.motion_samples == 3
+
+
+def test_frame_sampler_picks_the_sampler_of_the_sampling_mode():
+    assert isinstance(frame_sampler("adaptive", 6, 2), AdaptiveSampler)
+    sampler = frame_sampler("fixed", 6, 2)
+    assert isinstance(sampler, FixedSampler)
+    # the fixed stride ignores motion entirely
+    values = [0, 100, 200, 0, 100, 200, 0, 100, 200, 0, 100, 200, 0]
+    assert [i for i, v in enumerate(values) if sampler.should_sample(frame(v))] == [0, 6, 12]
+    assert sampler.motion_samples == 0
@@ -0,0 +1,105 @@
+import cv2
+import numpy as np
+import pytest
+
+from hand_detection_service.onnx_engine import (
+    HAND_CROP_SCALE,
+    LANDMARK_INPUT_SIZE,
+    PALM_INPUT_SIZE,
+    crop_transform,
+    hand_crop_rect,
+    letterbox,
+    palm_anchors,
+    weighted_nms,
+)
+
+
+def palm(box, wrist, middle_finger):
+    """Decoded palm row: box, then the 7 keypoints (wrist first, middle finger MCP third)"""
+    keypoints = np.zeros((7, 2), dtype=np.float32)
+    keypoints[0], keypoints[2] = wrist, middle_finger
+    return np.concatenate([np.asarray(box, dtype=np.float32), keypoints.ravel()])
+
+
+def test_palm_anchors_match_the_model_outputs():
+    anchors = palm_anchors()
+    # 24x24 cells with 2 anchors at stride 8, 12x12 cells with 6 anchors for the three stride 16 layers
+    assert anchors.shape == (2016, 2)
+    assert len(anchors) == 24 * 24 * 2 + 12 * 12 * 6
+    np.testing.assert_allclose(anchors[0], anchors[1])
+    np.testing.assert_allclose(anchors[0], [0.5 / 24, 0.5 / 24])
+    np.testing.assert_allclose(anchors[24 * 24 * 2], [0.5 / 12, 0.5 / 12])
+    assert ((anchors > 0) & (anchors < 1)).all()
+
+
+def test_weighted_nms_merges_overlapping_boxes():
+    boxes = np.array([
+        [0.10, 0.10, 0.30, 0.30],
+        [0.12, 0.10, 0.32, 0.30],
+        [0.60, 0.60, 0.80, 0.80],
+    ], dtype=np.float32)
+    scores = np.array([0.9, 0.6, 0.7], dtype=np.float32)
+    rows, kept_scores = weighted_nms(boxes, scores, max_detections=2)
+    assert kept_scores == pytest.approx([0.9, 0.7])
+    # the first two overlap and are merged into their score weighted mean
+    np.testing.assert_allclose(rows[0], (boxes[0] * 0.9 + boxes[1] * 0.6) / 1.5, rtol=1e-5)
+    np.testing.assert_allclose(rows[1], boxes[2])
+
+
+def test_weighted_nms_stops_at_max_detections():
+    boxes = np.array([[0.1 * i, 0.0, 0.1 * i + 0.05, 0.05] for i in range(5)], dtype=np.float32)
+    scores = np.linspace(0.9, 0.5, 5).astype(np.float32)
+    rows, kept_scores = weighted_nms(boxes, scores, max_detections=2)
+    assert len(rows) == 2
+    assert kept_scores == pytest.approx(scores[:2])
+
+
+def test_letterbox_pads_and_maps_back_to_the_frame():
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    frame[40:60, 150:170] = 255
+    image, scale, pad_x, pad_y = letterbox(frame)
+    assert image.shape == (PALM_INPUT_SIZE, PALM_INPUT_SIZE, 3)
+    assert scale == pytest.approx(PALM_INPUT_SIZE / 200)
+    assert (pad_x, pad_y) == (0, 48)
+    # the borders stay black
+    assert not image[:pad_y].any() and not image[-pad_y:].any()
+
+    # the bright square, found in the letterboxed image, lands where it was in the frame
+    ys, xs = np.nonzero(image[..., 0] > 127)
+    center = (np.array([xs.mean(), ys.mean()]) + 0.5 - (pad_x, pad_y)) / scale
+    np.testing.assert_allclose(center, [160, 50], atol=1.0)
+
+
+def test_crop_rect_of_an_upright_hand_is_not_rotated():
+    # fingers point up: the crop is shifted half a box towards them
+    rect = hand_crop_rect(palm([100, 200, 140, 240], wrist=(120, 240), middle_finger=(120, 200)), (640, 480))
+    center_x, center_y, side, rotation = rect
+    assert rotation == pytest.approx(0.0, abs=1e-6)
+    assert (center_x, center_y) == pytest.approx((120, 200))
+    assert side == pytest.approx(40 * HAND_CROP_SCALE)
+
+
+def test_crop_rect_of_a_sideways_hand_turns_the_fingers_up():
+    # fingers point right: rotated by 90 degrees and shifted to the right
+    rect = hand_crop_rect(palm([100, 200, 140, 240], wrist=(100, 220), middle_finger=(140, 220)), (640, 480))
+    center_x, center_y, _, rotation = rect
+    assert rotation == pytest.approx(np.pi / 2)
+    assert (center_x, center_y) == pytest.approx((140, 220))
+
+    # the top of the crop is at the fingertips' side of the hand
+    inverse = cv2.invertAffineTransform(crop_transform(rect))
+    top_center = inverse @ [LANDMARK_INPUT_SIZE / 2, 0, 1]
+    assert top_center[0] > center_x
+    assert top_center[1] == pytest.approx(center_y, abs=1e-3)
+
+
+def test_crop_transform_round_trips():
+    rect = (320.0, 200.0, 150.0, 0.7)
+    transform = crop_transform(rect)
+    inverse = cv2.invertAffineTransform(transform)
+    # the rect center is the crop center
+    np.testing.assert_allclose(transform @ [320, 200, 1], [LANDMARK_INPUT_SIZE / 2] * 2, atol=1e-3)
+    points = np.random.RandomState(0).uniform(0, LANDMARK_INPUT_SIZE, (10, 2))
+    in_frame = points @ inverse[:, :2].T + inverse[:, 2]
+    back = in_frame @ transform[:, :2].T + transform[:, 2]
+    np.testing.assert_allclose(back, points, atol=1e-3)
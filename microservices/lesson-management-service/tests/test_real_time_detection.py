@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import STUB_HAND, TrackingStubEngine
+from hand_detection_service import real_time_hand_detection
+from hand_detection_service.landmarks import HandLandmarks
+from hand_detection_service.motion import StaticFrameFilter
+from hand_detection_service.real_time_hand_detection import (
+    HandsPool,
+    HandsPoolTimeout,
+    LiveDetectionSession,
+    detect_frames,
+    iter_batched_landmarks,
+    make_extractor,
+    process_frames,
+)
+
+
+def frames(values):
+    return [(f"frame_{i}", np.full((24, 32, 3), value, dtype=np.uint8)) for i, value in enumerate(values)]
+
+
+def test_selected_frames_keep_ids_landmarks_and_scores_but_no_image(stub_hands_pool):
+    log = []
+    selected = detect_frames(frames([50, 60, 70, 200]), threshold=0.005, landmark_log=log)
+    assert [s.frame_id for s in selected] == ["frame_1", "frame_2", "frame_3"]
+    assert not hasattr(selected[0], "frame")
+    # the landmarks of a selected frame are the ones detected on it
+    assert all(s.landmarks is landmarks for s, (_, _, landmarks) in zip(selected, log[1:]))
+
+
+def test_frames_are_only_written_in_debug_mode(stub_hands_pool, tmp_path):
+    detect_frames(frames([50, 60, 70]), threshold=0.005)
+    assert not any(tmp_path.iterdir())
+    paths = process_frames(frames([50, 60, 70]), str(tmp_path), threshold=0.005)
+    assert [os.path.basename(path) for path in paths] == ["selected_frame_frame_1.jpg", "selected_frame_frame_2.jpg"]
+    assert all(os.path.isfile(path) for path in paths)
+
+
+def test_checkout_times_out_when_every_graph_is_busy():
+    pool = HandsPool(size=1, factory=TrackingStubEngine, timeout=0.05)
+    with pool.checkout():
+        with pytest.raises(HandsPoolTimeout):
+            with pool.checkout():
+                pass
+    # the graph went back to the pool, the next checkout gets it
+    with pool.checkout() as hands:
+        assert isinstance(hands, TrackingStubEngine)
+
+
+def test_live_sessions_do_not_take_graphs_of_the_video_pool(stub_hands_pool, monkeypatch):
+    live_pool = HandsPool(size=1, factory=TrackingStubEngine, timeout=0.05)
+    monkeypatch.setattr(real_time_hand_detection, "_live_hands_pool", live_pool)
+    session = LiveDetectionSession().open()
+    try:
+        # a second stream is rejected instead of waiting forever
+        with pytest.raises(HandsPoolTimeout):
+            LiveDetectionSession().open()
+        # uploaded videos are still detected while the stream runs
+        assert detect_frames(frames([50, 60, 70, 200]), threshold=0.005)
+    finally:
+        session.close()
+    LiveDetectionSession().open().close()
+
+
+class StubBatchEngine:
+    """Stateless engine that detects whole batches, like OnnxHandEngine"""
+
+    batch_size = 3
+
+    def __init__(self):
+        self.batches = []
+
+    def detect_batch(self, frames, timestamps=None):
+        self.batches.append(len(frames))
+        return [self.detect(frame) for frame in frames]
+
+    def detect(self, frame, timestamp_ms=None):
+        value = float(frame.mean())
+        if value < 10:
+            return None
+        return HandLandmarks((STUB_HAND + value / 1000)[None], ["Right"])
+
+
+def points(landmarks):
+    return None if landmarks is None else landmarks.points.tolist()
+
+
+@pytest.mark.parametrize("static_threshold", [None, 0.01])
+def test_batched_detection_matches_per_frame_detection(static_threshold):
+    values = [50, 50, 60, 0, 70, 70, 70, 80, 90, 200]
+    items = [(i, frame_id, frame, i * 100.0) for i, (frame_id, frame) in enumerate(frames(values))]
+    engine = StubBatchEngine()
+    extract = make_extractor(static_threshold=static_threshold)
+    expected = [(i, frame_id, frame, ts, extract(frame, engine, ts)) for i, frame_id, frame, ts in items]
+
+    engine.batches.clear()
+    static_filter = StaticFrameFilter(static_threshold) if static_threshold is not None else None
+    batched = list(iter_batched_landmarks(items, engine, static_filter))
+    assert [row[:4] for row in batched] == [row[:4] for row in expected]
+    assert [points(row[4]) for row in batched] == [points(row[4]) for row in expected]
+    # full batches of frames that need detection, static frames are left out of them
+    assert static_filter is None or static_filter.skipped == 3
+    assert all(size == engine.batch_size for size in engine.batches[:-1])
+    assert sum(engine.batches) == len(values) - (static_filter.skipped if static_filter else 0)
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from hand_detection_service import sharded_detection
+from hand_detection_service.real_time_hand_detection import detect_frames
+from hand_detection_service.sharded_detection import detect_frames_sharded
+
+
+@pytest.fixture
+def stub_engines(monkeypatch, stub_hands_pool):
+    # worker threads instead of spawned processes, so the workers use the stub pool too
+    executors = []
+
+    def get_executor(workers):
+        executors.append(ThreadPoolExecutor(workers))
+        return executors[-1]
+
+    monkeypatch.setattr(sharded_detection, "get_executor", get_executor)
+    yield
+    for executor in executors:
+        executor.shutdown()
+
+
+def clip():
+    """Moving hand with still stretches (runs of identical frames), a gap without hands and a return
+
+    The frames are unevenly spaced in time like adaptively sampled ones.
+    """
+    rng = np.random.RandomState(1)
+    values = []
+    for _ in range(12):
+        values += [int(rng.randint(20, 240))] * int(rng.randint(1, 5))
+    values += [0] * 3 + [120, 130, 130, 140]
+    timestamps = np.cumsum(rng.choice([67.0, 200.0], len(values))) - 67.0
+    return [(f"frame_{i}", np.full((24, 32, 3), value, dtype=np.uint8), timestamp_ms)
+            for i, (value, timestamp_ms) in enumerate(zip(values, timestamps))]
+
+
+def run(detect, frames, **kwargs):
+    landmark_log = []
+    selected = detect(frames, threshold=0.005, landmark_log=landmark_log, **kwargs)
+    selection = [(s.frame_id, round(s.movement, 6)) for s in selected]
+    log = [(frame_id, i, None if landmarks is None else landmarks.points.round(6).tolist())
+           for frame_id, i, landmarks in landmark_log]
+    return selection, log
+
+
+@pytest.mark.parametrize("static_threshold", [None, 0.01])
+@pytest.mark.parametrize("chunk_size,overlap", [(5, 3), (8, 1), (64, 8)])
+def test_sharded_detection_matches_the_sequential_pass(stub_engines, static_threshold, chunk_size, overlap):
+    frames = clip()
+    sequential = run(detect_frames, frames, static_threshold=static_threshold)
+    sharded = run(detect_frames_sharded, frames, workers=2, chunk_size=chunk_size, overlap=overlap,
+                  static_threshold=static_threshold)
+    assert sequential[0], "the clip should get frames selected"
+    assert sharded == sequential
+
+
+def test_chunks_without_overlap_lose_the_tracker_warmup(stub_engines):
+    frames = clip()
+    # the stub finds no hand on the first frame of every chunk, only the overlap tail hides that
+    assert run(detect_frames_sharded, frames, workers=2, chunk_size=5, overlap=0) != run(detect_frames, frames)
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from hand_detection_service import train_sign_classifier
+from hand_detection_service.landmark_store import LandmarkSequence, encode_sequence
+from hand_detection_service.landmarks import HandLandmarks
+from hand_detection_service.real_time_hand_detection import skip_early_frames
+from hand_detection_service.sign_classifier import FRAME_FEATURES, SEQUENCE_LENGTH, SignClassifier, SignVerifier
+
+SETTINGS = {"sampling": "adaptive", "interval": 6, "min_interval": 2, "roi": False, "prefilter": True,
+            "engine": "solutions"}
+
+
+def classifier(metadata=None):
+    model = SignClassifier.initialize(["hello", "thanks"], np.zeros(FRAME_FEATURES), np.ones(FRAME_FEATURES))
+    model.metadata = dict(metadata or {})
+    return model
+
+
+def test_sampling_settings_survive_save_and_load(tmp_path):
+    path = str(tmp_path / "sign_classifier.npz")
+    classifier(dict(SETTINGS, val_accuracy=0.9)).save(path)
+    loaded = SignClassifier.load(path)
+    assert {key: loaded.metadata[key] for key in SETTINGS} == SETTINGS
+    assert SignVerifier(loaded).mismatched_settings(SETTINGS) == []
+
+
+def test_verifier_reports_every_setting_the_service_does_not_share():
+    verifier = SignVerifier(classifier(SETTINGS))
+    assert verifier.mismatched_settings(dict(SETTINGS, sampling="fixed", prefilter=False)) == ["sampling", "prefilter"]
+    # a model without recorded settings matches nothing
+    assert len(SignVerifier(classifier()).mismatched_settings(SETTINGS)) == len(SETTINGS)
+
+
+def test_skip_early_frames_only_shortens_long_sessions():
+    assert skip_early_frames(list(range(12))) == list(range(12))
+    assert skip_early_frames(list(range(13))) == list(range(2, 13))
+
+
+def biased_classifier(hello_logit):
+    """Classifier whose output ignores the input: p(hello) = sigmoid(hello_logit)"""
+    model = classifier()
+    model.conv_weight[:] = 0
+    model.out_weight[:] = 0
+    model.out_bias[:] = [hello_logit, 0.0]
+    return model
+
+
+def clip(frames=6, hand_frames=None, seed=0):
+    rng = np.random.RandomState(seed)
+    hand_frames = frames if hand_frames is None else hand_frames
+    return [
+        HandLandmarks(rng.uniform(0.3, 0.7, (1, 21, 3)), ["Right"]) if i < hand_frames else None
+        for i in range(frames)
+    ]
+
+
+def test_verifier_accepts_a_confident_target_word():
+    verdict = SignVerifier(biased_classifier(3.0)).verify(clip(), "Hello")
+    assert verdict["answer"] == "yes"
+    assert verdict["predicted"] == "hello"
+    assert verdict["target_probability"] == pytest.approx(1 / (1 + np.exp(-3.0)), abs=1e-4)
+
+
+def test_verifier_rejects_when_another_word_is_confident():
+    verdict = SignVerifier(biased_classifier(3.5)).verify(clip(), "thanks")
+    assert verdict["answer"] == "no"
+    assert verdict["predicted"] == "hello"
+    assert verdict["confidence"] >= 0.95
+
+
+def test_verifier_leaves_unsure_and_unknown_cases_to_gpt():
+    unsure = SignVerifier(biased_classifier(1.0))
+    assert unsure.verify(clip(), "hello") is None
+    assert unsure.verify(clip(), "thanks") is None
+    confident = SignVerifier(biased_classifier(5.0))
+    assert confident.verify(clip(), "goodbye") is None
+    assert confident.verify([None, None], "hello") is None
+
+
+def test_a_training_step_lowers_the_loss():
+    rng = np.random.RandomState(0)
+    inputs = rng.normal(0, 1, (8, SEQUENCE_LENGTH, FRAME_FEATURES)).astype(np.float32)
+    labels = np.array([0, 1] * 4)
+    # the two words differ in the mean of their inputs
+    inputs[labels == 1] += 0.5
+    model = SignClassifier.initialize(["hello", "thanks"], np.zeros(FRAME_FEATURES), np.ones(FRAME_FEATURES))
+    loss, grads = train_sign_classifier.loss_and_gradients(model, inputs, labels, weight_decay=0.0)
+    for name, gradient in grads.items():
+        setattr(model, name, getattr(model, name) - 0.05 * gradient)
+    assert train_sign_classifier.loss_and_gradients(model, inputs, labels, weight_decay=0.0)[0] < loss
+
+
+def test_clips_with_fewer_than_two_hand_frames_are_skipped(tmp_path):
+    word_dir = tmp_path / "hello"
+    word_dir.mkdir()
+    for name, sequence in (("one_hand_frame", clip(6, hand_frames=1)), ("usable", clip(6, hand_frames=4))):
+        np.savez(word_dir / f"{name}.npz", **encode_sequence(
+            LandmarkSequence([f"frame_{i}" for i in range(6)], range(6), sequence)
+        ))
+    dataset = train_sign_classifier.load_dataset(str(tmp_path), SETTINGS, store=None)
+    assert [sum(record is not None for record in sequence) for sequence in dataset["hello"]] == [4]
+    # every clip that made it in survives augmentation
+    rng = np.random.RandomState(0)
+    assert all(len(train_sign_classifier.augment(sequence, rng)) >= 2 for sequence in dataset["hello"])
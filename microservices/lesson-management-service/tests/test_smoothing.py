@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from hand_detection_service.landmarks import HandLandmarks
+from hand_detection_service.real_time_hand_detection import FrameSelector, detect_frames, select_from_landmarks
+from hand_detection_service.smoothing import LandmarkSmoother, OneEuroFilter, smoothing_factor
+
+BASE = np.random.RandomState(0).uniform(0.3, 0.7, (21, 3)).astype(np.float32)
+
+
+def hand(offset=0.0, key="Right", noise=None):
+    points = BASE + np.array([offset, 0, 0], dtype=np.float32)
+    if noise is not None:
+        points = points + noise
+    return HandLandmarks(points[None], [key])
+
+
+def jittery_clip(seed=0, jitter=0.003, step=0.03):
+    """Still hand, a sweep to the right, still hand again, with landmark jitter throughout"""
+    rng = np.random.RandomState(seed)
+    offsets = [0.0] * 15 + [step * (i + 1) for i in range(10)] + [step * 10] * 15
+    return [(f"frame_{i}", i, hand(offset, noise=rng.normal(0, jitter, BASE.shape)))
+            for i, offset in enumerate(offsets)]
+
+
+def test_smoothing_factor():
+    assert smoothing_factor(1.0, 1e9) == pytest.approx(1.0)
+    assert 0 < smoothing_factor(0.2, 1.0) < 1
+    assert smoothing_factor(0.2, 1.0) < smoothing_factor(0.2, 5.0)
+
+
+def test_one_euro_passes_the_first_sample_and_converges_on_a_constant():
+    one_euro = OneEuroFilter()
+    np.testing.assert_array_equal(one_euro(BASE, 0), BASE)
+    moved = BASE + 0.1
+    for t in range(1, 40):
+        value = one_euro(moved, t * 200)
+    np.testing.assert_allclose(value, moved, atol=1e-4)
+
+
+def test_one_euro_follows_fast_motion_closer_than_slow_motion():
+    def lag(step):
+        one_euro = OneEuroFilter(min_cutoff=1.0, beta=20.0)
+        for t in range(10):
+            value = one_euro(BASE + step * t, t * 200)
+        return float(np.abs(value - (BASE + step * 9)).max()) / step
+
+    # relative to the distance covered per frame, a fast hand lags less
+    assert lag(0.05) < lag(0.001)
+
+
+def test_smoother_keeps_state_per_hand_and_resets_missing_hands():
+    smoother = LandmarkSmoother()
+    smoother.filter(HandLandmarks(np.stack([BASE, BASE + 0.2]), ["Left", "Right"]), 0)
+    moved = smoother.filter(HandLandmarks(np.stack([BASE + 0.2 + 0.01, BASE + 0.01]), ["Right", "Left"]), 1)
+    # each hand is smoothed against its own history, regardless of its position in the record
+    assert moved.handedness == ("Right", "Left")
+    assert np.abs(moved.hand("Right") - (BASE + 0.2)).max() < 0.01
+    assert np.abs(moved.hand("Left") - BASE).max() < 0.01
+
+    assert smoother.filter(None, 2) is None
+    # after a frame without hands the hand starts fresh, the filter passes it unchanged
+    np.testing.assert_array_equal(smoother.filter(hand(0.5, "Left"), 3).hand("Left"), hand(0.5, "Left").hand("Left"))
+
+
+def test_smoother_uses_timestamps_when_given():
+    by_index, by_time = LandmarkSmoother(frame_period_ms=200), LandmarkSmoother(frame_period_ms=200)
+    for i in range(5):
+        by_index.filter(hand(0.01 * i), i)
+        by_time.filter(hand(0.01 * i), i, timestamp_ms=i * 200.0)
+    np.testing.assert_allclose(by_index.filter(hand(0.05), 5).points, by_time.filter(hand(0.05), 5, 1000.0).points)
+
+
+def test_smoothing_cuts_jitter_selections_but_keeps_the_gesture():
+    raw, smoothed = 0, 0
+    for seed in range(5):
+        clip = jittery_clip(seed)
+        raw_picks = select_from_landmarks(clip, threshold=0.005, smoothing=False)
+        smoothed_picks = select_from_landmarks(clip, threshold=0.005, smoothing=True)
+        raw += len(raw_picks)
+        smoothed += len(smoothed_picks)
+        moving = {f"frame_{i}" for i in range(15, 25)}
+        assert moving <= {frame_id for frame_id, _, _ in smoothed_picks}
+    assert smoothed < raw / 2
+
+
+def test_selected_frames_keep_the_raw_landmarks(stub_hands_pool):
+    landmark_log = []
+    frames = [(f"frame_{i}", np.full((24, 32, 3), 50 + 10 * i, dtype=np.uint8)) for i in range(6)]
+    selected = detect_frames(frames, threshold=0.001, landmark_log=landmark_log)
+    assert selected
+    detected = {frame_id: landmarks for frame_id, _, landmarks in landmark_log}
+    for frame in selected:
+        # the record detection returned, not the One Euro filtered copy the movement was measured on
+        assert frame.landmarks is detected[frame.frame_id]
+    assert FrameSelector(smoothing=False).smoother is None
+
+
+def test_selection_is_paced_by_the_frame_timestamps(stub_hands_pool, monkeypatch):
+    paced = []
+    smoothed = LandmarkSmoother.filter
+
+    def recording_filter(self, landmarks, frame_index, timestamp_ms=None):
+        paced.append(timestamp_ms)
+        return smoothed(self, landmarks, frame_index, timestamp_ms)
+
+    monkeypatch.setattr(LandmarkSmoother, "filter", recording_filter)
+    # adaptive sampling: dense while the hand moves, sparse while it rests
+    timestamps = [0.0, 67.0, 133.0, 200.0, 400.0, 600.0]
+    frames = [(f"frame_{i}", np.full((24, 32, 3), 50 + 10 * i, dtype=np.uint8), timestamp_ms)
+              for i, timestamp_ms in enumerate(timestamps)]
+    landmark_log = []
+    detect_frames(frames, threshold=0.001, landmark_log=landmark_log)
+    assert paced == timestamps
+
+    # stored landmarks are reselected with the same spacing
+    paced.clear()
+    select_from_landmarks(landmark_log, threshold=0.001,
+                          timestamps_ms={frame_id: timestamp_ms for frame_id, _, timestamp_ms in frames})
+    assert paced == timestamps
@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+
+import pytest
+
+import tracing
+from tracing import (
+    current_span,
+    format_server_timing,
+    parse_server_timing,
+    span,
+    start_request_timings,
+    traced,
+)
+
+
+def in_request(func):
+    # every request runs in its own context, like the ASGI middleware
+    return contextvars.copy_context().run(func)
+
+
+def test_spans_record_summed_stage_timings():
+    def request():
+        timings = start_request_timings()
+        for _ in range(2):
+            with span("detect"):
+                pass
+        with span("outer"):
+            with span("inner"):
+                pass
+        return timings
+
+    timings = in_request(request)
+    assert set(timings) == {"detect", "outer", "inner"}
+    assert timings["outer"] >= timings["inner"] >= 0
+
+
+def test_spans_outside_a_request_are_not_recorded():
+    def no_request():
+        with span("stage") as handle:
+            handle.set_attribute("frames", 3)
+        return handle.attributes
+
+    assert in_request(no_request) == {"frames": 3}
+
+
+def test_current_span_is_the_innermost_one():
+    with span("outer", level=1):
+        with span("inner"):
+            current_span().set_attribute("seen", True)
+            inner = current_span()
+        assert current_span().attributes == {"level": 1}
+    assert inner.attributes == {"seen": True}
+    # a detached handle outside of any span
+    current_span().set_attribute("ignored", 1)
+
+
+def test_traced_wraps_sync_and_async_functions():
+    @traced("sync_stage")
+    def sync_stage(x):
+        return x + 1
+
+    @traced("async_stage")
+    async def async_stage(x):
+        return x * 2
+
+    def request():
+        timings = start_request_timings()
+        assert sync_stage(1) == 2
+        assert asyncio.run(async_stage(2)) == 4
+        return timings
+
+    assert set(in_request(request)) == {"sync_stage", "async_stage"}
+    assert sync_stage.__name__ == "sync_stage"
+
+
+def test_server_timing_round_trip():
+    header = format_server_timing({"extract frames": 412.34, "gpt": 1.0})
+    assert header == "extract_frames;dur=412.3, gpt;dur=1.0"
+    assert parse_server_timing(header) == {"extract_frames": pytest.approx(412.3), "gpt": 1.0}
+    assert parse_server_timing(None) == {}
+
+
+def test_trace_file_is_closed_on_shutdown(tmp_path, monkeypatch):
+    pytest.importorskip("opentelemetry.sdk")
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("TRACE_FILE", str(trace_file))
+    monkeypatch.delenv("OTEL_EXPORTER_OTLP_ENDPOINT", raising=False)
+    monkeypatch.setattr(tracing, "_tracer", None)
+    assert tracing.setup_tracing() is not None
+    opened = tracing._trace_file
+    with span("detect"):
+        pass
+    tracing.shutdown_tracing()
+    # the pending span was flushed before the file was closed
+    assert opened.closed
+    assert '"name": "detect"' in trace_file.read_text()
+    assert tracing._tracer is None